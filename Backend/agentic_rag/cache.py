@@ -0,0 +1,284 @@
+# agentic_rag/cache.py
+"""
+Caches shared by the graph nodes.
+
+- LRUCache / TTLCache : bounded in-process tiers.
+- SQLiteCache         : shared by every worker on the host (one file, WAL mode).
+- TieredCache         : in-process L1 in front of a shared L2.
+- make_cache()        : picks the tier from CACHE_BACKEND (memory | sqlite).
+- CachedEmbeddings    : embeddings proxy keyed by (model, text).
+"""
+from __future__ import annotations
+import time
+import pickle
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+from .config import CACHE_BACKEND, CACHE_PATH
+from .metrics import record, register_cache
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Small thread-safe LRU cache (the server shares one GraphApp across request threads).
+
+    - get() returns `default` on miss and refreshes recency on hit.
+    - Tracks hits/misses so callers can report hit rates; named caches are
+      exported on /metrics and counted in the per-turn metrics.
+    """
+
+    def __init__(self, maxsize: int = 1024, name: Optional[str] = None):
+        self.maxsize = max(int(maxsize), 0)
+        self.name = name
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if name:
+            register_cache(name, self)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                hit, value = True, self._data[key]
+            else:
+                self.misses += 1
+                hit, value = False, default
+        if self.name:
+            record(cache_hits=int(hit), cache_misses=int(not hit))
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.maxsize == 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else None,
+        }
+
+
+class TTLCache(LRUCache):
+    """LRUCache whose entries also expire `ttl_s` seconds after they were written."""
+
+    def __init__(self, maxsize: int = 1024, ttl_s: float = 3600.0, name: Optional[str] = None):
+        super().__init__(maxsize, name=name)
+        self.ttl_s = float(ttl_s)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] < now:
+                del self._data[key]
+                entry = None
+            if entry is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        hit = entry is not None
+        if self.name:
+            record(cache_hits=int(hit), cache_misses=int(not hit))
+        return entry[1] if hit else default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        super().put(key, (time.monotonic() + self.ttl_s, value))
+
+
+class SQLiteCache:
+    """
+    Cross-process cache in a SQLite file (values pickled, keys hashed).
+
+    Every worker on the host opens the same file; expired rows are purged and the
+    table is trimmed to `maxsize` rows every few hundred writes.
+    """
+
+    _PURGE_EVERY = 256
+
+    def __init__(self, path: str, namespace: str, maxsize: int = 100000,
+                 ttl_s: float = 3600.0, name: Optional[str] = None):
+        self.namespace = namespace
+        self.maxsize = max(int(maxsize), 0)
+        self.ttl_s = float(ttl_s)
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " ns TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL,"
+                " expires REAL NOT NULL, PRIMARY KEY (ns, key))")
+            self._conn.commit()
+        if name:
+            register_cache(name, self)
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM cache WHERE ns = ? AND key = ? AND expires > ?",
+                (self.namespace, self._key(key), time.time())).fetchone()
+            hit = row is not None
+            self.hits += int(hit)
+            self.misses += int(not hit)
+        if self.name:
+            record(cache_hits=int(hit), cache_misses=int(not hit))
+        return pickle.loads(row[0]) if hit else default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.maxsize == 0:
+            return
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (ns, key, value, expires) VALUES (?, ?, ?, ?)",
+                (self.namespace, self._key(key), blob, time.time() + self.ttl_s))
+            self._writes += 1
+            if self._writes % self._PURGE_EVERY == 0:
+                self._purge()
+            self._conn.commit()
+
+    def _purge(self) -> None:
+        self._conn.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+        self._conn.execute(
+            "DELETE FROM cache WHERE ns = ? AND key IN ("
+            " SELECT key FROM cache WHERE ns = ? ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.namespace, self.maxsize))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE ns = ?", (self.namespace,))
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM cache WHERE ns = ?", (self.namespace,)).fetchone()[0]
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else None,
+        }
+
+
+class TieredCache:
+    """Small in-process L1 in front of a shared L2; L2 hits are promoted to L1."""
+
+    def __init__(self, l1: TTLCache, l2: SQLiteCache, name: Optional[str] = None):
+        self.l1 = l1
+        self.l2 = l2
+        self.name = name
+        if name:
+            register_cache(name, self)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self.l1.get(key, _MISSING)
+        if value is _MISSING:
+            value = self.l2.get(key, _MISSING)
+            if value is not _MISSING:
+                self.l1.put(key, value)
+        hit = value is not _MISSING
+        if self.name:
+            record(cache_hits=int(hit), cache_misses=int(not hit))
+        return value if hit else default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self.l1.put(key, value)
+        self.l2.put(key, value)
+
+    def clear(self) -> None:
+        self.l1.clear()
+        self.l2.clear()
+
+    def __len__(self) -> int:
+        return len(self.l2)
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        l1, l2 = self.l1.stats(), self.l2.stats()
+        hits = l1["hits"] + l2["hits"]
+        total = hits + l2["misses"]
+        return {"size": l2["size"], "l1_size": l1["size"], "hits": hits,
+                "misses": l2["misses"], "hit_rate": (hits / total) if total else None}
+
+
+def make_cache(name: str, maxsize: int, ttl_s: float, backend: Optional[str] = None):
+    """Named cache on the configured tier (CACHE_BACKEND=memory | sqlite)."""
+    backend = (backend or CACHE_BACKEND).lower()
+    if backend == "memory":
+        return TTLCache(maxsize, ttl_s, name=name)
+    if backend == "sqlite":
+        l1 = TTLCache(min(maxsize, 256), ttl_s)
+        return TieredCache(l1, SQLiteCache(CACHE_PATH, name, maxsize, ttl_s), name=name)
+    raise ValueError(f"Unknown CACHE_BACKEND={backend}")
+
+
+def clear_caches() -> None:
+    """Empty every named cache (benchmarks / tests between runs)."""
+    from .metrics import _CACHES
+    for cache in list(_CACHES.values()):
+        cache.clear()
+
+
+class CachedEmbeddings:
+    """Embeddings proxy that serves repeated texts from a cache keyed by (model, text)."""
+
+    def __init__(self, embeddings, cache, model: Optional[str] = None):
+        self._emb = embeddings
+        self._cache = cache
+        self._model = model or getattr(embeddings, "model", None) or type(embeddings).__name__
+
+    def embed_query(self, text: str) -> List[float]:
+        key = (self._model, "q", text)
+        vec = self._cache.get(key)
+        if vec is None:
+            vec = self._emb.embed_query(text)
+            self._cache.put(key, vec)
+        return vec
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        out: List[Optional[List[float]]] = [
+            self._cache.get((self._model, "d", t)) for t in texts]
+        missing = [i for i, v in enumerate(out) if v is None]
+        if missing:
+            fresh = self._emb.embed_documents([texts[i] for i in missing])
+            for i, vec in zip(missing, fresh):
+                out[i] = vec
+                self._cache.put((self._model, "d", texts[i]), vec)
+        return out  # type: ignore[return-value]
+
+    def __getattr__(self, name: str):
+        return getattr(self._emb, name)
@@ -0,0 +1,187 @@
+# agentic_rag/checkpoint.py
+"""
+LangGraph checkpointer factory (CHECKPOINT_BACKEND):
+
+- memory   : bounded in-process saver; threads idle for CHECKPOINT_TTL_S or beyond
+             CHECKPOINT_MAX_THREADS (least recently used first) are evicted and each
+             thread keeps only its CHECKPOINT_KEEP_LAST newest checkpoints.
+             Single worker only, conversations are lost on restart.
+             Step pruning edits MemorySaver's private dicts: it is checked against
+             the installed langgraph-checkpoint at startup and turned off (threads
+             are still evicted, through delete_thread) if the layout differs.
+- sqlite   : file-backed (CHECKPOINT_URL = path); survives restarts, shared by
+             workers on one host.  pip install langgraph-checkpoint-sqlite
+- postgres : shared by all workers/hosts (CHECKPOINT_URL = DSN, e.g. the Supabase
+             Postgres).  pip install langgraph-checkpoint-postgres psycopg-pool
+"""
+import time
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.memory import MemorySaver
+
+from .config import (
+    CHECKPOINT_BACKEND, CHECKPOINT_URL, CHECKPOINT_MAX_THREADS, CHECKPOINT_TTL_S,
+    CHECKPOINT_KEEP_LAST,
+)
+
+log = logging.getLogger(__name__)
+
+
+def _memory_layout_ok(serde) -> bool:
+    """
+    Whether MemorySaver stores what _prune expects:
+      storage[thread][ns][checkpoint_id] = (typed checkpoint, ...),
+      writes keyed (thread, ns, checkpoint_id), blobs keyed (thread, ns, channel, version).
+    These are private attributes with no stability promise across langgraph-checkpoint
+    releases (requirements do not pin it), so the layout is probed on a throwaway
+    saver with the installed version instead of trusting a version number.
+    """
+    probe = MemorySaver(serde=serde)
+    ckpt = empty_checkpoint()
+    ckpt["channel_values"] = {"probe": 1}
+    ckpt["channel_versions"] = {"probe": 1}
+    try:
+        probe.put({"configurable": {"thread_id": "t", "checkpoint_ns": ""}},
+                  ckpt, {}, {"probe": 1})
+        entry = probe.storage["t"][""][ckpt["id"]]
+        return ("channel_versions" in serde.loads_typed(entry[0])
+                and ("t", "", "probe", 1) in probe.blobs
+                and isinstance(probe.writes, dict))
+    except Exception:
+        return False
+
+
+class BoundedMemorySaver(MemorySaver):
+    """MemorySaver that forgets idle / least recently used threads and old steps.
+    One lock serializes every read and write, so pruning never races a reader."""
+
+    def __init__(self, max_threads: int = 10000, ttl_s: float = 86400.0,
+                 keep_last: int = 2, **kwargs):
+        super().__init__(**kwargs)
+        self.max_threads = max(1, int(max_threads))
+        self.ttl_s = float(ttl_s)
+        self.keep_last = max(1, int(keep_last))
+        self._last_used: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.RLock()
+        # (thread_id, ns) -> blob keys, so pruning never scans other threads
+        self._blob_keys: Dict[Tuple[str, str], Set[tuple]] = defaultdict(set)
+        self.prune_steps = _memory_layout_ok(self.serde)
+        if not self.prune_steps:
+            log.warning("checkpoint: unexpected MemorySaver layout in this langgraph-checkpoint "
+                        "version; keeping every step (thread eviction still applies)")
+
+    def _touch(self, thread_id: str) -> None:
+        """Mark a thread as used and evict expired ones (caller holds the lock)."""
+        now = time.monotonic()
+        self._last_used[thread_id] = now
+        self._last_used.move_to_end(thread_id)
+        while self._last_used:
+            oldest, ts = next(iter(self._last_used.items()))
+            if oldest == thread_id:
+                break
+            if len(self._last_used) > self.max_threads or (
+                    self.ttl_s > 0 and now - ts > self.ttl_s):
+                self._last_used.popitem(last=False)
+                self.delete_thread(oldest)
+            else:
+                break
+
+    def _prune(self, thread_id: str, ns: str) -> None:
+        """Drop all but the newest `keep_last` checkpoints of a thread (and their blobs)."""
+        if not self.prune_steps:
+            return
+        ckpts = self.storage[thread_id][ns]
+        if len(ckpts) <= self.keep_last:
+            return
+        ids = sorted(ckpts)   # checkpoint ids are time-ordered
+        for cid in ids[:-self.keep_last]:
+            ckpts.pop(cid, None)
+            self.writes.pop((thread_id, ns, cid), None)
+        live = set()
+        for cid in ids[-self.keep_last:]:
+            c = self.serde.loads_typed(ckpts[cid][0])
+            live.update(c.get("channel_versions", {}).items())
+        keys = self._blob_keys[(thread_id, ns)]
+        for key in [k for k in keys if (k[2], k[3]) not in live]:
+            self.blobs.pop(key, None)
+            keys.discard(key)
+
+    # MemorySaver's async methods call these, so they are covered too
+
+    def get_tuple(self, config):
+        with self._lock:
+            return super().get_tuple(config)
+
+    def list(self, config, **kwargs):
+        with self._lock:
+            items = list(super().list(config, **kwargs))
+        return iter(items)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"]["checkpoint_ns"]
+        with self._lock:
+            self._touch(str(thread_id))
+            out = super().put(config, checkpoint, metadata, new_versions)
+            self._blob_keys[(thread_id, ns)].update(
+                (thread_id, ns, k, v) for k, v in new_versions.items())
+            self._prune(thread_id, ns)
+        return out
+
+    def put_writes(self, config, writes, task_id, task_path: str = ""):
+        with self._lock:
+            return super().put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            super().delete_thread(thread_id)
+            self._last_used.pop(thread_id, None)
+            for key in [k for k in self._blob_keys if k[0] == thread_id]:
+                del self._blob_keys[key]
+
+    def thread_count(self) -> int:
+        # (not __len__: an empty saver would be falsy and LangGraph would skip it)
+        return len(self._last_used)
+
+
+def make_checkpointer(backend: Optional[str] = None, url: Optional[str] = None) -> Any:
+    backend = (backend or CHECKPOINT_BACKEND).lower()
+    url = url or CHECKPOINT_URL
+
+    if backend == "memory":
+        return BoundedMemorySaver(CHECKPOINT_MAX_THREADS, CHECKPOINT_TTL_S, CHECKPOINT_KEEP_LAST)
+
+    if backend == "sqlite":
+        try:
+            from langgraph.checkpoint.sqlite import SqliteSaver
+        except ImportError as e:
+            raise RuntimeError(
+                "CHECKPOINT_BACKEND=sqlite needs: pip install langgraph-checkpoint-sqlite") from e
+        conn = sqlite3.connect(url, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")   # concurrent readers across workers
+        saver = SqliteSaver(conn)
+        saver.setup()
+        return saver
+
+    if backend == "postgres":
+        try:
+            from langgraph.checkpoint.postgres import PostgresSaver
+            from psycopg.rows import dict_row
+            from psycopg_pool import ConnectionPool
+        except ImportError as e:
+            raise RuntimeError(
+                "CHECKPOINT_BACKEND=postgres needs: "
+                "pip install langgraph-checkpoint-postgres psycopg-pool") from e
+        pool = ConnectionPool(
+            url, max_size=10, open=True,
+            kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row})
+        saver = PostgresSaver(pool)
+        saver.setup()
+        return saver
+
+    raise ValueError(f"Unknown CHECKPOINT_BACKEND={backend}")
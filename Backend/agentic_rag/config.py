@@ -12,16 +12,75 @@ GEN_MODEL = os.getenv("GEN_MODEL",   "gemini-2.5-flash")
 # --- RAG params ---
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1200"))
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "150"))
+# Ingest-time near-duplicate chunk filter (MinHash Jaccard); 0 disables it
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.85"))
+# Processes parsing the JSON corpus (0 = one per CPU, up to 8; 1 = in-process)
+CORPUS_WORKERS = int(os.getenv("CORPUS_WORKERS", "0"))
 HYDE_EXPS = int(os.getenv("HYDE_EXPS", "3"))
+# off: embed each expanded query | mean/max: one ANN call on question+HyDE passage
+HYDE_MODE = os.getenv("HYDE_MODE", "off").lower()
 TOP_K = int(os.getenv("TOP_K", "8"))
 MMR_K = int(os.getenv("MMR_K", "6"))
+# MMR trade-off (1 = relevance only); ANN_MMR=1 also diversifies the Supabase / local
+# ANN candidates (retrievers/mmr.py), returning MMR_K articles per query
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.5"))
+ANN_MMR = os.getenv("ANN_MMR", "0") == "1"
 MAX_CTX_CHARS = int(os.getenv("MAX_CTX_CHARS", "14000"))
 RRF_K = int(os.getenv("RRF_K", "20"))
 LOOP_MAX = int(os.getenv("LOOP_MAX", "2"))
+# Let the planner verdict pick fast path / full loop / early refusal
+ADAPTIVE_ROUTING = os.getenv("ADAPTIVE_ROUTING", "1") == "1"
+PLAN_CACHE_SIZE = int(os.getenv("PLAN_CACHE_SIZE", "1024"))
 STOP_TOKENS = ["</think>"]
 
+# --- Model gateway (client-side rate limits / retries / deadlines / hedging) ---
+# RPM/TPM = 0 disables that bucket; HEDGE_MS = 0 disables hedged requests
+LLM_RPM = int(os.getenv("LLM_RPM", "1000"))
+LLM_TPM = int(os.getenv("LLM_TPM", "1000000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "60"))
+LLM_HEDGE_MS = int(os.getenv("LLM_HEDGE_MS", "0"))
+EMBED_RPM = int(os.getenv("EMBED_RPM", "3000"))
+EMBED_TPM = int(os.getenv("EMBED_TPM", "1000000"))
+EMBED_MAX_CONCURRENCY = int(os.getenv("EMBED_MAX_CONCURRENCY", "32"))
+EMBED_TIMEOUT_S = float(os.getenv("EMBED_TIMEOUT_S", "20"))
+EMBED_HEDGE_MS = int(os.getenv("EMBED_HEDGE_MS", "1500"))
+# Ingest embed_documents batches: no call deadline, this timeout per attempt (retried)
+EMBED_BATCH_TIMEOUT_S = float(os.getenv("EMBED_BATCH_TIMEOUT_S", "120"))
+MODEL_RETRIES = int(os.getenv("MODEL_RETRIES", "4"))
+
+# --- Conversation memory (per thread) ---
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "1200"))   # history kept verbatim
+MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "250"))  # rolling summary cap
+MEMORY_ANSWER_CHARS = int(os.getenv("MEMORY_ANSWER_CHARS", "800"))    # per stored answer
+
+# --- Shared state (checkpoints + caches) ---
+# memory: bounded in-process | sqlite: one host, many workers | postgres: many hosts
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "memory").lower()
+CHECKPOINT_URL = os.getenv("CHECKPOINT_URL", str(BASE / "data" / "checkpoints.sqlite"))
+CHECKPOINT_MAX_THREADS = int(os.getenv("CHECKPOINT_MAX_THREADS", "10000"))
+CHECKPOINT_TTL_S = float(os.getenv("CHECKPOINT_TTL_S", "86400"))
+# memory backend: checkpoints kept per thread (older steps are pruned)
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "2"))
+# memory | sqlite (shared by all workers on the host, in-process L1 in front)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+CACHE_PATH = os.getenv("CACHE_PATH", str(BASE / "data" / "cache.sqlite"))
+CACHE_TTL_S = float(os.getenv("CACHE_TTL_S", "3600"))
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "4096"))
+EMBED_CACHE_TTL_S = float(os.getenv("EMBED_CACHE_TTL_S", "86400"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+# Per-article source cards (image / images / favicon), process-local
+SOURCE_CARD_CACHE_SIZE = int(os.getenv("SOURCE_CARD_CACHE_SIZE", "4096"))
+ARTICLE_CACHE_SIZE = int(os.getenv("ARTICLE_CACHE_SIZE", "8192"))
+
 # --- Corpus ---
 JSON_PATH = os.getenv("JSON_PATH",   str(BASE / "data" / "corpus"))
+# Local store of full document embeddings keyed by (model, chunk hash); "" disables it
+EMBED_STORE_DIR = os.getenv("EMBED_STORE_DIR", str(BASE / "data" / "embeddings"))
+EMBED_STORE_DTYPE = os.getenv("EMBED_STORE_DTYPE", "float32")     # float32 | float16
+# Label the Gemini model's vectors are stored under; the app, index_supabase,
+# build_snapshot, build_pca and reproject all read it from here
+EMBED_STORE_MODEL = os.getenv("EMBED_STORE_MODEL", f"gemini:{EMBED_MODEL}")
 
 # --- (Option C) compressor paths ---
 # If you're using Random Projection (RP):
@@ -36,8 +95,32 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv(
     "SUPABASE_SERVICE_ROLE_KEY") or os.getenv("SUPABASE_ANON_KEY")
 SUPABASE_TABLE = os.getenv("SUPABASE_TABLE", "documents")
+# Per-article metadata (lean chunk rows carry only doc_id + offsets), see docs/lean_metadata.md
+SUPABASE_ARTICLES_TABLE = os.getenv("SUPABASE_ARTICLES_TABLE", "articles")
 # RPC function name used by the retriever
 SUPABASE_QUERY = os.getenv("SUPABASE_QUERY_NAME", "match_documents")
+# Written by scripts/reproject.py; when present it overrides SUPABASE_QUERY + RP_PATH
+# (re-read when the file changes, checked at most every ACTIVE_INDEX_CHECK_S)
+ACTIVE_INDEX_PATH = os.getenv("ACTIVE_INDEX_PATH", str(BASE / "models" / "active_index.json"))
+ACTIVE_INDEX_CHECK_S = float(os.getenv("ACTIVE_INDEX_CHECK_S", "5"))
+
+# --- Local ANN (retrievers/local_ann.py) ---
+# First-stage codes: none | float16 | int8 | binary (see agentic_rag/quantize.py); the
+# top match_count * ANN_RERANK candidates are rescored on the float32 vectors
+ANN_QUANT = os.getenv("ANN_QUANT", "none").lower()
+ANN_RERANK = int(os.getenv("ANN_RERANK", "4"))
+
+# --- Second-stage rerank of the Supabase candidates (retrievers/rerank.py) ---
+# cosine: exact cosine on the full vectors (RPC full_embedding / embedding store) | off
+RERANK = os.getenv("RERANK", "cosine").lower()
+# Optional ONNX cross-encoder over the top RERANK_CE_TOP candidates ("" disables);
+# the tokenizer defaults to tokenizer.json next to the model
+RERANK_ONNX_PATH = os.getenv("RERANK_ONNX_PATH", "")
+RERANK_TOKENIZER_PATH = os.getenv("RERANK_TOKENIZER_PATH", "")
+RERANK_CE_TOP = int(os.getenv("RERANK_CE_TOP", "24"))
+RERANK_CE_BATCH = int(os.getenv("RERANK_CE_BATCH", "8"))
+# Per-request cap on reranker time; cross-encoder batches stop once it is spent
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "150"))
 
 # --- Chroma (if you still keep it around as fallback) ---
 PERSIST_DIR = os.getenv("PERSIST_DIR", str(BASE / "chroma_python_docs"))
@@ -0,0 +1,87 @@
+# agentic_rag/docstore.py
+"""
+Per-request document store.
+
+Graph state (and so every checkpoint) only carries compact chunk references:
+    {"id": chunk key, "doc_id": article id, "score": similarity, "span": [start, end]}
+The chunk text lives here for the duration of one GraphApp.invoke and is hydrated
+only by the nodes that read it (grade, generate, verify).
+"""
+from __future__ import annotations
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+from langchain_core.documents import Document
+from .utils import chunk_key
+
+_current_store: ContextVar[Optional["DocStore"]] = ContextVar(
+    "rag_docstore", default=None)
+
+
+def _span(md: Dict[str, Any]) -> Optional[List[int]]:
+    if md.get("start") is not None and md.get("end") is not None:
+        return [int(md["start"]), int(md["end"])]
+    return None
+
+
+def make_ref(d: Document) -> Dict[str, Any]:
+    md = d.metadata or {}
+    return {
+        "id": chunk_key(d),
+        "doc_id": md.get("doc_id"),
+        "score": md.get("similarity"),
+        "span": _span(md),
+    }
+
+
+def merge_refs(prev: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Append unseen refs from `new` after `prev`, keeping first occurrences."""
+    seen = {r["id"] for r in prev}
+    out = list(prev)
+    for r in new:
+        if r["id"] not in seen:
+            seen.add(r["id"])
+            out.append(r)
+    return out
+
+
+class DocStore:
+    """Chunk id -> Document for one request."""
+
+    def __init__(self):
+        self._docs: Dict[str, Document] = {}
+
+    def add(self, docs: List[Document]) -> List[Dict[str, Any]]:
+        refs = []
+        for d in docs:
+            ref = make_ref(d)
+            self._docs.setdefault(ref["id"], d)
+            refs.append(ref)
+        return refs
+
+    def hydrate(self, refs: List[Dict[str, Any]]) -> List[Document]:
+        """Documents for `refs`, in order; refs unknown to this request are skipped."""
+        return [self._docs[r["id"]] for r in refs or [] if r["id"] in self._docs]
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+
+@contextmanager
+def docstore_scope(store: Optional[DocStore] = None) -> Iterator[DocStore]:
+    store = store or DocStore()
+    token = _current_store.set(store)
+    try:
+        yield store
+    finally:
+        _current_store.reset(token)
+
+
+def current_docstore() -> DocStore:
+    """
+    Store of the running request. Outside docstore_scope() this is a throwaway store
+    that is never installed in the context, so nothing accumulates across calls;
+    chain direct node calls (retrieve -> grade -> generate) inside docstore_scope().
+    """
+    store = _current_store.get()
+    return store if store is not None else DocStore()
@@ -0,0 +1,248 @@
+# agentic_rag/embstore.py
+"""
+Local store of full document embeddings, keyed by (model, chunk hash).
+
+Each model gets its own directory under EMBED_STORE_DIR:
+
+    meta.json     {"model", "dim", "dtype", "count"}
+    keys.bin      count x 32-byte sha256 digests of the chunk texts
+    vectors.bin   count x dim float32 | float16, read through np.memmap
+
+Rows are append-only; `count` in meta.json is only advanced after keys and vectors
+are flushed. Writers serialize on an fcntl lock (`.lock`); under it they pick up rows
+committed by other processes and truncate any interrupted append before writing
+their own. Read-only stores (serving, offline readers) never create, lock or
+truncate anything: they see the committed rows and follow new commits. Ingest
+(index_supabase / build_snapshot) embeds through the store, so re-indexing, PCA/RP
+fitting and re-projection read vectors instead of calling the model again.
+"""
+import os
+import re
+import json
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from .config import EMBED_STORE_DIR, EMBED_STORE_DTYPE
+
+try:                    # POSIX; elsewhere writers are only serialized in-process
+    import fcntl
+except ImportError:     # pragma: no cover
+    fcntl = None
+
+_DIGEST = 32
+
+
+def chunk_hash(text: str) -> str:
+    """sha256 hex of the chunk text; the same value as a snapshot's chunks.content_sha256."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _slug(model: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", model).strip("_") or "default"
+
+
+class EmbeddingStore:
+    """Append-only, memory-mapped (chunk hash -> vector) table for one embedding model."""
+
+    def __init__(self, root: str, model: str, dtype: str = EMBED_STORE_DTYPE,
+                 readonly: bool = False):
+        self.model = model
+        self.readonly = readonly
+        self.dir = os.path.join(root, _slug(model))
+        if not readonly:
+            os.makedirs(self.dir, exist_ok=True)
+        self._meta_path = os.path.join(self.dir, "meta.json")
+        self._keys_path = os.path.join(self.dir, "keys.bin")
+        self._vec_path = os.path.join(self.dir, "vectors.bin")
+        self._lock_path = os.path.join(self.dir, ".lock")
+        self._lock = threading.Lock()
+
+        self.dim: Optional[int] = None
+        self.dtype = np.dtype(dtype)
+        self.count = 0
+        self._meta_mtime: Optional[int] = None
+        self._rows: Dict[bytes, int] = {}
+        self._mm: Optional[np.memmap] = None
+        if readonly:
+            self.refresh()
+        else:
+            with self._write_lock():
+                self._recover()
+
+    # ---------- layout ----------
+
+    @contextmanager
+    def _write_lock(self):
+        """Exclusive across threads and (with fcntl) processes."""
+        with self._lock, open(self._lock_path, "a+b") as lf:
+            if fcntl is not None:
+                fcntl.flock(lf.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lf.fileno(), fcntl.LOCK_UN)
+
+    def _read_meta(self, force: bool = False) -> bool:
+        """Load meta.json when it changed since the last read; True if it did."""
+        try:
+            mtime = os.stat(self._meta_path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._meta_mtime and not force:
+            return False
+        with open(self._meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self._meta_mtime = mtime
+        self.dim = meta["dim"]
+        self.dtype = np.dtype(meta["dtype"])
+        self._load_keys(int(meta["count"]))
+        return True
+
+    def _load_keys(self, count: int) -> None:
+        """Index the committed keys [self.count, count)."""
+        if count > self.count:
+            with open(self._keys_path, "rb") as f:
+                f.seek(self.count * _DIGEST)
+                raw = f.read((count - self.count) * _DIGEST)
+            for i in range(len(raw) // _DIGEST):
+                self._rows[raw[i * _DIGEST:(i + 1) * _DIGEST]] = self.count + i
+        self.count = count
+
+    def refresh(self) -> None:
+        """Pick up rows committed by another process (cheap when nothing changed)."""
+        self._read_meta()
+
+    def _recover(self) -> None:
+        """Under the write lock: sync with meta, then drop rows written after the last
+        committed count (an interrupted append, possibly by another process)."""
+        self._read_meta(force=True)
+        for path, width in ((self._keys_path, _DIGEST),
+                            (self._vec_path, (self.dim or 0) * self.dtype.itemsize)):
+            if os.path.exists(path) and os.path.getsize(path) > self.count * width:
+                with open(path, "r+b") as f:
+                    f.truncate(self.count * width)
+
+    def _write_meta(self) -> None:
+        tmp = self._meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model, "dim": self.dim,
+                       "dtype": self.dtype.name, "count": self.count}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._meta_path)
+        self._meta_mtime = os.stat(self._meta_path).st_mtime_ns
+
+    def vectors(self) -> np.ndarray:
+        """(count, dim) read-only memmap of every stored vector, in insertion order."""
+        if not self.count:
+            return np.zeros((0, self.dim or 0), dtype=self.dtype)
+        if self._mm is None or self._mm.shape[0] != self.count:
+            self._mm = np.memmap(self._vec_path, dtype=self.dtype, mode="r",
+                                 shape=(self.count, self.dim))
+        return self._mm
+
+    def hashes(self) -> List[str]:
+        with open(self._keys_path, "rb") as f:
+            raw = f.read(self.count * _DIGEST)
+        return [raw[i:i + _DIGEST].hex() for i in range(0, len(raw), _DIGEST)]
+
+    # ---------- lookups ----------
+
+    def rows(self, hashes: Sequence[str]) -> np.ndarray:
+        """Row index of each hash, -1 when it is not stored."""
+        return np.fromiter((self._rows.get(bytes.fromhex(h), -1) for h in hashes),
+                           dtype=np.int64, count=len(hashes))
+
+    def get(self, hashes: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """(float32 (n, dim) matrix with zero rows for misses, found mask)."""
+        if self.readonly:
+            self.refresh()
+        idx = self.rows(hashes)
+        found = idx >= 0
+        X = np.zeros((len(hashes), self.dim or 0), dtype=np.float32)
+        if found.any():
+            X[found] = self.vectors()[idx[found]]
+        return X, found
+
+    def put(self, hashes: Sequence[str], X: np.ndarray) -> int:
+        """Append the vectors whose hash is not stored yet; returns how many were added."""
+        if self.readonly:
+            raise RuntimeError(f"{self.model}: embedding store opened read-only")
+        X = np.asarray(X)
+        with self._write_lock():
+            # other writers may have committed (or died mid-append) since our last write
+            self._recover()
+            if self.dim is not None and X.shape[1] != self.dim:
+                raise ValueError(f"{self.model}: expected dim {self.dim}, got {X.shape[1]}")
+            new_keys, new_rows, seen = [], [], set()
+            for i, h in enumerate(hashes):
+                k = bytes.fromhex(h)
+                if k not in self._rows and k not in seen:
+                    seen.add(k)
+                    new_keys.append(k)
+                    new_rows.append(i)
+            if not new_keys:
+                return 0
+            dim = int(X.shape[1])
+            for path, data in ((self._vec_path, np.ascontiguousarray(
+                                    X[new_rows], dtype=self.dtype).tobytes()),
+                               (self._keys_path, b"".join(new_keys))):
+                with open(path, "ab") as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+            # commit: meta first, then the in-memory index (a failed write above leaves
+            # both untouched and the partial rows are truncated by the next writer)
+            start = self.count
+            self.dim, self.count = dim, start + len(new_keys)
+            try:
+                self._write_meta()
+            except BaseException:
+                self.count = start
+                raise
+            for j, k in enumerate(new_keys):
+                self._rows[k] = start + j
+            return len(new_keys)
+
+    def embed(self, texts: Sequence[str],
+              embed_fn: Callable[[List[str]], Sequence[Sequence[float]]]) -> np.ndarray:
+        """float32 (n, dim) vectors for texts; only the ones not stored yet go to embed_fn."""
+        hashes = [chunk_hash(t) for t in texts]
+        X, found = self.get(hashes)
+        miss = np.flatnonzero(~found)
+        if len(miss):
+            fresh = np.asarray(embed_fn([texts[i] for i in miss]), dtype=np.float32)
+            self.put([hashes[i] for i in miss], fresh)
+            if X.shape[1] != fresh.shape[1]:      # first vectors of a new store
+                X = np.zeros((len(texts), fresh.shape[1]), dtype=np.float32)
+            X[miss] = fresh
+        return X
+
+    # ---------- bulk reads ----------
+
+    def iter_blocks(self, block: int = 65536) -> Iterator[Tuple[int, np.ndarray]]:
+        """(first row, float32 block) over the whole store, for offline jobs."""
+        V = self.vectors()
+        for s in range(0, self.count, block):
+            yield s, np.asarray(V[s:s + block], dtype=np.float32)
+
+    def sample(self, n: int, seed: int = 42) -> np.ndarray:
+        """Up to n random stored vectors (float32), e.g. to fit PCA."""
+        n = min(n, self.count)
+        idx = np.sort(np.random.RandomState(seed).choice(self.count, n, replace=False))
+        return np.asarray(self.vectors()[idx], dtype=np.float32)
+
+
+def open_store(model: str, root: Optional[str] = None, dtype: Optional[str] = None,
+               readonly: bool = False) -> Optional[EmbeddingStore]:
+    """The store for `model` under EMBED_STORE_DIR, or None when the store is disabled
+    (or, read-only, when nothing was stored for `model` yet)."""
+    root = EMBED_STORE_DIR if root is None else root
+    if not root:
+        return None
+    if readonly and not os.path.exists(os.path.join(root, _slug(model), "meta.json")):
+        return None
+    return EmbeddingStore(root, model, dtype or EMBED_STORE_DTYPE, readonly=readonly)
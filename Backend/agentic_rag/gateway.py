@@ -0,0 +1,434 @@
+# agentic_rag/gateway.py
+"""
+Shared client-side gateway for model calls (chat LLM + embeddings).
+
+Every call goes through the same policy:
+  1) token buckets for requests/min and tokens/min (shared per model kind),
+  2) adaptive concurrency (AIMD: +1 per window of successes, halve on a 429),
+  3) a per-call deadline (the caller gets DeadlineExceeded, not a hung graph),
+     and optionally a per-attempt timeout, which is retried like any transient error,
+  4) retries with exponential backoff + full jitter for transient errors
+     (classified by status code / exception type, not by message text),
+  5) optional hedging: if the first attempt is slower than HEDGE_MS, send a
+     duplicate and keep whichever answers first (idempotent calls only).
+
+Every request in flight holds a concurrency slot until the provider call itself
+returns, including attempts the caller stopped waiting for (deadline, lost hedge).
+
+Use wrap_llm() / wrap_embeddings() (wrap_batch_embeddings() for ingest); gateways
+are process-wide singletons, so GraphApp and the ingest scripts share one quota per
+model kind.
+"""
+import time
+import random
+import threading
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+from .config import (
+    LLM_RPM, LLM_TPM, LLM_MAX_CONCURRENCY, LLM_TIMEOUT_S, LLM_HEDGE_MS,
+    EMBED_RPM, EMBED_TPM, EMBED_MAX_CONCURRENCY, EMBED_TIMEOUT_S, EMBED_HEDGE_MS,
+    EMBED_BATCH_TIMEOUT_S, MODEL_RETRIES,
+)
+from .metrics import record
+
+# Errors are classified by HTTP status / gRPC code and by exception class name
+# (google.api_core, httpx, requests, openai-style clients), looked up along the
+# __cause__ chain since LangChain wraps provider errors. Names, so that none of
+# those packages has to be imported here.
+_THROTTLE_STATUS = {429, "RESOURCE_EXHAUSTED"}
+_TRANSIENT_STATUS = {408, 500, 502, 503, 504, "UNAVAILABLE", "INTERNAL", "ABORTED",
+                     "DEADLINE_EXCEEDED"}
+_THROTTLE_TYPES = {"ResourceExhausted", "TooManyRequests", "RateLimitError"}
+_TRANSIENT_TYPES = {"ServiceUnavailable", "InternalServerError", "BadGateway",
+                    "GatewayTimeout", "DeadlineExceeded", "Aborted", "RequestTimeout",
+                    "TimeoutException", "TransportError", "APIConnectionError",
+                    "APITimeoutError", "ChunkedEncodingError"}
+
+
+class DeadlineExceeded(TimeoutError):
+    """The whole call ran out of time; never retried."""
+
+
+class AttemptTimeout(TimeoutError):
+    """One attempt ran past the per-attempt timeout; retried while the deadline allows."""
+
+
+def _chain(e: Optional[BaseException]):
+    seen = set()
+    while e is not None and id(e) not in seen:
+        seen.add(id(e))
+        yield e
+        e = e.__cause__ or e.__context__
+
+
+def _status(e: BaseException):
+    """HTTP status (int) or gRPC code name (str) of a provider error, if it has one."""
+    for obj in (e, getattr(e, "response", None)):
+        for attr in ("status_code", "code", "grpc_status_code"):
+            v = getattr(obj, attr, None)
+            if callable(v):          # grpc.RpcError.code()
+                try:
+                    v = v()
+                except Exception:
+                    v = None
+            if isinstance(v, int) and 100 <= v < 600:
+                return int(v)
+            if isinstance(getattr(v, "name", None), str):
+                return v.name
+    return None
+
+
+def _type_names(e: BaseException) -> set:
+    return {t.__name__ for t in type(e).__mro__}
+
+
+def _is_throttle(e: BaseException) -> bool:
+    return any(_status(x) in _THROTTLE_STATUS or _type_names(x) & _THROTTLE_TYPES
+               for x in _chain(e))
+
+
+def _is_transient(e: BaseException) -> bool:
+    if isinstance(e, DeadlineExceeded):
+        return False
+    for x in _chain(e):
+        if isinstance(x, (ConnectionError, TimeoutError)):
+            return True
+        if _status(x) in _THROTTLE_STATUS | _TRANSIENT_STATUS:
+            return True
+        if _type_names(x) & (_THROTTLE_TYPES | _TRANSIENT_TYPES):
+            return True
+    return False
+
+
+# ---------- limiters ----------
+
+class TokenBucket:
+    """Refills `per_minute` tokens per minute; capacity = one minute's worth."""
+
+    def __init__(self, per_minute: int):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self._tokens = self.capacity
+        self._ts = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._ts) * self.rate)
+        self._ts = now
+
+    def try_take(self, n: float = 1.0) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= n:
+                self._tokens -= n
+                return True
+            return False
+
+    def take(self, n: float, deadline: Optional[float]) -> None:
+        """Block until `n` tokens are available or the deadline passes."""
+        n = min(float(n), self.capacity)   # a single oversized call must still pass
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= n:
+                    self._tokens -= n
+                    return
+                wait_s = (n - self._tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait_s > deadline:
+                raise DeadlineExceeded("rate limit wait exceeds the call deadline")
+            time.sleep(min(wait_s, 0.25))
+
+
+class AdaptiveConcurrency:
+    """AIMD concurrency limit between 1 and `max_limit`."""
+
+    def __init__(self, max_limit: int, initial: Optional[int] = None):
+        self.max_limit = max(1, int(max_limit))
+        self.limit = float(initial or self.max_limit)
+        self._inflight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, deadline: Optional[float]) -> None:
+        with self._cond:
+            while self._inflight >= int(self.limit):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise DeadlineExceeded("no model slot before the call deadline")
+                self._cond.wait(remaining)
+            self._inflight += 1
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if self._inflight >= int(self.limit):
+                return False
+            self._inflight += 1
+            return True
+
+    def release(self, throttled: bool = False, adjust: bool = True) -> None:
+        """Free a slot; `adjust` feeds the outcome (throttled or not) into the limit."""
+        with self._cond:
+            self._inflight -= 1
+            if adjust and throttled:
+                self.limit = max(1.0, self.limit / 2.0)
+            elif adjust:
+                self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+
+# ---------- gateway ----------
+
+class ModelGateway:
+    """Rate limits, concurrency, deadlines, retries and hedging for one model kind."""
+
+    def __init__(
+        self,
+        name: str,
+        rpm: int = 0,
+        tpm: int = 0,
+        max_concurrency: int = 16,
+        timeout_s: float = 0.0,
+        retries: int = 3,
+        hedge_after_ms: int = 0,
+        backoff_base_s: float = 0.5,
+        backoff_max_s: float = 20.0,
+        attempt_timeout_s: float = 0.0,
+    ):
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self.timeout_s = timeout_s
+        self.attempt_timeout_s = attempt_timeout_s
+        self.retries = retries
+        self.hedge_after_s = hedge_after_ms / 1000.0
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    # -- execution helpers --
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=2 * self.concurrency.max_limit,
+                    thread_name_prefix=f"gw-{self.name}")
+            return self._pool
+
+    def _release_slot(self, future) -> None:
+        e = None if future.cancelled() else future.exception()
+        self.concurrency.release(throttled=e is not None and _is_throttle(e))
+
+    def _submit(self, fn: Callable, args, kwargs):
+        """Run fn on the pool with a slot already held; the slot is freed when fn
+        returns, whether or not anyone is still waiting for it."""
+        ctx = contextvars.copy_context()
+        try:
+            future = self._executor().submit(ctx.run, fn, *args, **kwargs)
+        except BaseException:
+            self.concurrency.release(adjust=False)
+            raise
+        future.add_done_callback(self._release_slot)
+        return future
+
+    def _attempt(self, fn: Callable, args, kwargs, until: Optional[float],
+                 deadline: Optional[float]):
+        """One attempt holding one slot (acquired by the caller).
+        until: when to stop waiting for this attempt; deadline: the whole call's."""
+        # No time limit and no hedging: call inline, nothing to supervise
+        if until is None and not self.hedge_after_s:
+            throttled = False
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                throttled = _is_throttle(e)
+                raise
+            finally:
+                self.concurrency.release(throttled=throttled)
+
+        pending = {self._submit(fn, args, kwargs)}
+        hedged = False
+        first_error: Optional[BaseException] = None
+        while pending:
+            remaining = None if until is None else until - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            timeout = remaining
+            if self.hedge_after_s and not hedged:
+                timeout = self.hedge_after_s if remaining is None else min(remaining, self.hedge_after_s)
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for f in done:
+                if f.exception() is None:
+                    return f.result()
+                first_error = first_error or f.exception()
+            if not done and self.hedge_after_s and not hedged:
+                hedged = True
+                # A hedge needs its own slot and a request token; skip it rather than wait
+                if self.concurrency.try_acquire():
+                    if self.requests is None or self.requests.try_take(1):
+                        record(model_hedges=1)
+                        pending.add(self._submit(fn, args, kwargs))
+                    else:
+                        self.concurrency.release(adjust=False)
+        if first_error is not None and not pending:
+            raise first_error
+        if deadline is not None and until >= deadline:
+            raise DeadlineExceeded(f"{self.name} call exceeded {self.timeout_s:.1f}s")
+        raise AttemptTimeout(f"{self.name} attempt exceeded {self.attempt_timeout_s:.1f}s")
+
+    def _backoff(self, attempt: int, deadline: Optional[float]) -> None:
+        cap = min(self.backoff_max_s, self.backoff_base_s * (2 ** attempt))
+        delay = random.uniform(0, cap)   # full jitter
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            raise DeadlineExceeded(f"{self.name} retries ran past the call deadline")
+        time.sleep(delay)
+
+    # -- public --
+
+    def call(self, fn: Callable, *args, est_tokens: int = 0,
+             timeout_s: Optional[float] = None,
+             attempt_timeout_s: Optional[float] = None, **kwargs) -> Any:
+        """fn(*args, **kwargs) under the gateway policy.
+        timeout_s: deadline for the whole call, retries included (0 = none);
+        attempt_timeout_s: per-attempt timeout, retried (0 = none)."""
+        timeout_s = self.timeout_s if timeout_s is None else timeout_s
+        if attempt_timeout_s is None:
+            attempt_timeout_s = self.attempt_timeout_s
+        deadline = time.monotonic() + timeout_s if timeout_s and timeout_s > 0 else None
+
+        attempt = 0
+        while True:
+            t0 = time.perf_counter()
+            try:
+                if self.requests is not None:
+                    self.requests.take(1, deadline)
+                if self.tokens is not None and est_tokens:
+                    self.tokens.take(est_tokens, deadline)
+                self.concurrency.acquire(deadline)
+            except DeadlineExceeded:
+                record(model_deadline=1)
+                raise
+            record(limiter_wait_ms=(time.perf_counter() - t0) * 1000.0)
+
+            until = deadline
+            if attempt_timeout_s and attempt_timeout_s > 0:
+                until = time.monotonic() + attempt_timeout_s
+                if deadline is not None:
+                    until = min(until, deadline)
+
+            # The slot now belongs to the attempt, which frees it when the provider
+            # call returns (not when we stop waiting)
+            try:
+                return self._attempt(fn, args, kwargs, until, deadline)
+            except DeadlineExceeded:
+                record(model_deadline=1)
+                raise
+            except Exception as e:
+                if _is_throttle(e):
+                    record(model_throttled=1)
+                if isinstance(e, AttemptTimeout):
+                    record(model_attempt_timeouts=1)
+                if attempt >= self.retries or not _is_transient(e):
+                    raise
+
+            record(model_retries=1)
+            try:
+                self._backoff(attempt, deadline)
+            except DeadlineExceeded:
+                record(model_deadline=1)
+                raise
+            attempt += 1
+
+    def stats(self) -> Dict[str, float]:
+        return {"concurrency_limit": round(self.concurrency.limit, 2),
+                "inflight": self.concurrency._inflight}
+
+
+# ---------- shared gateways + model wrappers ----------
+
+_GATEWAYS: Dict[str, ModelGateway] = {}
+_GATEWAYS_LOCK = threading.Lock()
+
+
+def get_gateway(kind: str) -> ModelGateway:
+    """Process-wide gateway for 'llm' or 'embed' (configured from env)."""
+    with _GATEWAYS_LOCK:
+        gw = _GATEWAYS.get(kind)
+        if gw is None:
+            if kind == "llm":
+                gw = ModelGateway("llm", LLM_RPM, LLM_TPM, LLM_MAX_CONCURRENCY,
+                                  LLM_TIMEOUT_S, MODEL_RETRIES, LLM_HEDGE_MS)
+            elif kind == "embed":
+                gw = ModelGateway("embed", EMBED_RPM, EMBED_TPM, EMBED_MAX_CONCURRENCY,
+                                  EMBED_TIMEOUT_S, MODEL_RETRIES, EMBED_HEDGE_MS)
+            else:
+                raise ValueError(f"unknown gateway kind: {kind}")
+            _GATEWAYS[kind] = gw
+        return gw
+
+
+def _est_tokens(obj: Any) -> int:
+    """Cheap token estimate (~4 chars/token) for str, message lists or text batches."""
+    if isinstance(obj, str):
+        return len(obj) // 4 + 1
+    if isinstance(obj, (list, tuple)):
+        return sum(_est_tokens(x) for x in obj)
+    content = getattr(obj, "content", None)
+    return len(content) // 4 + 1 if isinstance(content, str) else 0
+
+
+class GatewayLLM:
+    """Chat model proxy whose invoke() goes through the gateway."""
+
+    def __init__(self, llm, gateway: Optional[ModelGateway] = None):
+        self._llm = llm
+        self._gw = gateway or get_gateway("llm")
+
+    def invoke(self, messages, *args, **kwargs):
+        return self._gw.call(self._llm.invoke, messages, *args,
+                             est_tokens=_est_tokens(messages), **kwargs)
+
+    def __getattr__(self, name: str):
+        return getattr(self._llm, name)
+
+
+class GatewayEmbeddings:
+    """Embeddings proxy whose embed_query/embed_documents go through the gateway.
+    timeout_s / attempt_timeout_s override the gateway's (see ModelGateway.call)."""
+
+    def __init__(self, embeddings, gateway: Optional[ModelGateway] = None,
+                 timeout_s: Optional[float] = None,
+                 attempt_timeout_s: Optional[float] = None):
+        self._emb = embeddings
+        self._gw = gateway or get_gateway("embed")
+        self._limits = {"timeout_s": timeout_s, "attempt_timeout_s": attempt_timeout_s}
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._gw.call(self._emb.embed_query, text, est_tokens=_est_tokens(text),
+                             **self._limits)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._gw.call(self._emb.embed_documents, texts,
+                             est_tokens=_est_tokens(texts), **self._limits)
+
+    def __getattr__(self, name: str):
+        return getattr(self._emb, name)
+
+
+def wrap_llm(llm) -> GatewayLLM:
+    return llm if isinstance(llm, GatewayLLM) else GatewayLLM(llm)
+
+
+def wrap_embeddings(embeddings) -> GatewayEmbeddings:
+    return embeddings if isinstance(embeddings, GatewayEmbeddings) else GatewayEmbeddings(embeddings)
+
+
+def wrap_batch_embeddings(embeddings) -> GatewayEmbeddings:
+    """For ingest: no call deadline, EMBED_BATCH_TIMEOUT_S per attempt (retried)."""
+    if isinstance(embeddings, GatewayEmbeddings):
+        embeddings = embeddings._emb
+    return GatewayEmbeddings(embeddings, timeout_s=0, attempt_timeout_s=EMBED_BATCH_TIMEOUT_S)
@@ -1,23 +1,36 @@
 # agentic_rag/graph.py
+import uuid
+import threading
 from typing import Dict, Any, Optional
 from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 
 from .retrievers.supabase_ann import SupabaseANNRetriever
+from .retrievers.rerank import make_reranker
 from .config import (
-    EMBED_MODEL, GEN_MODEL, STOP_TOKENS, TOP_K,
-    SUPABASE_URL, SUPABASE_KEY, SUPABASE_QUERY, RP_PATH,
+    EMBED_MODEL, GEN_MODEL, STOP_TOKENS, TOP_K, ADAPTIVE_ROUTING, HYDE_MODE,
+    SUPABASE_URL, SUPABASE_KEY, SUPABASE_QUERY, SUPABASE_ARTICLES_TABLE, RP_PATH,
+    EMBED_CACHE_SIZE, EMBED_CACHE_TTL_S, JSON_PATH, ACTIVE_INDEX_PATH,
+    ANN_MMR, MMR_K, MMR_LAMBDA, ANSWER_CACHE_SIZE, CACHE_TTL_S,
 )
-from .indexing import ensure_index
-from .stores import open_vectorstore, build_bm25_from_store
+from .cache import CachedEmbeddings, make_cache
+from .checkpoint import make_checkpointer
+from .docstore import docstore_scope
+from .metrics import (
+    InstrumentedLLM, InstrumentedEmbeddings, instrument_node, run_scope,
+)
+from .gateway import wrap_embeddings, wrap_llm
+from .indexing import ensure_index, index_fingerprint
+from .stores import open_vectorstore, build_bm25_from_store, build_bm25_from_snapshot
+from .ingest.snapshot import is_snapshot
 
 from .nodes.plan import plan
-from .nodes.expand import expand_queries
 from .nodes.retrieve import retrieve
 from .nodes.grade import grade_docs
-from .nodes.generate import generate
+from .nodes.generate import generate, refuse
 from .nodes.verify import verify_or_refine
+from .nodes.memory import contextualize, remember
+
+_EMBED_CACHE = make_cache("embeddings", EMBED_CACHE_SIZE, EMBED_CACHE_TTL_S)
 
 
 class GraphApp:
@@ -25,8 +38,20 @@ class GraphApp:
     Clean Agentic RAG graph:
       - Embeddings: Gemini
       - Generation: Gemini
-      - Retrieval: Supabase ANN (RP 3072->1024) and optional BM25 from Chroma
-      - Planner -> Query Expansion -> Retrieve -> Grade -> Generate -> Verify (loop)
+      - Retrieval: Supabase ANN (RP 3072->1024), candidates reranked on the full
+        3072-d vectors (retrievers/rerank.py), and optional BM25 from Chroma
+      - Planner routes each question to one of:
+          fast   : Retrieve -> Generate
+          full   : Retrieve -> Grade -> Generate -> Verify (loop)
+          refuse : early refusal for questions outside the corpus
+        (the planner also expands the question, in the same structured LLM call)
+      - Per-thread memory: follow-ups are rewritten against the history first
+        (contextualize); each turn ends in `remember`, which keeps a token-bounded
+        history + rolling summary
+      - State carries chunk refs (id / doc_id / score / span); texts stay in a
+        per-request DocStore, so checkpoints never serialize document bodies
+      - Construction is cheap (no network, no index build); warm_up() preloads the
+        RP matrix, Supabase client, Chroma/BM25 and one embedding round-trip
     """
 
     def __init__(
@@ -35,16 +60,30 @@ class GraphApp:
         build_index: bool = False,
         use_supabase: bool = True,   # enable ANN over pgvector (recommended)
         use_chroma: bool = False,    # keep Chroma around for BM25 if you want hybrid
+        # Optional injected backends (offline runs / benchmarks); default to Gemini + Supabase
+        llm=None,
+        embeddings=None,
+        vec_source=None,             # any retriever with the SupabaseANNRetriever interface
     ):
-        # 1) Models
-        self.embeddings = GoogleGenerativeAIEmbeddings(model=EMBED_MODEL)
-        self.llm = ChatGoogleGenerativeAI(
-            model=GEN_MODEL, temperature=0, stop=STOP_TOKENS)
+        # 1) Models: shared gateway (rate limits / retries / deadlines / hedging),
+        #    wrapped to record calls / latency / tokens per node; repeated texts are
+        #    served from the (optionally shared) embedding cache before any call
+        if llm is None or embeddings is None:
+            from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
+            embeddings = embeddings or GoogleGenerativeAIEmbeddings(model=EMBED_MODEL)
+            llm = llm or ChatGoogleGenerativeAI(model=GEN_MODEL, temperature=0, stop=STOP_TOKENS)
+        self._raw_embeddings = embeddings
+        self._model_id = "|".join(
+            str(getattr(m, "model", None) or getattr(m, "model_name", None) or type(m).__name__)
+            for m in (llm, embeddings))
+        self.embeddings = CachedEmbeddings(InstrumentedEmbeddings(wrap_embeddings(
+            embeddings)), _EMBED_CACHE)
+        self.llm = InstrumentedLLM(wrap_llm(llm))
 
         # 2) Retrieval backends
-        # 2a) Supabase ANN (preferred)
-        self.supa: Optional[SupabaseANNRetriever] = None
-        if use_supabase:
+        # 2a) Supabase ANN (preferred) or an injected ANN retriever (e.g. LocalANNRetriever)
+        self.supa: Optional[SupabaseANNRetriever] = vec_source
+        if vec_source is None and use_supabase:
             assert SUPABASE_URL and SUPABASE_KEY and RP_PATH, \
                 "Missing Supabase env vars (SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY or ANON / RP_PATH)."
             self.supa = SupabaseANNRetriever(
@@ -55,68 +94,196 @@ class GraphApp:
                 embedder=self.embeddings,
                 k=TOP_K,
                 probes=20,
+                articles_table=SUPABASE_ARTICLES_TABLE,
+                active_path=ACTIVE_INDEX_PATH,
+                reranker=make_reranker(),
+                mmr_lambda=MMR_LAMBDA if ANN_MMR else None,
+                mmr_k=MMR_K,
             )
 
-        # 2b) Optional Chroma & BM25 (for hybrid with lexical)
+        # 2b) Optional Chroma & BM25 (for hybrid with lexical); opened by warm_up()
+        #     or on the first invoke, whichever comes first
+        self.use_chroma = use_chroma
+        self.build_index = build_index
         self.vs = None
         self.bm25 = None
-        if use_chroma:
-            if build_index:
-                # Build/refresh local Chroma index once (fingerprint-aware)
-                ensure_index(self.embeddings)
-            # Open existing Chroma store
-            self.vs = open_vectorstore(self.embeddings)
-            # Build BM25 from store docs (or return None if there are no docs)
-            self.bm25 = build_bm25_from_store(self.vs)
-
-        # Vector source to hand into the retrieve node (Supabase first, else Chroma)
-        self._vec_source = self.supa if self.supa is not None else self.vs
+
+        # Per-component warm-up state: pending | ok | disabled | error: ...
+        self.components: Dict[str, str] = {
+            "retriever": "pending" if self.supa is not None else "disabled",
+            "lexical": "pending" if use_chroma else "disabled",
+            "embeddings": "pending",
+        }
+        self._warm_lock = threading.Lock()
+
+        # 2c) Final answers of this app, keyed by models + index version + question
+        #     (see _answer_scope); cleared when the local index is rebuilt
+        self.answer_cache = make_cache("answers", ANSWER_CACHE_SIZE, CACHE_TTL_S)
+        self._index_fp = index_fingerprint()
 
         # 3) Graph skeleton
         self.workflow = StateGraph(dict)
 
-        # 4) Nodes
-        self.workflow.add_node("plan", lambda s: plan(self.llm, s))
-        self.workflow.add_node("expand", lambda s: expand_queries(self.llm, s))
-        self.workflow.add_node("retrieve", lambda s: retrieve(
-            s, self._vec_source, self.bm25))
-        self.workflow.add_node("grade", lambda s: grade_docs(self.llm, s))
-        self.workflow.add_node("generate", lambda s: generate(self.llm, s))
-        self.workflow.add_node(
-            "verify", lambda s: verify_or_refine(self.llm, s))
+        # 4) Nodes (each wrapped for per-node wall time / call attribution)
+        nodes = {
+            "contextualize": lambda s: contextualize(
+                self.llm, s, self.answer_cache, self._answer_scope()),
+            "plan": lambda s: plan(self.llm, s),
+            "retrieve": lambda s: retrieve(s, self._vec_source, self.bm25),
+            "grade": lambda s: grade_docs(self.llm, s),
+            "generate": lambda s: generate(self.llm, s),
+            "verify": lambda s: verify_or_refine(self.llm, s),
+            "refuse": refuse,
+            "remember": lambda s: remember(
+                self.llm, s, self.answer_cache, self._answer_scope()),
+        }
+        for name, fn in nodes.items():
+            self.workflow.add_node(name, instrument_node(name, fn))
 
         # 5) Edges
-        self.workflow.add_edge(START, "plan")
-        self.workflow.add_edge("plan", "expand")
-        self.workflow.add_edge("expand", "retrieve")
-        self.workflow.add_edge("retrieve", "grade")
+        self.workflow.add_edge(START, "contextualize")
+        self.workflow.add_conditional_edges(
+            "contextualize",
+            lambda s: "remember" if s.get("route") == "cached" else "plan",
+            {"remember": "remember", "plan": "plan"},
+        )
         self.workflow.add_edge("grade", "generate")
-        self.workflow.add_edge("generate", "verify")
+        self.workflow.add_edge("refuse", "remember")
+        self.workflow.add_edge("remember", END)
+
+        # 5b) Planner routing (fast path / full loop / early refusal)
+        def route_after_plan(state: Dict[str, Any]):
+            route = state.get("route", "full") if ADAPTIVE_ROUTING else "full"
+            return "refuse" if route == "refuse" else "retrieve"
+
+        def is_fast(state: Dict[str, Any]) -> bool:
+            return ADAPTIVE_ROUTING and state.get("route") == "fast"
+
+        self.workflow.add_conditional_edges(
+            "plan",
+            route_after_plan,
+            {"retrieve": "retrieve", "refuse": "refuse"},
+        )
+        self.workflow.add_conditional_edges(
+            "retrieve",
+            lambda s: "generate" if is_fast(s) else "grade",
+            {"generate": "generate", "grade": "grade"},
+        )
+        self.workflow.add_conditional_edges(
+            "generate",
+            lambda s: "remember" if is_fast(s) else "verify",
+            {"verify": "verify", "remember": "remember"},
+        )
 
         # 6) Loop routing after verification
         def route_after_verify(state: Dict[str, Any]):
-            if state.get("loop", 0) and state.get("queries"):
+            if state.get("refine") and state.get("queries"):
                 return "retrieve"
-            return END
+            return "remember"
 
         self.workflow.add_conditional_edges(
             "verify",
             route_after_verify,
-            {"retrieve": "retrieve", END: END},
+            {"retrieve": "retrieve", "remember": "remember"},
         )
 
-        # 7) Compile
-        self.app = self.workflow.compile(checkpointer=MemorySaver())
+        # 7) Compile (checkpointer from CHECKPOINT_BACKEND: memory / sqlite / postgres)
+        self.checkpointer = make_checkpointer()
+        self.app = self.workflow.compile(checkpointer=self.checkpointer)
+
+    @property
+    def _vec_source(self):
+        # Vector source for the retrieve node (Supabase first, else Chroma)
+        return self.supa if self.supa is not None else self.vs
+
+    def _answer_scope(self) -> str:
+        """Models + index version a cached answer is only valid for."""
+        vec = getattr(self._vec_source, "index_version", None)
+        return "|".join((self._model_id, self._index_fp, vec() if callable(vec) else ""))
+
+    def _open_lexical(self) -> None:
+        if self.build_index:
+            # Build/refresh local Chroma index once (fingerprint-aware); answers
+            # produced from the previous index are dropped
+            if ensure_index(self.embeddings):
+                self.answer_cache.clear()
+            self._index_fp = index_fingerprint()
+        # Open existing Chroma store
+        self.vs = open_vectorstore(self.embeddings)
+        # Build BM25 from the corpus snapshot when JSON_PATH is one, else from store docs
+        self.bm25 = (build_bm25_from_snapshot(JSON_PATH) if is_snapshot(JSON_PATH)
+                     else build_bm25_from_store(self.vs))
+
+    def _warm(self, name: str, fn) -> None:
+        try:
+            fn()
+            self.components[name] = "ok"
+        except Exception as e:
+            self.components[name] = f"error: {type(e).__name__}: {e}"[:200]
+
+    def warm_up(self, probe: bool = True) -> Dict[str, str]:
+        """
+        Preload what the first request would otherwise pay for; idempotent, never
+        raises. probe=True also sends one embedding call (bypassing the cache) to
+        open the model connection. Returns the per-component states.
+        """
+        with self._warm_lock:
+            if self.components["retriever"] not in ("ok", "disabled"):
+                self._warm("retriever", getattr(self.supa, "warm_up", lambda: None))
+            if self.components["lexical"] not in ("ok", "disabled"):
+                self._warm("lexical", self._open_lexical)
+            if probe and self.components["embeddings"] != "ok":
+                self._warm("embeddings",
+                           lambda: wrap_embeddings(self._raw_embeddings).embed_query("warm-up"))
+        return dict(self.components)
+
+    def ready(self) -> bool:
+        return all(v in ("ok", "disabled") for v in self.components.values())
+
+    def invoke(
+        self,
+        question: str,
+        thread_id: Optional[str] = None,   # new thread (uuid) when omitted
+        hyde_mode: Optional[str] = None,   # off | mean | max (defaults to HYDE_MODE)
+    ) -> Dict[str, Any]:
+        """
+        Run a single RAG turn on `thread_id`; state['metrics'] holds the per-node
+        breakdown and state['thread_id'] the thread to continue the conversation on.
+        """
+        # Callers that skipped warm_up() (CLI, scripts) open the lexical index here
+        if self.use_chroma and self.bm25 is None:
+            with self._warm_lock:
+                if self.bm25 is None:
+                    self._open_lexical()
+                    self.components["lexical"] = "ok"
+
+        thread_id = thread_id or uuid.uuid4().hex
+        config = {"configurable": {"thread_id": thread_id}}
 
-    def invoke(self, question: str, thread_id: str = "api") -> Dict[str, Any]:
-        """Run a single RAG turn."""
+        # Thread memory carried over from the previous checkpoint
+        prev = self.app.get_state(config).values or {}
         init = {
+            "user_question": question,
             "question": question,
-            "messages": [],
+            "messages": prev.get("messages") or [],
+            "summary": prev.get("summary") or "",
             "queries": [],
-            "docs": [],
-            "graded_docs": [],
+            "doc_refs": [],
+            "graded_refs": [],
             "draft": "",
             "loop": 0,
+            "route": "full",
+            "hyde": None,
+            "hyde_mode": hyde_mode or HYDE_MODE,
+            "searched": [],
+            "grade_memo": {},
+            "refine": False,
+            "verified": False,
         }
-        return self.app.invoke(init, config={"configurable": {"thread_id": thread_id}})
+        with run_scope() as run, docstore_scope() as store:
+            state = self.app.invoke(init, config=config)
+            # Callers (API sources, scripts) get the hydrated documents
+            docs = store.hydrate(state.get("doc_refs"))
+            graded = store.hydrate(state.get("graded_refs"))
+        return {**state, "docs": docs, "graded_docs": graded,
+                "thread_id": thread_id, "metrics": run.as_dict()}
@@ -1,88 +1,69 @@
 from __future__ import annotations
 import os
-import json
-import glob
-import hashlib
 from typing import List
 from langchain_core.documents import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
-from .config import PERSIST_DIR, COLLECTION, JSON_PATH, CHUNK_SIZE, CHUNK_OVERLAP
+from .config import (PERSIST_DIR, COLLECTION, JSON_PATH, CHUNK_SIZE, CHUNK_OVERLAP,
+                     NEAR_DUP_THRESHOLD)
+from .ingest.corpus import corpus_fingerprint, scan
+from .ingest.loaders import _one_doc_from_ncbi_dict, load_ncbi_json_docs
+from .ingest.snapshot import Snapshot, is_snapshot
 
 
-def _sha256_bytes(b: bytes) -> str:
-    import hashlib
-    return hashlib.sha256(b).hexdigest()
+# Part of the stored fingerprint: bump when the text / chunk rules change (one rebuild)
+INDEX_FORMAT = "2"
 
 
 def load_json_docs(path: str) -> List[Document]:
-    files = []
-    if os.path.isdir(path):
-        files = sorted(glob.glob(os.path.join(path, "*.json")))
-    else:
-        files = [path]
+    # same text rules as every other ingest path (ingest/loaders.py)
+    return load_ncbi_json_docs(path)
 
-    docs: List[Document] = []
-    for p in files:
-        with open(p, "rb") as f:
-            raw = f.read()
-        d = json.loads(raw.decode("utf-8"))
-        row = d.get("row", {})
-        scr = d.get("scrape", {})
 
-        title = row.get("\ufeffTitle") or row.get(
-            "Title", "") or scr.get("title", "")
-        link = row.get("Link", "") or scr.get("url", "")
+def _index_fp(corpus_fp: str) -> str:
+    return f"{corpus_fp}:v{INDEX_FORMAT}"
 
-        blocks = [title, link, scr.get("title", ""), scr.get(
-            "abstract", ""), scr.get("full_text", "")]
-        page_content = "\n\n".join([b for b in blocks if b])
-        if not page_content.strip():
-            continue
 
-        docs.append(Document(
-            page_content=page_content,
-            metadata={
-                "url": scr.get("url") or link or None,
-                "doi": scr.get("doi"),
-                "source": os.path.basename(p),
-                "title": title,
-            }
-        ))
-    return docs
+def index_fingerprint() -> str:
+    """Fingerprint of the local index as last built ("" when there is none)."""
+    fp_file = os.path.join(PERSIST_DIR, ".fingerprint")
+    if not os.path.exists(fp_file):
+        return ""
+    with open(fp_file, "r", encoding="utf-8") as f:
+        return f.read().strip()
 
 
-def ensure_index(embeddings) -> None:
+def ensure_index(embeddings) -> bool:
+    """Build the local index when missing or stale; True when it was (re)built."""
     os.makedirs(PERSIST_DIR, exist_ok=True)
     fp_file = os.path.join(PERSIST_DIR, ".fingerprint")
+    old_fp = index_fingerprint() or None
 
-    if os.path.isdir(JSON_PATH):
-        fps = []
-        for p in sorted(glob.glob(os.path.join(JSON_PATH, "*.json"))):
-            with open(p, "rb") as f:
-                fps.append(_sha256_bytes(f.read()))
-        new_fp = _sha256_bytes("".join(fps).encode("utf-8"))
-    else:
-        with open(JSON_PATH, "rb") as f:
-            new_fp = _sha256_bytes(f.read())
-
-    old_fp = None
-    if os.path.exists(fp_file):
-        with open(fp_file, "r", encoding="utf-8") as f:
-            old_fp = f.read().strip()
-
-    needs_build = (not os.path.exists(os.path.join(
-        PERSIST_DIR, "chroma.sqlite3"))) or (new_fp != old_fp)
+    # An existing index only needs the content hashes (no parsing) to be validated;
+    # a corpus snapshot carries its fingerprint in the manifest
+    snap = Snapshot(JSON_PATH) if is_snapshot(JSON_PATH) else None
+    has_index = os.path.exists(os.path.join(PERSIST_DIR, "chroma.sqlite3"))
+    needs_build = not (has_index and old_fp and old_fp == _index_fp(
+        snap.fingerprint if snap else corpus_fingerprint(JSON_PATH)))
 
     if needs_build:
-        docs = load_json_docs(JSON_PATH)
-        if not docs:
+        from langchain_chroma import Chroma
+        from .ingest.chunking import iter_chunks
+        from .ingest.dedup import NearDupFilter, dedup_chunks
+
+        if snap is not None:
+            # Chunks were built (and deduplicated) when the snapshot was written
+            chunks = list(snap.iter_chunks())
+            new_fp = _index_fp(snap.fingerprint)
+        else:
+            # Parse, hash and build documents in a single read of the corpus
+            docs, corpus_fp = scan(JSON_PATH, _one_doc_from_ncbi_dict)
+            new_fp = _index_fp(corpus_fp)
+            dedup = NearDupFilter() if NEAR_DUP_THRESHOLD > 0 else None
+            chunks = list(dedup_chunks(iter_chunks(docs, CHUNK_SIZE, CHUNK_OVERLAP), dedup=dedup))
+            if dedup is not None:
+                print(f"[dedup] {dedup.report()}")
+        if not chunks:
             raise FileNotFoundError("No valid JSON documents found to index.")
 
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
-        chunks = splitter.split_documents(docs)
-
         vs = Chroma.from_documents(
             documents=chunks,
             collection_name=COLLECTION,
@@ -92,3 +73,4 @@ def ensure_index(embeddings) -> None:
 
         with open(fp_file, "w", encoding="utf-8") as f:
             f.write(new_fp)
+    return needs_build
@@ -1,13 +1,154 @@
 # agentic_rag/ingest/chunking.py
-from typing import List
+"""
+Section-aware chunker for the documents built by ingest/loaders.py.
+
+`_one_doc_from_ncbi_dict` lays an article out as
+
+    <header: title / URL / DOI / Authors / Published>
+    Abstract:  ...
+    Headings:  ...
+    Body:      ...
+    Figure captions (from JSON): ...
+
+Chunks never cross a section boundary, except that short neighbouring sections that
+fit in one chunk together share it (section "abstract+headings"). Each chunk records
+`section`, `start` and `end` (character offsets into the article's page_content, so
+content == page_content[start:end]). The header is emitted once, inside the first
+chunk of the article, instead of being overlapped into its neighbours. Pieces cut
+at a paragraph break do not overlap; other cuts overlap by chunk_overlap. Documents
+without section markers (other loaders) are chunked as a single "text" section.
+
+iter_chunks() is a generator, so corpora can be chunked and embedded as a stream.
+"""
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple
 from langchain_core.documents import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from ..config import CHUNK_SIZE, CHUNK_OVERLAP
+
+SECTION_PAT = re.compile(
+    r"^(Abstract|Headings|Body|Figure captions \(from JSON\)):[ \t]*$", re.M)
+SECTION_NAMES = {
+    "Abstract": "abstract",
+    "Headings": "headings",
+    "Body": "body",
+    "Figure captions (from JSON)": "captions",
+}
+# Preferred cut points, best first
+SEPARATORS = ("\n\n", "\n", ". ", " ")
+_WS = " \t\r\n"
+
+
+def _trim(text: str, start: int, end: int) -> Tuple[int, int]:
+    while start < end and text[start] in _WS:
+        start += 1
+    while end > start and text[end - 1] in _WS:
+        end -= 1
+    return start, end
+
+
+def sections(text: str) -> List[Tuple[str, int, int]]:
+    """[(section, start, end)] of non-empty sections; the header comes first."""
+    marks = list(SECTION_PAT.finditer(text))
+    if not marks:
+        s, e = _trim(text, 0, len(text))
+        return [("text", s, e)] if e > s else []
+
+    out: List[Tuple[str, int, int]] = []
+    s, e = _trim(text, 0, marks[0].start())
+    if e > s:
+        out.append(("header", s, e))
+    for i, m in enumerate(marks):
+        nxt = marks[i + 1].start() if i + 1 < len(marks) else len(text)
+        s, e = _trim(text, m.end(), nxt)
+        if e > s:
+            out.append((SECTION_NAMES[m.group(1)], s, e))
+    return out
+
+
+def _cut(text: str, start: int, end: int, size: int) -> Tuple[int, str]:
+    """(end offset, separator) of the next piece of text[start:end], at most `size` chars."""
+    if end - start <= size:
+        return end, ""
+    hi = start + size
+    lo = start + size // 2            # never cut pieces shorter than half a chunk
+    for sep in SEPARATORS:
+        i = text.rfind(sep, lo, hi)
+        if i != -1:
+            return i + (1 if sep == ". " else 0), sep   # keep the full stop
+    return hi, ""
+
+
+def split_span(text: str, start: int, end: int, size: int, overlap: int,
+               floor: int = 0) -> Iterator[Tuple[int, int]]:
+    """
+    Offsets of overlapping pieces of text[start:end], cut at separator boundaries.
+    Once a piece has passed `floor`, later pieces never overlap back before it.
+    """
+    pos = start
+    while pos < end:
+        stop, sep = _cut(text, pos, end, size)
+        s, e = _trim(text, pos, stop)
+        if e > s:
+            yield s, e
+        if stop >= end:
+            break
+        # next piece starts `overlap` chars back, on a word boundary
+        # (paragraph breaks are clean cuts: no overlap)
+        nxt = stop if sep == "\n\n" else max(stop - overlap, pos + 1)
+        if stop > floor:
+            nxt = max(nxt, floor)
+        if nxt != floor and nxt < stop:
+            sp = text.find(" ", nxt, stop)
+            nxt = sp + 1 if sp != -1 else stop
+        pos = nxt
+
+
+def iter_chunks(
+    docs: Iterable[Document],
+    chunk_size: Optional[int] = None,
+    chunk_overlap: Optional[int] = None,
+) -> Iterator[Document]:
+    """Stream section-aware chunks (section / start / end / chunk in metadata)."""
+    size = int(chunk_size or CHUNK_SIZE)
+    overlap = int(CHUNK_OVERLAP if chunk_overlap is None else chunk_overlap)
+    overlap = min(overlap, size // 2)
+
+    for doc in docs:
+        text = doc.page_content or ""
+        secs = sections(text)
+        # 1) The header travels with the first section instead of being its own chunk,
+        #    and no later piece overlaps back into it
+        floor = 0
+        if len(secs) > 1 and secs[0][0] == "header":
+            h_start = secs.pop(0)[1]
+            name, floor, e = secs[0]
+            secs[0] = (name, h_start, e)
+
+        # 2) Short neighbouring sections that fit in one chunk share it ("abstract+headings")
+        merged: List[Tuple[str, int, int]] = []
+        for name, s, e in secs:
+            if merged and e - merged[-1][1] <= size:
+                prev, ps, _ = merged[-1]
+                merged[-1] = (f"{prev}+{name}", ps, e)
+            else:
+                merged.append((name, s, e))
+
+        idx = 0
+        seen = set()
+        for name, s, e in merged:
+            for cs, ce in split_span(text, s, e, size, overlap, floor):
+                piece = text[cs:ce]
+                # 3) Identical pieces inside one article (repeated captions, ...) once
+                if piece in seen:
+                    continue
+                seen.add(piece)
+                yield Document(page_content=piece, metadata={
+                    **(doc.metadata or {}),
+                    "section": name, "start": cs, "end": ce, "chunk": idx,
+                })
+                idx += 1
 
 
-def chunk_docs(docs: List[Document], chunk_size=2000, chunk_overlap=100) -> List[Document]:
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        separators=["\n\n", "\n", ". ", " "],
-    )
-    return splitter.split_documents(docs)
+def chunk_docs(docs: Iterable[Document], chunk_size: Optional[int] = None,
+               chunk_overlap: Optional[int] = None) -> List[Document]:
+    return list(iter_chunks(docs, chunk_size, chunk_overlap))
@@ -0,0 +1,220 @@
+# agentic_rag/ingest/corpus.py
+"""
+Shared reader for the JSON corpus (data/corpus/*.json, one article or a list per file).
+
+One pass per file does everything: read the bytes, sha256 them (the index
+fingerprint), parse them (orjson when installed) and optionally turn each record
+into a Document / text with `build(record, file_basename)`. Files are spread over a
+process pool in batches and come back in file order as a stream, with a bounded
+number of batches in flight.
+
+For repeated runs the corpus can be packed into one JSONL file (pack_corpus):
+a header line with the fingerprint, then one line per source file. Every reader
+here accepts the packed file wherever it accepts a corpus directory; it is
+memory-mapped and its fingerprint is read from the header without hashing.
+"""
+import os
+import glob
+import json
+import mmap
+import hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional, Tuple
+from ..config import CORPUS_WORKERS
+
+try:
+    import orjson
+    _loads, _dumps = orjson.loads, orjson.dumps
+except ImportError:                      # stdlib fallback, same results
+    orjson = None
+    _loads = json.loads
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+PACKED_EXT = ".jsonl"
+_BATCH = 32          # files per worker task
+_IN_FLIGHT = 4       # batches queued per worker
+
+
+class CorpusFile(NamedTuple):
+    name: str             # basename of the source file
+    sha256: str           # hex digest of its raw bytes
+    items: List[Any]      # parsed records, or build(record, name) results (None dropped)
+
+
+def is_packed(path: str) -> bool:
+    return os.path.isfile(path) and path.endswith(PACKED_EXT)
+
+
+def corpus_files(path: str) -> List[str]:
+    """A folder's *.json files (sorted), or the single file itself."""
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, "*.json")))
+    return [path]
+
+
+def fingerprint(hashes: List[str]) -> str:
+    """Corpus fingerprint as ensure_index stores it: sha256 over the per-file digests."""
+    return hashlib.sha256("".join(hashes).encode("utf-8")).hexdigest()
+
+
+def _records(raw: Any) -> List[Any]:
+    return raw if isinstance(raw, list) else [raw]
+
+
+def _apply(build: Optional[Callable], records: List[Any], name: str) -> List[Any]:
+    if build is None:
+        return records
+    out = []
+    for r in records:
+        if isinstance(r, dict):
+            x = build(r, name)
+            if x is not None:
+                out.append(x)
+    return out
+
+
+# ---------- workers (module level: picklable) ----------
+
+def _read_files(paths: List[str], build: Optional[Callable], parse: bool) -> List[CorpusFile]:
+    out = []
+    for p in paths:
+        with open(p, "rb") as f:
+            raw = f.read()
+        name = os.path.basename(p)
+        items = _apply(build, _records(_loads(raw)), name) if parse else []
+        out.append(CorpusFile(name, hashlib.sha256(raw).hexdigest(), items))
+    return out
+
+
+def _read_packed(path: str, start: int, end: int, build: Optional[Callable]) -> List[CorpusFile]:
+    out = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        mm.seek(start)
+        while mm.tell() < end:
+            line = mm.readline()
+            if not line.strip():
+                continue
+            rec = _loads(line)
+            out.append(CorpusFile(rec["name"], rec["sha256"],
+                                  _apply(build, rec["items"], rec["name"])))
+    return out
+
+
+# ---------- scheduling ----------
+
+def _workers(workers: Optional[int], tasks: int) -> int:
+    n = CORPUS_WORKERS if workers is None else workers
+    if n <= 0:
+        n = min(os.cpu_count() or 1, 8)
+    return max(1, min(n, tasks))
+
+
+def _run(fn: Callable, tasks: List[Tuple], workers: int) -> Iterator[CorpusFile]:
+    """fn(*task) for every task, in order; in-process when a pool would not help."""
+    if workers <= 1:
+        for t in tasks:
+            yield from fn(*t)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: deque = deque()
+        it = iter(tasks)
+        for t in it:
+            pending.append(pool.submit(fn, *t))
+            if len(pending) >= workers * _IN_FLIGHT:
+                break
+        while pending:
+            yield from pending.popleft().result()
+            nxt = next(it, None)
+            if nxt is not None:
+                pending.append(pool.submit(fn, *nxt))
+
+
+def _packed_ranges(path: str, parts: int) -> List[Tuple[int, int]]:
+    """Byte ranges of the data lines (header skipped), split on line boundaries."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        mm.readline()
+        start, size = mm.tell(), len(mm)
+        step = max(1, (size - start) // max(1, parts))
+        bounds = [start]
+        while bounds[-1] < size:
+            nl = mm.find(b"\n", min(bounds[-1] + step, size) - 1)
+            bounds.append(size if nl == -1 else nl + 1)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def iter_corpus(
+    path: str,
+    build: Optional[Callable[[dict, str], Any]] = None,
+    workers: Optional[int] = None,
+    max_files: Optional[int] = None,
+) -> Iterator[CorpusFile]:
+    """Stream CorpusFile per source file, in file order (folder, single file or packed)."""
+    if is_packed(path):
+        n = _workers(workers, 1 << 30)
+        ranges = _packed_ranges(path, n * _IN_FLIGHT)
+        stream = _run(_read_packed, [(path, s, e, build) for s, e in ranges],
+                      _workers(workers, len(ranges)))
+        for i, cf in enumerate(stream):
+            if max_files is not None and i >= max_files:
+                break
+            yield cf
+        return
+
+    files = corpus_files(path)[:max_files]
+    batches = [files[i:i + _BATCH] for i in range(0, len(files), _BATCH)]
+    yield from _run(_read_files, [(b, build, True) for b in batches],
+                    _workers(workers, len(batches)))
+
+
+def iter_items(path: str, build: Optional[Callable[[dict, str], Any]] = None,
+               workers: Optional[int] = None, max_files: Optional[int] = None) -> Iterator[Any]:
+    """Flattened records (or build() results) of the whole corpus."""
+    for cf in iter_corpus(path, build, workers, max_files):
+        yield from cf.items
+
+
+def corpus_fingerprint(path: str, workers: Optional[int] = None) -> str:
+    """Content fingerprint without parsing (packed files: read from the header)."""
+    if is_packed(path):
+        with open(path, "rb") as f:
+            return _loads(f.readline())["fingerprint"]
+    files = corpus_files(path)
+    if not os.path.isdir(path):
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    batches = [files[i:i + _BATCH] for i in range(0, len(files), _BATCH)]
+    return fingerprint([cf.sha256 for cf in _run(
+        _read_files, [(b, None, False) for b in batches], _workers(workers, len(batches)))])
+
+
+def pack_corpus(path: str, out_path: str, workers: Optional[int] = None) -> str:
+    """Pack a corpus folder into one JSONL file (written atomically); returns its fingerprint."""
+    tmp = out_path + ".tmp"
+    hashes = []
+    with open(tmp, "wb") as f:
+        f.write(b" " * 256 + b"\n")        # header placeholder, rewritten below
+        for cf in iter_corpus(path, workers=workers):
+            hashes.append(cf.sha256)
+            f.write(_dumps({"name": cf.name, "sha256": cf.sha256, "items": cf.items}) + b"\n")
+        fp = fingerprint(hashes) if os.path.isdir(path) else (hashes[0] if hashes else "")
+        header = _dumps({"packed": 1, "files": len(hashes), "fingerprint": fp})
+        f.seek(0)
+        f.write(header.ljust(256))
+    os.replace(tmp, out_path)
+    return fp
+
+
+def scan(path: str, build: Callable[[dict, str], Any],
+         workers: Optional[int] = None) -> Tuple[List[Any], str]:
+    """(all build() results, fingerprint) in a single read of the corpus."""
+    items, hashes = [], []
+    for cf in iter_corpus(path, build, workers):
+        hashes.append(cf.sha256)
+        items.extend(cf.items)
+    if is_packed(path):
+        return items, corpus_fingerprint(path)
+    fp = fingerprint(hashes) if os.path.isdir(path) else (hashes[0] if hashes else "")
+    return items, fp
@@ -0,0 +1,131 @@
+# agentic_rag/ingest/dedup.py
+"""
+Near-duplicate chunk filter for ingestion (MinHash + LSH banding).
+
+Scraped boilerplate, figure captions repeated across articles and papers listed
+under several URLs would otherwise be embedded and stored once per copy. The filter
+runs on the chunk stream before embedding:
+
+  1) exact duplicates (normalized text hash) are dropped right away,
+  2) every other chunk gets a MinHash signature over word shingles,
+  3) LSH bands propose candidates among the chunks kept so far; a candidate whose
+     estimated Jaccard similarity is >= threshold makes the new chunk a duplicate.
+
+The first occurrence is kept (streaming: later copies are dropped, counted in
+`stats`). Signatures are deterministic (crc32 shingles, seeded permutations), so
+reruns drop the same chunks.
+"""
+import re
+import zlib
+import hashlib
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from ..config import NEAR_DUP_THRESHOLD
+
+_WORD = re.compile(r"\w+")
+_PRIME = np.uint64(4294967311)   # smallest prime > 2**32
+
+
+def _bands_for(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """(bands, rows) with bands * rows == num_perm whose S-curve midpoint is closest to threshold."""
+    options = [(num_perm // r, r) for r in range(1, num_perm + 1) if num_perm % r == 0]
+    return min(options, key=lambda br: abs((1.0 / br[0]) ** (1.0 / br[1]) - threshold))
+
+
+class NearDupFilter:
+    """Streaming MinHash/LSH near-duplicate detector over chunk texts."""
+
+    def __init__(self, threshold: float = NEAR_DUP_THRESHOLD, num_perm: int = 128,
+                 shingle: int = 4, seed: int = 1):
+        self.threshold = float(threshold)
+        self.num_perm = int(num_perm)
+        self.shingle = int(shingle)
+        self.bands, self.rows = _bands_for(self.threshold, self.num_perm)
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 2 ** 32, size=(self.num_perm, 1), dtype=np.uint64)
+        self._b = rng.randint(0, 2 ** 32, size=(self.num_perm, 1), dtype=np.uint64)
+
+        self._exact: set = set()
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        self._sigs: List[np.ndarray] = []
+        self._keys: List[Optional[str]] = []
+        self.stats = {"seen": 0, "kept": 0, "exact": 0, "near": 0}
+
+    # ---------- signatures ----------
+
+    def _shingles(self, text: str) -> np.ndarray:
+        words = _WORD.findall(text.lower())
+        k = self.shingle
+        grams = [" ".join(words[i:i + k]) for i in range(max(1, len(words) - k + 1))]
+        return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams),
+                           dtype=np.uint64, count=len(grams))
+
+    def signature(self, text: str) -> np.ndarray:
+        x = self._shingles(text)[None, :]                       # (1, n)
+        h = (self._a * x + self._b) % _PRIME                    # (num_perm, n)
+        return h.min(axis=1).astype(np.uint32)
+
+    @staticmethod
+    def _norm_hash(text: str) -> bytes:
+        return hashlib.blake2b(" ".join(_WORD.findall(text.lower())).encode("utf-8"),
+                               digest_size=16).digest()
+
+    # ---------- index ----------
+
+    def check(self, text: str, key: Optional[str] = None) -> Optional[str]:
+        """
+        Register `text`; returns None if it is new, else the key of the kept chunk it
+        duplicates ("" when that chunk had no key).
+        """
+        self.stats["seen"] += 1
+        h = self._norm_hash(text)
+        if h in self._exact:
+            self.stats["exact"] += 1
+            return ""
+        sig = self.signature(text)
+        r = self.rows
+        bands = [(i, sig[i * r:(i + 1) * r].tobytes()) for i in range(self.bands)]
+
+        seen_ids = set()
+        for band in bands:
+            for j in self._buckets.get(band, ()):
+                if j in seen_ids:
+                    continue
+                seen_ids.add(j)
+                if float(np.mean(self._sigs[j] == sig)) >= self.threshold:
+                    self.stats["near"] += 1
+                    return self._keys[j] or ""
+
+        idx = len(self._sigs)
+        self._exact.add(h)
+        self._sigs.append(sig)
+        self._keys.append(key)
+        for band in bands:
+            self._buckets.setdefault(band, []).append(idx)
+        self.stats["kept"] += 1
+        return None
+
+    def filter(self, chunks: Iterable[Document]) -> Iterator[Document]:
+        """Yield the chunks that are not (near-)duplicates of an earlier one."""
+        for d in chunks:
+            md = d.metadata or {}
+            key = f"{md.get('doc_id')}#{md.get('chunk')}" if md.get("doc_id") else None
+            if self.check(d.page_content, key) is None:
+                yield d
+
+    def report(self) -> str:
+        s = self.stats
+        dropped = s["exact"] + s["near"]
+        pct = 100.0 * dropped / s["seen"] if s["seen"] else 0.0
+        return (f"kept {s['kept']}/{s['seen']} chunks, dropped {dropped} ({pct:.1f}%: "
+                f"{s['exact']} exact, {s['near']} near-duplicate at J>={self.threshold:g})")
+
+
+def dedup_chunks(chunks: Iterable[Document], threshold: Optional[float] = None,
+                 dedup: Optional[NearDupFilter] = None) -> Iterator[Document]:
+    """Stream `chunks` through a NearDupFilter; threshold <= 0 disables filtering."""
+    threshold = NEAR_DUP_THRESHOLD if threshold is None else threshold
+    if dedup is None and threshold <= 0:
+        return iter(chunks)
+    return (dedup or NearDupFilter(threshold)).filter(chunks)
@@ -1,12 +1,12 @@
 # agentic_rag/ingest/loaders.py
-import os
-import json
-import glob
 import re
 import hashlib
 from urllib.parse import urlparse
-from typing import List, Dict, Any
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional
 from langchain_core.documents import Document
+from ..source_cards import annotate_visuals
+from .corpus import iter_items as iter_corpus_items
 
 # filter out base64, obvious sprite paths and svg icons
 ICON_HOST_PAT = re.compile(r"(^data:)|(/static/img/)|(\.svg($|\?))", re.I)
@@ -73,90 +73,105 @@ def _stable_doc_id(payload: Dict[str, Any], fallback: str) -> str:
     return h.hexdigest()
 
 
-def _one_doc_from_ncbi_dict(d: Dict[str, Any], file_basename: str) -> Document | None:
+def article_fields(d: Dict[str, Any], file_basename: str) -> Dict[str, Any]:
+    """
+    Normalized fields of one raw NCBI record. These are the single source of the
+    article text (article_text) and the columns of the corpus snapshot (snapshot.py).
+    """
     row, scr = d.get("row", {}) or {}, d.get("scrape", {}) or {}
 
     title = (row.get("\ufeffTitle") or row.get(
         "Title") or scr.get("title") or "").strip()
     link = (row.get("Link") or scr.get("url") or "").strip()
-    abstract = (scr.get("abstract") or "").strip()
-    full_text = (scr.get("full_text") or "").strip()
 
-    doi = (scr.get("doi") or "").strip()
-    pub_date = (scr.get("publication_date") or "").strip()
-    authors = [a for a in _listify(
-        scr.get("authors")) if isinstance(a, str) and a.strip()]
-    headings = [h for h in _listify(
-        scr.get("headings")) if isinstance(h, str) and h.strip()]
+    return {
+        "title": title,
+        "url": link,
+        "doi": (scr.get("doi") or "").strip(),
+        "publication_date": (scr.get("publication_date") or "").strip(),
+        "authors": [a for a in _listify(
+            scr.get("authors")) if isinstance(a, str) and a.strip()],
+        "headings": [h for h in _listify(
+            scr.get("headings")) if isinstance(h, str) and h.strip()],
+        "abstract": (scr.get("abstract") or "").strip(),
+        "body": (scr.get("full_text") or "").strip(),
+        "images": _norm_images(scr.get("images")),
+        "source": file_basename,
+    }
+
 
-    images = _norm_images(scr.get("images"))
+def article_text(f: Dict[str, Any]) -> str:
+    """The article layout the chunker expects (header, Abstract/Headings/Body/captions)."""
     captions_text = "\n".join(
-        f"[image] {img['caption']}" for img in images if img["caption"])
+        f"[image] {img['caption']}" for img in f["images"] if img["caption"])
+    headings = f["headings"]
 
     blocks = [
-        title,
-        f"URL: {link}" if link else "",
-        f"DOI: {doi}" if doi else "",
-        f"Authors: {', '.join(authors)}" if authors else "",
-        f"Published: {pub_date}" if pub_date else "",
+        f["title"],
+        f"URL: {f['url']}" if f["url"] else "",
+        f"DOI: {f['doi']}" if f["doi"] else "",
+        f"Authors: {', '.join(f['authors'])}" if f["authors"] else "",
+        f"Published: {f['publication_date']}" if f["publication_date"] else "",
         "",
         "Abstract:",
-        abstract,
+        f["abstract"],
         "",
         "Headings:",
         "\n".join(headings[:30]) if headings else "",
         "",
         "Body:",
-        full_text,
+        f["body"],
         "",
         "Figure captions (from JSON):",
         captions_text,
     ]
-    content = "\n".join(b for b in blocks if b is not None)
+    return "\n".join(b for b in blocks if b is not None)
 
+
+def doc_from_fields(f: Dict[str, Any]) -> Document | None:
+    content = article_text(f)
     if not content.strip():
         return None
 
+    title, link, doi, pub_date = f["title"], f["url"], f["doi"], f["publication_date"]
     meta = {
         "title": title,
         "url": link,
         "doi": doi or None,
         "publication_date": pub_date or None,
-        "authors": authors or None,
-        "headings": headings or None,
-        "images": [img["url"] for img in images] or None,
-        "source": file_basename,
+        "authors": f["authors"] or None,
+        "headings": f["headings"] or None,
+        "images": [img["url"] for img in f["images"]] or None,
+        "source": f["source"],
     }
     meta["doc_id"] = _stable_doc_id(
         {**meta, "url": link, "doi": doi, "title": title,
-            "publication_date": pub_date, "source": file_basename},
-        file_basename,
+            "publication_date": pub_date, "source": f["source"]},
+        f["source"],
     )
+    # Source-card visuals once per article; every chunk inherits them
+    annotate_visuals(meta)
 
     return Document(page_content=content, metadata=meta)
 
 
+def _one_doc_from_ncbi_dict(d: Dict[str, Any], file_basename: str) -> Document | None:
+    return doc_from_fields(article_fields(d, file_basename))
+
+
+def iter_corpus_docs(path_or_file: str, max_files: Optional[int] = None) -> Iterator[Document]:
+    """Stream article Documents from a corpus snapshot, a packed corpus, a folder or a file."""
+    from .snapshot import Snapshot, is_snapshot
+    if is_snapshot(path_or_file):
+        docs = Snapshot(path_or_file).documents()
+        return islice(docs, max_files) if max_files is not None else docs
+    return iter_corpus_items(path_or_file, _one_doc_from_ncbi_dict, max_files=max_files)
+
+
 def load_ncbi_json_docs(path_or_file: str) -> List[Document]:
     """
-    Loads one file or a folder of files and returns a list[Document].
+    Loads one file, a folder of files, a packed corpus (ingest/corpus.py) or a
+    corpus snapshot (ingest/snapshot.py) and returns a list[Document].
     Supports files whose root is either a dict or a list[dict].
     """
-    files = [path_or_file]
-    if os.path.isdir(path_or_file):
-        files = sorted(glob.glob(os.path.join(path_or_file, "*.json")))
-
-    docs: List[Document] = []
-    for p in files:
-        with open(p, "r", encoding="utf-8") as f:
-            raw = json.load(f)
-
-        items = raw if isinstance(raw, list) else [raw]
-        base = os.path.basename(p)
-
-        for idx, d in enumerate(items):
-            if not isinstance(d, dict):
-                continue
-            doc = _one_doc_from_ncbi_dict(d, base)
-            if doc:
-                docs.append(doc)
-    return docs
+    return list(iter_corpus_docs(path_or_file))
@@ -0,0 +1,239 @@
+# agentic_rag/ingest/snapshot.py
+"""
+Columnar corpus snapshot: the canonical ingest artifact (Parquet, read memory-mapped).
+
+One ingest step (write_snapshot / scripts/build_snapshot.py) parses the raw JSON once,
+applies the loader's text rules, chunks and deduplicates, optionally embeds, and writes
+
+    <dir>/manifest.json     fingerprint, chunking params, counts, embedding model/dim/dtype
+    <dir>/articles.parquet  doc_id, source, file_sha256, normalized fields (title, url,
+                            doi, publication_date, authors, headings, abstract, body,
+                            image_urls, image_captions), text, content_sha256, metadata
+    <dir>/chunks.parquet    doc_id, chunk, section, start, end, content_sha256,
+                            [embedding: fixed_size_list<float32|float16>[dim]]
+
+Chunk text is not stored: it is articles.text[start:end]. Indexing, PCA/RP fitting,
+BM25 and evaluation accept the snapshot directory wherever they accept JSON_PATH,
+and stored embeddings are reused instead of calling the model again.
+
+pyarrow is only imported when a snapshot is written or opened.
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import numpy as np
+from langchain_core.documents import Document
+from ..config import CHUNK_SIZE, CHUNK_OVERLAP, NEAR_DUP_THRESHOLD
+from .corpus import corpus_fingerprint, fingerprint, iter_corpus
+from .loaders import article_fields, doc_from_fields
+from .chunking import iter_chunks
+from .dedup import NearDupFilter, dedup_chunks
+
+MANIFEST = "manifest.json"
+ARTICLES = "articles.parquet"
+CHUNKS = "chunks.parquet"
+SNAPSHOT_VERSION = 1
+
+
+def is_snapshot(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def _pa():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Corpus snapshots need pyarrow (pip install pyarrow).") from e
+    return pa, pq
+
+
+def _sha(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# ---------- write ----------
+
+def write_snapshot(
+    corpus_path: str,
+    out_dir: str,
+    chunk_size: Optional[int] = None,
+    chunk_overlap: Optional[int] = None,
+    near_dup_threshold: Optional[float] = None,
+    embed: Optional[Callable[[List[str]], List[List[float]]]] = None,
+    embed_model: Optional[str] = None,        # label stored in the manifest, e.g. "ollama:mxbai-embed-large"
+    embed_dtype: str = "float32",             # float32 | float16
+    embed_batch: int = 256,
+) -> Dict[str, Any]:
+    """Build the snapshot from a raw/packed corpus; replaces out_dir atomically. Returns the manifest."""
+    pa, pq = _pa()
+    size = int(chunk_size or CHUNK_SIZE)
+    overlap = int(CHUNK_OVERLAP if chunk_overlap is None else chunk_overlap)
+    threshold = NEAR_DUP_THRESHOLD if near_dup_threshold is None else near_dup_threshold
+
+    # 1) Parse + hash in one pass; normalized fields -> canonical documents
+    arts: Dict[str, List[Any]] = {k: [] for k in (
+        "doc_id", "source", "file_sha256", "title", "url", "doi", "publication_date",
+        "authors", "headings", "abstract", "body", "image_urls", "image_captions",
+        "text", "content_sha256", "metadata")}
+    docs: List[Document] = []
+    hashes: List[str] = []
+    for cf in iter_corpus(corpus_path, article_fields):
+        hashes.append(cf.sha256)
+        for f in cf.items:
+            doc = doc_from_fields(f)
+            if doc is None:
+                continue
+            md = doc.metadata
+            for k in ("title", "url", "doi", "publication_date", "authors",
+                      "headings", "abstract", "body", "source"):
+                arts[k].append(f[k])
+            arts["doc_id"].append(md["doc_id"])
+            arts["file_sha256"].append(cf.sha256)
+            arts["image_urls"].append([img["url"] for img in f["images"]])
+            arts["image_captions"].append([img["caption"] for img in f["images"]])
+            arts["text"].append(doc.page_content)
+            arts["content_sha256"].append(_sha(doc.page_content))
+            arts["metadata"].append(json.dumps(md, ensure_ascii=False))
+            docs.append(doc)
+    fp = fingerprint(hashes) if os.path.isdir(corpus_path) else corpus_fingerprint(corpus_path)
+
+    # 2) Chunk spans (near-duplicates dropped before anything is embedded)
+    dedup = NearDupFilter(threshold) if threshold > 0 else None
+    chunks = list(dedup_chunks(iter_chunks(docs, size, overlap), dedup=dedup))
+    cols: Dict[str, Any] = {
+        "doc_id": [c.metadata["doc_id"] for c in chunks],
+        "chunk": pa.array([c.metadata["chunk"] for c in chunks], pa.int32()),
+        "section": [c.metadata["section"] for c in chunks],
+        "start": pa.array([c.metadata["start"] for c in chunks], pa.int32()),
+        "end": pa.array([c.metadata["end"] for c in chunks], pa.int32()),
+        "content_sha256": [_sha(c.page_content) for c in chunks],
+    }
+
+    # 3) Optional embeddings, stored as fixed-size lists
+    emb_info = None
+    if embed is not None and chunks:
+        texts = [c.page_content for c in chunks]
+        vecs = []
+        for i in range(0, len(texts), embed_batch):
+            vecs.extend(embed(texts[i:i + embed_batch]))
+        X = np.asarray(vecs, dtype=np.float32).astype(embed_dtype)
+        value_type = pa.float16() if X.dtype == np.float16 else pa.float32()
+        cols["embedding"] = pa.FixedSizeListArray.from_arrays(
+            pa.array(X.ravel(), type=value_type), X.shape[1])
+        emb_info = {"model": embed_model, "dim": int(X.shape[1]), "dtype": str(X.dtype)}
+
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "fingerprint": fp,
+        "created": int(time.time()),
+        "chunk_size": size,
+        "chunk_overlap": overlap,
+        "near_dup_threshold": threshold,
+        "articles": len(docs),
+        "chunks": len(chunks),
+        "dedup": dict(dedup.stats) if dedup is not None else None,
+        "embedding": emb_info,
+    }
+
+    # 4) Write next to the target, then swap it in
+    tmp = out_dir.rstrip("/") + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    pq.write_table(pa.table(arts), os.path.join(tmp, ARTICLES), compression="zstd")
+    pq.write_table(pa.table(cols), os.path.join(tmp, CHUNKS), compression="zstd")
+    with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    old = out_dir.rstrip("/") + ".old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(out_dir):
+        os.replace(out_dir, old)
+    os.replace(tmp, out_dir)
+    shutil.rmtree(old, ignore_errors=True)
+    return manifest
+
+
+# ---------- read ----------
+
+class Snapshot:
+    """Read side of a snapshot directory; tables are memory-mapped and read lazily."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST), "r", encoding="utf-8") as f:
+            self.manifest: Dict[str, Any] = json.load(f)
+        self._articles = None
+        self._chunks = None
+
+    def _table(self, name: str, columns: Optional[List[str]] = None):
+        _, pq = _pa()
+        return pq.read_table(os.path.join(self.path, name), columns=columns, memory_map=True)
+
+    @property
+    def fingerprint(self) -> str:
+        return self.manifest["fingerprint"]
+
+    @property
+    def embedding_model(self) -> Optional[str]:
+        return (self.manifest.get("embedding") or {}).get("model")
+
+    @property
+    def articles(self):
+        if self._articles is None:
+            self._articles = self._table(ARTICLES)
+        return self._articles
+
+    @property
+    def chunks(self):
+        if self._chunks is None:
+            self._chunks = self._table(CHUNKS, ["doc_id", "chunk", "section", "start",
+                                                "end", "content_sha256"])
+        return self._chunks
+
+    def column(self, name: str) -> List[Any]:
+        """One article column as a Python list (e.g. "text", "abstract", "title")."""
+        return self.articles.column(name).to_pylist()
+
+    def documents(self) -> Iterator[Document]:
+        """Article Documents, identical to what the loader builds from the raw JSON."""
+        texts, metas = self.column("text"), self.column("metadata")
+        for text, md in zip(texts, metas):
+            yield Document(page_content=text, metadata=json.loads(md))
+
+    def _spans(self) -> Iterator[Dict[str, Any]]:
+        ids = self.articles.column("doc_id").to_pylist()
+        pos = {d: i for i, d in enumerate(ids)}
+        t = self.chunks
+        for row in zip(*(t.column(k).to_pylist() for k in
+                         ("doc_id", "chunk", "section", "start", "end"))):
+            yield dict(zip(("doc_id", "chunk", "section", "start", "end"), row), _i=pos[row[0]])
+
+    def chunk_texts(self) -> List[str]:
+        texts = self.column("text")
+        return [texts[s["_i"]][s["start"]:s["end"]] for s in self._spans()]
+
+    def iter_chunks(self) -> Iterator[Document]:
+        """Chunk Documents in stored order, as iter_chunks + dedup produced them."""
+        texts, metas = self.column("text"), self.column("metadata")
+        cache: Dict[int, Dict[str, Any]] = {}
+        for s in self._spans():
+            i = s.pop("_i")
+            md = cache.get(i)
+            if md is None:
+                cache.clear()
+                md = cache[i] = json.loads(metas[i])
+            yield Document(page_content=texts[i][s["start"]:s["end"]],
+                           metadata={**md, "section": s["section"], "start": s["start"],
+                                     "end": s["end"], "chunk": s["chunk"]})
+
+    def embeddings(self, dtype=np.float32) -> Optional[np.ndarray]:
+        """(n_chunks, dim) matrix of the stored embeddings, or None."""
+        info = self.manifest.get("embedding")
+        if not info:
+            return None
+        col = self._table(CHUNKS, ["embedding"]).column("embedding").combine_chunks()
+        flat = col.values.to_numpy(zero_copy_only=False)
+        return flat.reshape(len(col), info["dim"]).astype(dtype, copy=False)
@@ -0,0 +1,239 @@
+# agentic_rag/metrics.py
+"""
+Lightweight instrumentation for the agentic graph.
+
+- Per-turn counters (RunMetrics) grouped by the graph node that was running,
+  attached to the final state as state['metrics'].
+- Process-wide totals rendered in the Prometheus text format for /metrics
+  (no client library needed).
+
+Attribution uses context variables: GraphApp.invoke opens a run scope and each
+node wrapper marks the current node, so model/embedding/RPC wrappers only need
+to call record().
+"""
+from __future__ import annotations
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+_current_run: ContextVar[Optional["RunMetrics"]] = ContextVar(
+    "rag_run_metrics", default=None)
+_current_node: ContextVar[str] = ContextVar("rag_node", default="other")
+
+# ---- process-wide totals (Prometheus export) ---------------------------------
+
+_TOTALS: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+_TOTALS_LOCK = threading.Lock()
+_CACHES: Dict[str, Any] = {}   # name -> object with .stats()
+
+# counter name -> (prometheus metric, help text)
+_EXPORTED = {
+    "runs": ("rag_node_runs_total", "Graph node executions"),
+    "wall_ms": ("rag_node_wall_ms_total", "Wall time spent in graph nodes (ms)"),
+    "llm_calls": ("rag_llm_calls_total", "LLM calls"),
+    "llm_ms": ("rag_llm_ms_total", "Time spent in LLM calls (ms)"),
+    "input_tokens": ("rag_llm_input_tokens_total", "LLM input tokens"),
+    "output_tokens": ("rag_llm_output_tokens_total", "LLM output tokens"),
+    "embed_calls": ("rag_embed_calls_total", "Embedding calls"),
+    "embed_ms": ("rag_embed_ms_total", "Time spent in embedding calls (ms)"),
+    "rpc_calls": ("rag_retrieval_rpc_calls_total", "Vector store RPC calls"),
+    "rpc_ms": ("rag_retrieval_rpc_ms_total", "Time spent in vector store RPCs (ms)"),
+    "rows": ("rag_retrieval_rows_total", "Rows returned by vector store RPCs"),
+    "rpc_bytes": ("rag_retrieval_bytes_total", "Payload bytes returned by vector store RPCs"),
+    "rerank_ms": ("rag_rerank_ms_total", "Time spent reranking ANN candidates (ms)"),
+    "rerank_full": ("rag_rerank_full_vectors_total", "Candidates rescored on full vectors"),
+    "rerank_scored": ("rag_rerank_cross_encoder_pairs_total", "Candidates scored by the cross-encoder"),
+    "article_fetches": ("rag_article_fetches_total", "Article metadata lookups (cache misses)"),
+    "cache_hits": ("rag_cache_hits_total", "Cache hits"),
+    "cache_misses": ("rag_cache_misses_total", "Cache misses"),
+    "model_retries": ("rag_model_retries_total", "Model calls retried after a transient error"),
+    "model_throttled": ("rag_model_throttled_total", "Model calls rejected by the provider (429)"),
+    "model_deadline": ("rag_model_deadline_exceeded_total", "Model calls that hit their deadline"),
+    "model_attempt_timeouts": ("rag_model_attempt_timeouts_total", "Model call attempts that timed out (retried)"),
+    "model_hedges": ("rag_model_hedges_total", "Hedged (duplicate) model requests issued"),
+    "limiter_wait_ms": ("rag_model_limiter_wait_ms_total", "Time spent waiting on client-side rate limits (ms)"),
+    "queue_ms": ("rag_queue_wait_ms_total", "Time requests waited for a route slot (ms)"),
+    "rejected": ("rag_requests_rejected_total", "Requests rejected with 429 (overload)"),
+}
+
+
+def _bump_totals(node: str, inc: Dict[str, float]) -> None:
+    with _TOTALS_LOCK:
+        for name, val in inc.items():
+            key = (name, (("node", node),))
+            _TOTALS[key] = _TOTALS.get(key, 0.0) + float(val)
+
+
+def register_cache(name: str, cache: Any) -> None:
+    """Expose a cache's .stats() (hits / misses / size) on /metrics."""
+    _CACHES[name] = cache
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: c.stats() for name, c in _CACHES.items()}
+
+
+# ---- per-turn metrics ----------------------------------------------------------
+
+class RunMetrics:
+    """Counters for one graph turn, keyed by node name."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.nodes: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, node: str, inc: Dict[str, float]) -> None:
+        with self._lock:
+            bucket = self.nodes.setdefault(node, {})
+            for name, val in inc.items():
+                bucket[name] = bucket.get(name, 0.0) + float(val)
+
+    def total(self, name: str) -> float:
+        """Counter `name` summed over all nodes of this turn."""
+        with self._lock:
+            return sum(b.get(name, 0.0) for b in self.nodes.values())
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            nodes = {n: {k: round(v, 3) for k, v in b.items()}
+                     for n, b in self.nodes.items()}
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000.0, 3),
+            "nodes": nodes,
+        }
+
+
+def record(**inc: float) -> None:
+    """Add counters to the current node of the current run (and to process totals)."""
+    node = _current_node.get()
+    run = _current_run.get()
+    if run is not None:
+        run.add(node, inc)
+    _bump_totals(node, inc)
+
+
+def run_total(name: str) -> float:
+    """Counter `name` spent so far in the current run (0.0 outside a run scope)."""
+    run = _current_run.get()
+    return run.total(name) if run is not None else 0.0
+
+
+@contextmanager
+def run_scope() -> Iterator[RunMetrics]:
+    run = RunMetrics()
+    token = _current_run.set(run)
+    try:
+        yield run
+    finally:
+        _current_run.reset(token)
+
+
+@contextmanager
+def node_scope(name: str) -> Iterator[None]:
+    token = _current_node.set(name)
+    try:
+        yield
+    finally:
+        _current_node.reset(token)
+
+
+def instrument_node(name: str, fn: Callable[[Dict[str, Any]], Dict[str, Any]]):
+    """Wrap a graph node: attribute nested calls to `name` and record its wall time."""
+    def wrapped(state: Dict[str, Any]) -> Dict[str, Any]:
+        with node_scope(name):
+            t0 = time.perf_counter()
+            try:
+                return fn(state)
+            finally:
+                record(runs=1, wall_ms=(time.perf_counter() - t0) * 1000.0)
+    return wrapped
+
+
+# ---- model wrappers --------------------------------------------------------------
+
+class InstrumentedLLM:
+    """Chat model proxy that records call count, latency and token usage."""
+
+    def __init__(self, llm):
+        self._llm = llm
+
+    def invoke(self, *args, **kwargs):
+        t0 = time.perf_counter()
+        res = self._llm.invoke(*args, **kwargs)
+        usage = getattr(res, "usage_metadata", None) or {}
+        record(
+            llm_calls=1,
+            llm_ms=(time.perf_counter() - t0) * 1000.0,
+            input_tokens=usage.get("input_tokens", 0) or 0,
+            output_tokens=usage.get("output_tokens", 0) or 0,
+        )
+        return res
+
+    def __getattr__(self, name: str):
+        return getattr(self._llm, name)
+
+
+class InstrumentedEmbeddings:
+    """Embeddings proxy that records call count and latency."""
+
+    def __init__(self, embeddings):
+        self._emb = embeddings
+
+    def embed_query(self, text: str) -> List[float]:
+        t0 = time.perf_counter()
+        try:
+            return self._emb.embed_query(text)
+        finally:
+            record(embed_calls=1, embed_ms=(time.perf_counter() - t0) * 1000.0)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        t0 = time.perf_counter()
+        try:
+            return self._emb.embed_documents(texts)
+        finally:
+            record(embed_calls=1, embed_ms=(time.perf_counter() - t0) * 1000.0)
+
+    def __getattr__(self, name: str):
+        return getattr(self._emb, name)
+
+
+# ---- Prometheus text export --------------------------------------------------------
+
+def _fmt_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{v}"' for k, v in labels)
+    return "{" + inner + "}"
+
+
+def render_prometheus() -> str:
+    """Process totals + cache hit ratios in Prometheus exposition format (v0.0.4)."""
+    with _TOTALS_LOCK:
+        snapshot = dict(_TOTALS)
+
+    lines: List[str] = []
+    for name, (metric, help_text) in _EXPORTED.items():
+        series = [(labels, v) for (n, labels), v in snapshot.items() if n == name]
+        if not series:
+            continue
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        for labels, v in sorted(series):
+            lines.append(f"{metric}{_fmt_labels(labels)} {v}")
+
+    stats = cache_stats()
+    if stats:
+        lines.append("# HELP rag_cache_hit_ratio Cache hit ratio since start")
+        lines.append("# TYPE rag_cache_hit_ratio gauge")
+        for name, st in sorted(stats.items()):
+            ratio = st.get("hit_rate")
+            lines.append(
+                f'rag_cache_hit_ratio{{cache="{name}"}} {ratio if ratio is not None else "NaN"}')
+        lines.append("# HELP rag_cache_entries Cache entries")
+        lines.append("# TYPE rag_cache_entries gauge")
+        for name, st in sorted(stats.items()):
+            lines.append(f'rag_cache_entries{{cache="{name}"}} {st.get("size", 0)}')
+    return "\n".join(lines) + "\n"
@@ -1,9 +1,13 @@
 import re
-from typing import Dict, Any
+from typing import Dict, Any, List, TYPE_CHECKING
+from langchain_core.documents import Document
 from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_ollama.chat_models import ChatOllama
+from ..docstore import current_docstore
 from ..utils import scrub_think, cite_block
 
+if TYPE_CHECKING:   # type hints only; the app may run any chat model
+    from langchain_ollama.chat_models import ChatOllama
+
 
 def _normalize_sources(draft: str, cites: str) -> str:
     """
@@ -17,11 +21,31 @@ def _normalize_sources(draft: str, cites: str) -> str:
     return body + "\n\nSources:\n" + cites
 
 
-def generate(llm: ChatOllama, state: Dict[str, Any]) -> Dict[str, Any]:
+def _context_docs(state: Dict[str, Any]) -> List[Document]:
+    """Graded chunks on the full loop; the fast path skips grading and uses retrieved ones."""
+    if state.get("route") == "fast":
+        refs = state.get("graded_refs") or state.get("doc_refs") or []
+    else:
+        refs = state.get("graded_refs") or []
+    return current_docstore().hydrate(refs)
+
+
+def refuse(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Early exit for questions the planner classified as OUTSIDE the corpus."""
+    draft = (
+        "This question appears to be outside the scope of the indexed documents.\n"
+        "Try asking about the ingested papers' content (use specific keywords)."
+    )
+    draft = _normalize_sources(draft, cites="- (no sources)")
+    return {**state, "draft": draft}
+
+
+def generate(llm: "ChatOllama", state: Dict[str, Any]) -> Dict[str, Any]:
     q = state["question"]
+    docs = _context_docs(state)
 
     # 1) Bağlam/kanıt yoksa: açıkça reddet + 1-2 öneri ver
-    if not state.get("graded_docs"):
+    if not docs:
         suggestions = [s for s in state.get("queries", []) if s.strip()][:2]
         if not suggestions:
             suggestions = [
@@ -39,7 +63,7 @@ def generate(llm: ChatOllama, state: Dict[str, Any]) -> Dict[str, Any]:
     ctx = "\n\n---\n\n".join(
         f"[{i+1}] {d.metadata.get('title') or '(untitled)'} "
         f"({d.metadata.get('url') or d.metadata.get('source')})\n{d.page_content}"
-        for i, d in enumerate(state["graded_docs"])
+        for i, d in enumerate(docs)
     )
     sys = SystemMessage(content=(
         "You are a STRICT RAG assistant.\n"
@@ -53,6 +77,6 @@ def generate(llm: ChatOllama, state: Dict[str, Any]) -> Dict[str, Any]:
     draft = scrub_think(res.content)
 
     # 3) Kaynak listesini daima biz sonlandırıyoruz (modelinkini override ediyoruz)
-    cites = cite_block(state["graded_docs"]) or "- (no sources)"
+    cites = cite_block(docs) or "- (no sources)"
     draft = _normalize_sources(draft, cites)
     return {**state, "draft": draft}
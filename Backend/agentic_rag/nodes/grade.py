@@ -1,22 +1,31 @@
-from typing import Dict, Any, List
-from langchain_core.documents import Document
+from typing import Dict, Any, List, TYPE_CHECKING
 from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_ollama.chat_models import ChatOllama
+from ..docstore import current_docstore
 from ..utils import scrub_think
 
+if TYPE_CHECKING:   # type hints only; the app may run any chat model
+    from langchain_ollama.chat_models import ChatOllama
 
-def grade_docs(llm: ChatOllama, state: Dict[str, Any]) -> Dict[str, Any]:
+
+def grade_docs(llm: "ChatOllama", state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Grade each candidate once per turn: verdicts are memoized by chunk id in
+    state['grade_memo'], so refine loops only grade (and hydrate) new chunks.
+    """
     q = state["question"]
-    graded: List[Document] = []
+    refs: List[Dict[str, Any]] = state.get("doc_refs") or []
+    memo: Dict[str, bool] = dict(state.get("grade_memo") or {})
     grader_sys = SystemMessage(content=(
         "You rate if a passage is RELEVANT to the question. Reply only 'YES' or 'NO'."
     ))
 
-    for d in state["docs"]:
+    fresh = [r for r in refs if r["id"] not in memo]
+    for ref, d in zip(fresh, current_docstore().hydrate(fresh)):
         res = llm.invoke([grader_sys, HumanMessage(
             content=f"Question:\n{q}\n\nPassage:\n{d.page_content[:1200]}")])
-        if scrub_think(res.content).strip().upper().startswith("Y"):
-            graded.append(d)
-        if not graded:
-            graded = state["docs"][:2]
-            return {**state, "graded_docs": graded}
+        memo[ref["id"]] = scrub_think(res.content).strip().upper().startswith("Y")
+
+    graded = [r for r in refs if memo.get(r["id"])]
+    if not graded:
+        graded = refs[:2]
+    return {**state, "graded_refs": graded, "grade_memo": memo}
@@ -0,0 +1,126 @@
+import re
+from typing import Dict, Any, List, TYPE_CHECKING
+from langchain_core.messages import SystemMessage, HumanMessage
+from ..config import MEMORY_TOKEN_BUDGET, MEMORY_SUMMARY_TOKENS, MEMORY_ANSWER_CHARS
+from ..docstore import current_docstore
+from ..utils import scrub_think
+
+if TYPE_CHECKING:   # type hints only; the app may run any chat model
+    from langchain_ollama.chat_models import ChatOllama
+
+_SOURCES_PAT = re.compile(r"\n\s*Sources\s*:?\s*\n.*", re.I | re.S)
+
+
+def _tokens(text: str) -> int:
+    """Rough token count (~4 chars/token); only used for the history budget."""
+    return len(text) // 4 + 1
+
+
+def _history_text(state: Dict[str, Any]) -> str:
+    lines = []
+    if state.get("summary"):
+        lines.append(f"Summary of earlier conversation: {state['summary']}")
+    for m in state.get("messages") or []:
+        lines.append(f"{m['role'].capitalize()}: {m['content']}")
+    return "\n".join(lines)
+
+
+def _answer_key(state: Dict[str, Any], scope: str):
+    # scope = models + index version (GraphApp._answer_scope), so answers never
+    # cross apps, corpora or models even on a shared cache tier
+    return (scope, " ".join(state["question"].lower().split()), state.get("hyde_mode"))
+
+
+def _first_turn(state: Dict[str, Any]) -> bool:
+    return not (state.get("messages") or state.get("summary"))
+
+
+def contextualize(llm: "ChatOllama", state: Dict[str, Any],
+                  cache=None, scope: str = "") -> Dict[str, Any]:
+    """
+    Turn a follow-up into a standalone `question` using the thread's summary and
+    recent messages (no LLM call on the first turn). A first turn is served from
+    the answer cache when possible (route 'cached' skips straight to `remember`);
+    follow-ups always run, so a thread never gets another thread's answer.
+    """
+    q = state["user_question"]
+    if not _first_turn(state):
+        sys = SystemMessage(content=(
+            "Rewrite the user's latest message as a standalone search question, "
+            "resolving pronouns and references from the conversation. "
+            "If it is already standalone, return it unchanged. Reply with the question only."
+        ))
+        res = llm.invoke([sys, HumanMessage(
+            content=f"Conversation:\n{_history_text(state)}\n\nLatest message:\n{q}")])
+        rewritten = scrub_think(res.content).strip().strip('"')
+        q = rewritten.splitlines()[0].strip() if rewritten else q
+
+    state = {**state, "question": q}
+    cached = (cache.get(_answer_key(state, scope))
+              if cache is not None and _first_turn(state) else None)
+    if cached is not None:
+        store = current_docstore()
+        return {**state, "draft": cached["draft"], "route": "cached",
+                "doc_refs": store.add(cached["docs"]),
+                "graded_refs": store.add(cached["graded_docs"])}
+    return state
+
+
+def _summarize(llm: "ChatOllama", summary: str, old: List[Dict[str, str]]) -> str:
+    sys = SystemMessage(content=(
+        "Update the running summary of a conversation about research papers with the "
+        f"turns below. Keep entities, findings and open questions; at most "
+        f"{MEMORY_SUMMARY_TOKENS * 3 // 4} words. Reply with the summary only."
+    ))
+    turns = "\n".join(f"{m['role'].capitalize()}: {m['content']}" for m in old)
+    res = llm.invoke([sys, HumanMessage(
+        content=f"Current summary:\n{summary or '(none)'}\n\nNew turns:\n{turns}")])
+    return scrub_think(res.content).strip()[: MEMORY_SUMMARY_TOKENS * 4]
+
+
+def remember(llm: "ChatOllama", state: Dict[str, Any],
+             cache=None, scope: str = "") -> Dict[str, Any]:
+    """
+    End of turn: cache the answer, append the turn to the thread history, fold the
+    oldest turns into the rolling summary once the history exceeds its token budget,
+    and drop per-turn scratch data (chunk refs stay, they are small).
+    """
+    draft = state.get("draft", "")
+
+    # 1) Answer cache: fresh, verified first-turn answers only (no refusals, no
+    #    fast-path or loop-capped drafts); the cache holds the chunk texts
+    if (cache is not None and draft and state.get("verified") and _first_turn(state)
+            and state.get("route") not in ("cached", "refuse")):
+        store = current_docstore()
+        cache.put(_answer_key(state, scope), {
+            "draft": draft,
+            "docs": store.hydrate(state.get("doc_refs")),
+            "graded_docs": store.hydrate(state.get("graded_refs"))})
+
+    # 2) Append the turn (answer without its Sources block, capped)
+    answer = _SOURCES_PAT.sub("", draft).strip()[:MEMORY_ANSWER_CHARS]
+    messages = list(state.get("messages") or []) + [
+        {"role": "user", "content": state["user_question"]},
+        {"role": "assistant", "content": answer},
+    ]
+
+    # 3) Over budget -> summarize the oldest turns, always keep the latest exchange
+    summary = state.get("summary", "")
+    budget = MEMORY_TOKEN_BUDGET - _tokens(summary)
+    overflow: List[Dict[str, str]] = []
+    while len(messages) > 2 and sum(_tokens(m["content"]) for m in messages) > budget:
+        overflow.extend(messages[:2])
+        messages = messages[2:]
+    if overflow:
+        summary = _summarize(llm, summary, overflow)
+
+    # 4) Per-turn scratch data is not worth checkpointing
+    return {
+        **state,
+        "messages": messages,
+        "summary": summary,
+        "grade_memo": {},
+        "hyde": None,
+        "queries": [],
+        "searched": [],
+    }
@@ -1,15 +1,133 @@
+import re
+import json
 from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_ollama.chat_models import ChatOllama
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple, TYPE_CHECKING
+from ..cache import make_cache
+from ..config import CACHE_TTL_S, HYDE_EXPS, PLAN_CACHE_SIZE
 from ..utils import scrub_think
 
+if TYPE_CHECKING:   # type hints only; the app may run any chat model
+    from langchain_ollama.chat_models import ChatOllama
 
-def plan(llm: ChatOllama, state: Dict[str, Any]) -> Dict[str, Any]:
+# Planner verdict -> graph route
+#   fast   : retrieve -> generate (no grade / verify)
+#   full   : retrieve -> grade -> generate -> verify (loop)
+#   refuse : answer immediately, nothing is retrieved
+ROUTES = {
+    "SIMPLE": "fast",
+    "COMPLEX": "full",
+    "CORPUS": "full",
+    "OUTSIDE": "refuse",
+}
+
+# Gemini JSON mode schema (OpenAPI subset) for the single planner call
+PLAN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "route": {"type": "string", "enum": ["SIMPLE", "COMPLEX", "OUTSIDE"]},
+        "queries": {"type": "array", "items": {"type": "string"}},
+        "hyde": {"type": "string"},
+    },
+    "required": ["route", "queries"],
+}
+
+# Lines like "1. ", "- ", "* ", "Query 2:" in front of a rewritten query
+_BULLET_PAT = re.compile(r"^\s*(?:[-*•]+|\d+[.)]|query\s*\d*\s*:)\s*", re.I)
+_MAX_QUERY_CHARS = 300
+
+_PLAN_CACHE = make_cache("plan", PLAN_CACHE_SIZE, CACHE_TTL_S)
+
+
+def _route_from_verdict(verdict: str) -> Optional[str]:
+    """Map the first recognized token to a route; None when nothing is recognized."""
+    verdict = (verdict or "").strip().upper()
+    for token, route in ROUTES.items():
+        if verdict.startswith(token):
+            return route
+    return None
+
+
+def _clean_queries(question: str, raw: Any) -> List[str]:
+    """
+    Validate rewritten queries:
+      - strings only, bullets/numbering stripped
+      - drop preambles ("Here are some queries:") and over-long lines
+      - case-insensitive dedup (the original question counts as seen)
+    """
+    seen = {question.strip().lower()}
+    out: List[str] = []
+    for item in raw if isinstance(raw, list) else []:
+        if not isinstance(item, str):
+            continue
+        s = _BULLET_PAT.sub("", item).strip().strip('"').strip()
+        if len(s) < 3 or len(s) > _MAX_QUERY_CHARS or s.endswith(":"):
+            continue
+        key = s.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        out.append(s)
+    return out[:HYDE_EXPS]
+
+
+def _parse_plan(question: str, text: str) -> Tuple[Dict[str, Any], bool]:
+    """
+    Parse the JSON-mode reply into (plan, valid). Malformed output (no JSON object,
+    or no recognized route) degrades to the full loop with valid=False.
+    """
+    data: Dict[str, Any] = {}
+    m = re.search(r"\{.*\}", scrub_think(text or ""), re.S)
+    if m:
+        try:
+            parsed = json.loads(m.group(0))
+            if isinstance(parsed, dict):
+                data = parsed
+        except Exception:
+            data = {}
+
+    route = _route_from_verdict(str(data.get("route") or ""))
+    hyde: Optional[str] = data.get("hyde") if isinstance(
+        data.get("hyde"), str) else None
+    return {
+        "route": route or "full",
+        "rewrites": _clean_queries(question, data.get("queries")),
+        "hyde": (hyde or "").strip() or None,
+    }, route is not None
+
+
+def _cache_key(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+def plan(llm: "ChatOllama", state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    One structured call that both routes the question and expands it:
+      route (SIMPLE / COMPLEX / OUTSIDE), up to HYDE_EXPS rewritten queries
+      and an optional HyDE passage. Cached per normalized question, but only
+      when the reply parsed; a fallback plan is retried on the next ask.
+    """
     q = state["question"]
-    sys = SystemMessage(content=(
-        "Classify if this question should be answerable from the ingested corpus. "
-        "Reply 'CORPUS' or 'OUTSIDE'. No extra text."
-    ))
-    res = llm.invoke([sys, HumanMessage(content=q)])
-    _ = scrub_think(res.content).strip().upper()  # reserved for routing
-    return {**state, "queries": [q]}
+    key = _cache_key(q)
+    out = _PLAN_CACHE.get(key)
+    if out is None:
+        sys = SystemMessage(content=(
+            "You plan searches over an ingested corpus of research papers. "
+            "Return a JSON object with fields:\n"
+            "- route: SIMPLE if answerable from the corpus with one direct lookup "
+            "(a fact, a definition, a single paper's finding); COMPLEX if answerable from "
+            "the corpus but needs several sources, comparison or multi-step reasoning; "
+            "OUTSIDE if not answerable from the corpus.\n"
+            f"- queries: up to {HYDE_EXPS} short, focused search queries rephrasing the question.\n"
+            "- hyde: a 2-3 sentence hypothetical abstract that would answer the question.\n"
+            "No extra text."
+        ))
+        res = llm.invoke([sys, HumanMessage(content=q)],
+                         response_mime_type="application/json",
+                         response_schema=PLAN_SCHEMA)
+        out, valid = _parse_plan(q, res.content)
+        if valid:
+            _PLAN_CACHE.put(key, out)
+
+    # Fast path stays a single lookup; the full loop searches the rewrites too
+    queries = [q] if out["route"] == "fast" else [q] + out["rewrites"]
+    return {**state, "queries": queries, "route": out["route"], "hyde": out["hyde"]}
@@ -1,7 +1,9 @@
 # agentic_rag/nodes/retrieve.py
 from typing import Dict, Any, List
+import numpy as np
 from langchain_core.documents import Document
-from ..config import TOP_K, MMR_K
+from ..config import TOP_K, MMR_K, MMR_LAMBDA
+from ..docstore import current_docstore, merge_refs
 from ..utils import compress_text, rrf_fuse
 
 
@@ -15,7 +17,7 @@ def _retrieve_vec_for_query(vec_source, query: str) -> List[Document]:
     if hasattr(vec_source, "as_retriever"):
         retr = vec_source.as_retriever(
             search_type="mmr",
-            search_kwargs={"k": MMR_K, "lambda_mult": 0.5}
+            search_kwargs={"k": MMR_K, "lambda_mult": MMR_LAMBDA}
         )
         return retr.invoke(query)
 
@@ -26,17 +28,68 @@ def _retrieve_vec_for_query(vec_source, query: str) -> List[Document]:
     return []  # unsupported vec_source
 
 
+def _retrieve_vec_for_vector(vec_source, v: np.ndarray) -> List[Document]:
+    """Single ANN call for a precomputed query vector (Supabase or Chroma)."""
+    if hasattr(vec_source, "invoke_vector"):
+        return vec_source.invoke_vector(v)
+    if hasattr(vec_source, "max_marginal_relevance_search_by_vector"):
+        return vec_source.max_marginal_relevance_search_by_vector(
+            v.tolist(), k=MMR_K, lambda_mult=MMR_LAMBDA)
+    return []
+
+
+def _embedder_of(vec_source):
+    return getattr(vec_source, "embedder", None) or getattr(vec_source, "embeddings", None)
+
+
+def hyde_vector(embedder, question: str, passage: str, mode: str = "mean") -> np.ndarray:
+    """
+    Embed the question and the hypothetical passage in one batch call and blend:
+      mean -> centroid of the two unit vectors
+      max  -> element-wise max of the two unit vectors
+    """
+    V = np.asarray(embedder.embed_documents(
+        [question, passage]), dtype=np.float32)
+    V /= np.linalg.norm(V, axis=1, keepdims=True) + 1e-12
+    v = V.max(axis=0) if mode == "max" else V.mean(axis=0)
+    return (v / (np.linalg.norm(v) + 1e-12)).astype(np.float32)
+
+
 def retrieve(state: Dict[str, Any], vec_source, bm25_ret) -> Dict[str, Any]:
-    queries: List[str] = state.get("queries") or [state.get("question", "")]
+    """
+    Incremental across refine loops:
+      - only queries not searched earlier in this turn hit the backends
+      - new hits are merged into the existing candidates by chunk id
+    Chunk text goes to the request's DocStore; state['doc_refs'] keeps references.
+    HyDE mode (state['hyde_mode'] = mean|max): the first pass replaces the
+    per-query vector searches with one ANN call on the question+passage blend.
+    """
+    question = state.get("question", "")
+    queries: List[str] = state.get("queries") or [question]
+    searched: List[str] = list(state.get("searched") or [])
+    new_queries = [q for q in queries if q not in searched]
     pooled_vec: List[Document] = []
     pooled_bm25: List[Document] = []
 
-    for q in queries:
-        # Vector hits
-        if vec_source is not None:
+    mode = state.get("hyde_mode") or "off"
+    embedder = _embedder_of(vec_source) if vec_source is not None else None
+    use_hyde = (mode != "off" and bool(state.get("hyde"))
+                and not searched and embedder is not None)
+
+    vec_queries = new_queries
+    lex_queries = new_queries
+    if use_hyde:
+        v = hyde_vector(embedder, question, state["hyde"], mode)
+        pooled_vec.extend(_retrieve_vec_for_vector(vec_source, v))
+        vec_queries, lex_queries = [], [question]
+
+    # Vector hits
+    if vec_source is not None:
+        for q in vec_queries:
             pooled_vec.extend(_retrieve_vec_for_query(vec_source, q))
-        # BM25 hits
-        if bm25_ret is not None:
+    # BM25 hits
+    if bm25_ret is not None:
+        for q in lex_queries:
             pooled_bm25.extend(bm25_ret.invoke(q))
 
     # Fuse vector + BM25 pools (RRF), then compress for downstream nodes
@@ -46,4 +99,5 @@ def retrieve(state: Dict[str, Any], vec_source, bm25_ret) -> Dict[str, Any]:
             d.page_content), metadata=d.metadata)
         for d in fused
     ]
-    return {**state, "docs": comp}
+    refs = merge_refs(state.get("doc_refs") or [], current_docstore().add(comp))
+    return {**state, "doc_refs": refs, "searched": searched + new_queries}
@@ -1,37 +1,51 @@
-from typing import Dict, Any
+from typing import Dict, Any, TYPE_CHECKING
 from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_ollama.chat_models import ChatOllama
+from ..docstore import current_docstore
 from ..utils import scrub_think
 from ..config import LOOP_MAX
 
+if TYPE_CHECKING:   # type hints only; the app may run any chat model
+    from langchain_ollama.chat_models import ChatOllama
 
-def verify_or_refine(llm: ChatOllama, state: Dict[str, Any]) -> Dict[str, Any]:
+
+def verify_or_refine(llm: "ChatOllama", state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    PASS ends the turn (and marks the draft `verified`). REFINE sets `refine` and
+    replaces `queries` with only the new, not-yet-searched queries so the next
+    retrieve/grade pass is incremental.
+    """
+    state = {**state, "refine": False, "verified": False}
     if state.get("loop", 0) >= LOOP_MAX:
         return state
 
     q = state["question"]
-    ctx = "\n\n".join(d.page_content for d in state["graded_docs"])[:6000]
+    graded = current_docstore().hydrate(state.get("graded_refs") or [])
+    ctx = "\n\n".join(d.page_content for d in graded)[:6000]
     ans = state.get("draft", "")[:4000]
     sys = SystemMessage(content=(
         "Judge if the answer is fully grounded in the provided context and addresses the question. "
         "Reply STRICTLY with one token among: PASS / REFINE."
     ))
 
-    sys = SystemMessage(content=(
-        "Judge if the answer is fully grounded in the provided context and addresses the question. "
-        "Reply STRICTLY with one token among: PASS / REFINE."
-    ))
-
     res = llm.invoke([sys, HumanMessage(
         content=f"Question:\n{q}\n\nContext:\n{ctx}\n\nAnswer:\n{ans}")])
     verdict = scrub_think(res.content).strip().upper()
+    if verdict.startswith("PASS"):
+        return {**state, "verified": True}
 
     if verdict.startswith("REFINE"):
         qsys = SystemMessage(
             content="Suggest 1–2 sharper search queries for the question. One per line.")
         qres = llm.invoke([qsys, HumanMessage(content=q)])
-        new_qs = [l.strip("- ").strip()
-                  for l in scrub_think(qres.content).splitlines() if l.strip()]
-        return {**state, "queries": [q] + new_qs[:2], "loop": state.get("loop", 0) + 1}
+        searched = {s.lower() for s in state.get("searched") or []}
+        new_qs = []
+        for l in scrub_think(qres.content).splitlines():
+            s = l.strip("- ").strip()
+            if s and not s.endswith(":") and s.lower() not in searched:
+                searched.add(s.lower())
+                new_qs.append(s)
+        if new_qs:
+            return {**state, "queries": new_qs[:2], "refine": True,
+                    "loop": state.get("loop", 0) + 1}
 
     return state
@@ -0,0 +1,86 @@
+# agentic_rag/projection.py
+"""
+Query/document projections (full embedding -> ANN dimension) and the active-index
+manifest that tells the Supabase retriever which projection + RPC are live.
+
+Projection files (joblib) may be
+  - {"W": (out, in)[, "mean": (in,)]}   scripts/build_randproj_*, scripts/reproject.py
+  - a fitted sklearn PCA / random projection (components_[, mean_])
+and are applied as l2((x - mean) @ W.T).
+
+The manifest (ACTIVE_INDEX_PATH) is a small JSON file written atomically by
+scripts/reproject.py once a re-projected column/table is complete:
+  {"rpc_name": "match_documents_v2", "rp_path": "models/proj_pca_768.joblib",
+   "column": "embedding_v2" | "table": "documents_v2", "dim": 768, ...}
+"""
+import os
+import json
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+
+
+def load_projection(path: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """(W (out, in) float32, mean (in,) or None) from a projection file."""
+    from joblib import load
+    obj = load(path)
+    if isinstance(obj, dict) and "W" in obj:
+        W, mean = obj["W"], obj.get("mean")
+    elif hasattr(obj, "components_"):
+        W, mean = obj.components_, getattr(obj, "mean_", None)
+    else:
+        raise RuntimeError(f"Unsupported projection format in {path}")
+    W = np.asarray(W, dtype=np.float32)
+    if mean is not None:
+        mean = np.asarray(mean, dtype=np.float32).ravel()
+    return W, mean
+
+
+def save_projection(path: str, W: np.ndarray, mean: Optional[np.ndarray] = None,
+                    **info: Any) -> None:
+    """Write {"W", "mean", "in_dim", "out_dim", ...} atomically."""
+    from joblib import dump
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    dump({"W": np.asarray(W, dtype=np.float32),
+          "mean": None if mean is None else np.asarray(mean, dtype=np.float32),
+          "in_dim": int(W.shape[1]), "out_dim": int(W.shape[0]), **info}, tmp)
+    os.replace(tmp, path)
+
+
+def fit_projection(kind: str, X: np.ndarray, out_dim: int,
+                   seed: int = 42) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """(W, mean) for "rp" (Gaussian, scale 1/sqrt(out_dim)) or "pca" fitted on X."""
+    if kind == "rp":
+        rng = np.random.default_rng(seed)
+        W = rng.normal(0.0, 1.0 / np.sqrt(out_dim), size=(out_dim, X.shape[1]))
+        return W.astype(np.float32), None
+    if kind == "pca":
+        mean = X.mean(axis=0)
+        _, _, Vt = np.linalg.svd(X - mean, full_matrices=False)
+        return Vt[:out_dim].astype(np.float32), mean.astype(np.float32)
+    raise ValueError(f"unknown projection: {kind}")
+
+
+def project(X: np.ndarray, W: Optional[np.ndarray],
+            mean: Optional[np.ndarray] = None) -> np.ndarray:
+    """Row-wise l2((X - mean) @ W.T); identity (normalized) when W is None."""
+    X = np.asarray(X, dtype=np.float32)
+    if W is not None:
+        X = (X - mean if mean is not None else X) @ W.T
+    return (X / (np.linalg.norm(X, axis=-1, keepdims=True) + 1e-12)).astype(np.float32)
+
+
+def read_active(path: str) -> Optional[Dict[str, Any]]:
+    if not (path and os.path.exists(path)):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_active(path: str, manifest: Dict[str, Any]) -> None:
+    """Swap the active index: readers see the old or the new manifest, never a mix."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
@@ -0,0 +1,63 @@
+# agentic_rag/quantize.py
+"""
+Compressed first-stage codes for cosine search over unit-norm rows.
+
+    float16   2 bytes/dim    ~exact scores
+    int8      1 byte/dim     per-dimension scale (max |x_d| / 127), folded into the query
+    binary    1 bit/dim      sign bits, scored by Hamming distance (1 - 2*ham/dim)
+
+Scores are only used to pick candidates; callers rerank the top ones against the
+full-precision vectors (LocalANNRetriever, benchmarks/eval_retrieval.py quant).
+The pgvector equivalents (halfvec, binary_quantize) are in docs/quantized_storage.md.
+"""
+from typing import Optional
+import numpy as np
+
+QUANT_MODES = ("none", "float16", "int8", "binary")
+
+# popcount of every byte value
+_POP8 = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(1).astype(np.uint16)
+
+
+class QuantizedMatrix:
+    """Codes for an (n, dim) float32 matrix; scores(v) approximates X @ v."""
+
+    def __init__(self, X: np.ndarray, mode: str, block: int = 16384):
+        if mode not in QUANT_MODES[1:]:
+            raise ValueError(f"unknown quantization: {mode}")
+        X = np.asarray(X, dtype=np.float32)
+        self.mode = mode
+        self.dim = X.shape[1]
+        self.block = block
+        self.scale: Optional[np.ndarray] = None
+        if mode == "float16":
+            self.codes = X.astype(np.float16)
+        elif mode == "int8":
+            self.scale = (np.abs(X).max(axis=0) / 127.0 + 1e-12).astype(np.float32)
+            self.codes = np.clip(np.rint(X / self.scale), -127, 127).astype(np.int8)
+        else:
+            self.codes = np.packbits(X > 0, axis=1)
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes + (self.scale.nbytes if self.scale is not None else 0))
+
+    def scores(self, v: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Approximate similarity of every row (or `rows`) to the unit query v."""
+        C = self.codes if rows is None else self.codes[rows]
+        v = np.asarray(v, dtype=np.float32)
+        out = np.empty(C.shape[0], dtype=np.float32)
+        if self.mode == "binary":
+            q = np.packbits(v > 0)
+            for s in range(0, C.shape[0], self.block):
+                ham = _POP8[np.bitwise_xor(C[s:s + self.block], q)].sum(axis=1)
+                out[s:s + self.block] = 1.0 - 2.0 * ham / self.dim
+            return out
+        # float16 / int8: widen one block at a time so the matmul stays in BLAS
+        q = v if self.scale is None else v * self.scale
+        for s in range(0, C.shape[0], self.block):
+            out[s:s + self.block] = C[s:s + self.block].astype(np.float32) @ q
+        return out
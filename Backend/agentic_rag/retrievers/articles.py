@@ -0,0 +1,86 @@
+# agentic_rag/retrievers/articles.py
+"""
+Per-article metadata, stored once per article instead of on every chunk row.
+
+Lean layout (SQL in docs/lean_metadata.md):
+  articles(doc_id primary key, metadata jsonb)   title / url / doi / authors / headings /
+                                                 images / card_* ...
+  documents.metadata = {"doc_id", "section", "chunk", "start", "end"}
+                                                 chunk rows: article id + position
+
+The retriever returns lean chunk rows, deduplicates them to article level and only
+then hydrates: one `select ... where doc_id in (...)` per result set for the articles
+not already cached. Rows indexed with full metadata pass through untouched.
+"""
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from langchain_core.documents import Document
+from ..cache import make_cache
+from ..config import ARTICLE_CACHE_SIZE, CACHE_TTL_S
+from ..metrics import record
+
+# Keys that stay on the chunk row; everything else is article-level
+CHUNK_KEYS = ("doc_id", "section", "chunk", "start", "end")
+# Keys the retriever itself adds to a returned row
+_ROW_KEYS = frozenset(CHUNK_KEYS + ("chunk_id", "similarity", "ann_similarity", "rerank_score"))
+
+
+def split_metadata(md: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Ingest time: (article metadata, lean chunk metadata) of one chunk."""
+    chunk = {k: md[k] for k in CHUNK_KEYS if md.get(k) is not None}
+    article = {k: v for k, v in md.items() if k not in CHUNK_KEYS}
+    return article, chunk
+
+
+def is_lean(md: Dict[str, Any]) -> bool:
+    return bool(md.get("doc_id")) and _ROW_KEYS.issuperset(md)
+
+
+class ArticleMetadata:
+    """doc_id -> article metadata, read from the articles table through a shared cache."""
+
+    def __init__(
+        self,
+        client: Callable[[], Any],            # returns a supabase client (opened lazily)
+        table: str = "articles",
+        parse: Optional[Callable[[Any], Dict[str, Any]]] = None,   # raw jsonb -> dict
+        cache=None,
+    ):
+        self._client = client
+        self.table = table
+        self.parse = parse or (lambda raw: dict(raw or {}))
+        self.cache = cache if cache is not None else make_cache(
+            "articles", ARTICLE_CACHE_SIZE, CACHE_TTL_S)
+
+    def fetch(self, doc_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Metadata for each id; unknown articles map to {} (and are cached as such)."""
+        out: Dict[str, Dict[str, Any]] = {}
+        missing: List[str] = []
+        for i in dict.fromkeys(doc_ids):
+            md = self.cache.get(i)
+            if md is None:
+                missing.append(i)
+            else:
+                out[i] = md
+
+        if missing:
+            t0 = time.perf_counter()
+            res = (self._client().table(self.table)
+                   .select("doc_id,metadata").in_("doc_id", missing).execute())
+            rows = res.data or []
+            record(article_fetches=1, rpc_ms=(time.perf_counter() - t0) * 1000.0)
+            found = {r["doc_id"]: self.parse(r.get("metadata")) for r in rows}
+            for i in missing:
+                out[i] = found.get(i, {})
+                self.cache.put(i, out[i])
+        return out
+
+    def hydrate(self, docs: List[Document]) -> List[Document]:
+        """Merge article metadata into lean chunk docs (in place); chunk keys win."""
+        lean = [d for d in docs if is_lean(d.metadata or {})]
+        if not lean:
+            return docs
+        articles = self.fetch(d.metadata["doc_id"] for d in lean)
+        for d in lean:
+            d.metadata = {**articles.get(d.metadata["doc_id"], {}), **d.metadata}
+        return docs
@@ -0,0 +1,205 @@
+# agentic_rag/retrievers/local_ann.py
+from typing import List, Optional, Dict, Any
+import json
+import time
+import numpy as np
+from langchain_core.documents import Document
+from ..config import ANN_QUANT, ANN_RERANK
+from ..metrics import record
+from ..quantize import QuantizedMatrix
+from .mmr import mmr_docs
+from ..utils import dedup_by_article
+
+
+class LocalANNRetriever:
+    """
+    In-memory exact cosine search with the SupabaseANNRetriever interface.
+
+    - add_documents() embeds chunks (or takes precomputed vectors) into one float32 matrix.
+    - invoke()/invoke_vector() mirror the Supabase retriever: oversample, then
+      deduplicate to article level.
+    - Exact search by default; build_ivf() adds an ivfflat-style coarse quantizer
+      so `probes` trades recall for scanned rows like pgvector does.
+    - quant="float16" | "int8" | "binary" scans compressed codes instead of the float32
+      rows (2x / 4x / 32x smaller) and reranks the top match_count * rerank
+      candidates on the full-precision vectors.
+    - mmr_lambda picks the top-k by MMR over the candidate rows (retrievers/mmr.py)
+      instead of plain article dedup; mmr_k is then the default result count, as on
+      the Supabase retriever.
+    - measure_bytes records rpc_bytes (the payload a remote store would return); off
+      by default, since it serializes every candidate's metadata.
+    - Used for offline benchmarks/evaluation and as a network-free backend.
+    """
+
+    def __init__(self, embedder, k: int = 8, probes: int = 20,
+                 quant: str = ANN_QUANT, rerank: int = ANN_RERANK,
+                 mmr_lambda: Optional[float] = None,
+                 mmr_k: Optional[int] = None,           # default result count with MMR on
+                 measure_bytes: bool = False):
+        self.embedder = embedder
+        self.k = k
+        self.probes = probes
+        self.quant = quant
+        self.rerank = rerank
+        self.mmr_lambda = mmr_lambda
+        self.mmr_k = mmr_k
+        self.measure_bytes = measure_bytes
+        self.docs: List[Document] = []
+        self._blocks: List[np.ndarray] = []
+        self._X: Optional[np.ndarray] = None
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[np.ndarray] = []
+        self._codes: Optional[QuantizedMatrix] = None
+
+    # ---------- index ----------
+
+    @staticmethod
+    def _l2_rows(X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        return X / (np.linalg.norm(X, axis=1, keepdims=True) + 1e-12)
+
+    def add_documents(
+        self,
+        docs: List[Document],
+        vectors: Optional[np.ndarray] = None,
+        batch_size: int = 64,
+    ) -> None:
+        if not docs:
+            return
+        if vectors is None:
+            parts = []
+            for i in range(0, len(docs), batch_size):
+                batch = [d.page_content for d in docs[i:i + batch_size]]
+                parts.append(np.asarray(
+                    self.embedder.embed_documents(batch), dtype=np.float32))
+            vectors = np.vstack(parts)
+        self._blocks.append(self._l2_rows(vectors))
+        self.docs.extend(docs)
+        self._X = None
+        self._codes = None
+        self._centroids = None   # IVF lists are stale after inserts
+
+    def build_ivf(self, nlist: int = 64, iters: int = 10, seed: int = 0) -> None:
+        """Spherical k-means over the rows; searches then scan only `probes` lists."""
+        X = self.matrix
+        n = X.shape[0]
+        if n == 0:
+            return
+        nlist = max(1, min(int(nlist), n))
+        rng = np.random.default_rng(seed)
+        C = X[rng.choice(n, nlist, replace=False)].copy()
+        for _ in range(iters):
+            assign = np.argmax(X @ C.T, axis=1)
+            sums = np.zeros_like(C)
+            np.add.at(sums, assign, X)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            nonempty = norms[:, 0] > 0
+            C[nonempty] = sums[nonempty] / norms[nonempty]
+        assign = np.argmax(X @ C.T, axis=1)
+        self._centroids = C
+        self._lists = [np.flatnonzero(assign == j) for j in range(nlist)]
+
+    @property
+    def matrix(self) -> np.ndarray:
+        if self._X is None:
+            self._X = (np.vstack(self._blocks) if self._blocks
+                       else np.zeros((0, 0), dtype=np.float32))
+            self._blocks = [self._X] if self._blocks else []
+        return self._X
+
+    @property
+    def codes(self) -> Optional[QuantizedMatrix]:
+        """First-stage codes (None: search scans the float32 matrix)."""
+        if self.quant in ("", "none") or not self.docs:
+            return None
+        if self._codes is None or self._codes.mode != self.quant:
+            self._codes = QuantizedMatrix(self.matrix, self.quant)
+        return self._codes
+
+    def index_version(self) -> str:
+        return f"local:{len(self.docs)}"
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    # ---------- search ----------
+
+    def embed(self, query: str) -> np.ndarray:
+        v = np.asarray(self.embedder.embed_query(query), dtype=np.float32)
+        return v / (float(np.linalg.norm(v)) + 1e-12)
+
+    def invoke(
+        self,
+        query: str,
+        k: Optional[int] = None,
+        probes: Optional[int] = None,
+        oversample: int = 6,
+        extra_filter: Optional[dict] = None,
+    ) -> List[Document]:
+        return self.invoke_vector(self.embed(query), k=k, probes=probes,
+                                  oversample=oversample, extra_filter=extra_filter)
+
+    def invoke_vector(
+        self,
+        v: np.ndarray,
+        k: Optional[int] = None,
+        probes: Optional[int] = None,
+        oversample: int = 6,
+        extra_filter: Optional[dict] = None,
+    ) -> List[Document]:
+        use_mmr = self.mmr_lambda is not None
+        eff_k = int(k or (self.mmr_k if use_mmr and self.mmr_k else self.k))
+        match_count = min(max(eff_k * oversample, eff_k), 100)
+
+        t0 = time.perf_counter()
+        X = self.matrix
+        if X.shape[0] == 0:
+            return []
+        v = np.asarray(v, dtype=np.float32)
+        v = v / (float(np.linalg.norm(v)) + 1e-12)
+
+        # Candidate rows: everything (exact) or the `probes` nearest IVF lists
+        cand: Optional[np.ndarray] = None
+        if self._centroids is not None:
+            eff_probes = max(1, int(probes or self.probes))
+            near = np.argsort(-(self._centroids @ v))[:eff_probes]
+            cand = np.concatenate([self._lists[j] for j in near])
+        if extra_filter:
+            rows = cand if cand is not None else range(X.shape[0])
+            cand = np.asarray([i for i in rows if all(
+                (self.docs[i].metadata or {}).get(fk) == fv
+                for fk, fv in extra_filter.items())], dtype=np.int64)
+        if cand is not None and cand.shape[0] == 0:
+            return []
+
+        # Quantized first stage: keep the top match_count * rerank rows by code score,
+        # then rescore only those on the float32 matrix
+        codes = self.codes
+        if codes is not None:
+            approx = codes.scores(v, cand)
+            m = min(match_count * max(1, int(self.rerank)), approx.shape[0])
+            pre = np.argpartition(-approx, m - 1)[:m]
+            cand = pre if cand is None else cand[pre]
+
+        sims = X @ v if cand is None else X[cand] @ v
+        n = min(match_count, sims.shape[0])
+        order = np.argpartition(-sims, n - 1)[:n]
+        order = order[np.argsort(-sims[order])]
+
+        rows = order if cand is None else cand[order]
+        docs: List[Document] = []
+        for j, i in zip(order, rows.tolist()):
+            src = self.docs[i]
+            md: Dict[str, Any] = dict(src.metadata or {})
+            md.setdefault("chunk_id", f"local-{i}")
+            md["similarity"] = float(sims[j])
+            docs.append(Document(page_content=src.page_content, metadata=md))
+        inc = {"rpc_calls": 1, "rpc_ms": (time.perf_counter() - t0) * 1000.0,
+               "rows": len(docs)}
+        if self.measure_bytes:   # after the clock stops: not part of the search time
+            inc["rpc_bytes"] = sum(len(d.page_content.encode("utf-8")) +
+                                   len(json.dumps(d.metadata, default=str)) for d in docs)
+        record(**inc)
+        if use_mmr:
+            return mmr_docs(docs, X[rows], eff_k, self.mmr_lambda)
+        return dedup_by_article(docs, topk=eff_k)
@@ -0,0 +1,196 @@
+# agentic_rag/retrievers/rerank.py
+"""
+Second stage over the oversampled ANN candidates (SupabaseANNRetriever).
+
+1) Exact cosine between the full query vector (before projection) and each
+   candidate's full vector, as one matmul. Full vectors come from the row's
+   `full_embedding` when the RPC returns it, else from the local embedding store
+   (agentic_rag/embstore.py, by chunk hash). Candidates without one keep their ANN
+   similarity.
+2) Optional ONNX cross-encoder over the top RERANK_CE_TOP candidates, in batches,
+   best first. Once RERANK_BUDGET_MS is spent, the remaining candidates keep their
+   cosine order below the scored ones. The budget is per request: rerank time already
+   recorded in the current run scope (earlier ANN calls of the same turn) counts
+   against it; outside a run scope each call gets the whole budget.
+
+Returned docs are in final rank order. `similarity` becomes the exact cosine, and the
+ANN score is kept as `ann_similarity` (`rerank_score` holds the cross-encoder logit).
+"""
+import os
+import json
+import time
+import logging
+import threading
+from typing import Any, List, Optional, Sequence, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from ..config import (
+    EMBED_STORE_MODEL, RERANK, RERANK_BUDGET_MS, RERANK_CE_BATCH, RERANK_CE_TOP,
+    RERANK_ONNX_PATH, RERANK_TOKENIZER_PATH,
+)
+from ..embstore import chunk_hash, open_store
+from ..metrics import record, run_total
+
+log = logging.getLogger(__name__)
+
+
+def parse_vectors(raws: Sequence[Any], dim: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(float32 (n, dim), found mask) from RPC vector fields (list, or pgvector / JSON text)."""
+    X = np.zeros((len(raws), dim), dtype=np.float32)
+    found = np.zeros(len(raws), dtype=bool)
+    for i, raw in enumerate(raws):
+        if isinstance(raw, str):
+            raw = json.loads(raw)
+        if isinstance(raw, list) and len(raw) == dim:
+            X[i], found[i] = raw, True
+    return X, found
+
+
+class CrossEncoder:
+    """(query, passage) -> relevance logit with an ONNX model (e.g. ms-marco-MiniLM-L-6-v2)."""
+
+    def __init__(self, model_path: str, tokenizer_path: str = "",
+                 max_length: int = 256, threads: int = 1):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise RuntimeError(
+                "The cross-encoder needs `onnxruntime` and `tokenizers` "
+                "(pip install onnxruntime tokenizers)") from e
+        tok_path = tokenizer_path or os.path.join(os.path.dirname(model_path), "tokenizer.json")
+        self.tokenizer = Tokenizer.from_file(tok_path)
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.enable_padding()
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, opts, providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self.session.get_inputs()}
+
+    def score(self, query: str, passages: Sequence[str]) -> np.ndarray:
+        enc = self.tokenizer.encode_batch([(query, p) for p in passages])
+        feed = {
+            "input_ids": np.asarray([e.ids for e in enc], dtype=np.int64),
+            "attention_mask": np.asarray([e.attention_mask for e in enc], dtype=np.int64),
+            "token_type_ids": np.asarray([e.type_ids for e in enc], dtype=np.int64),
+        }
+        logits = self.session.run(None, {k: v for k, v in feed.items() if k in self._inputs})[0]
+        return np.asarray(logits, dtype=np.float32).reshape(len(passages), -1)[:, -1]
+
+
+class Reranker:
+    """Exact-cosine (+ optional cross-encoder) reordering under a per-request time budget."""
+
+    def __init__(
+        self,
+        store=None,                # EmbeddingStore, or a zero-arg factory (opened on first use)
+        cross_encoder=None,        # CrossEncoder, or a zero-arg factory
+        budget_ms: float = RERANK_BUDGET_MS,
+        ce_top: int = RERANK_CE_TOP,
+        ce_batch: int = RERANK_CE_BATCH,
+    ):
+        self._store = store
+        self._ce = cross_encoder
+        self.budget_ms = budget_ms
+        self.ce_top = ce_top
+        self.ce_batch = max(1, ce_batch)
+        self._lock = threading.Lock()
+
+    def _open(self, attr: str):
+        if callable(getattr(self, attr)):
+            with self._lock:
+                if callable(getattr(self, attr)):
+                    setattr(self, attr, getattr(self, attr)())
+        return getattr(self, attr)
+
+    @property
+    def store(self):
+        return self._open("_store")
+
+    @property
+    def cross_encoder(self) -> Optional[CrossEncoder]:
+        return self._open("_ce")
+
+    def warm_up(self) -> str:
+        """Open the store and load the cross-encoder ahead of the first request."""
+        store, ce = self.store, self.cross_encoder
+        return (f"store={store.count if store is not None else 'none'}, "
+                f"cross_encoder={'yes' if ce is not None else 'no'}")
+
+    def full_vectors(self, docs: List[Document], dim: int,
+                     full: Optional[Sequence[Any]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(float32 (n, dim), found mask): row-provided vectors first, then the store."""
+        X, found = parse_vectors(list(full) if full is not None else [None] * len(docs), dim)
+        store = self.store
+        if store is not None and store.dim == dim and not found.all():
+            miss = np.flatnonzero(~found)
+            S, hit = store.get([chunk_hash(docs[i].page_content) for i in miss])
+            X[miss[hit]], found[miss[hit]] = S[hit], True
+        return X, found
+
+    def rerank(self, docs: List[Document], v: np.ndarray, query: Optional[str] = None,
+               full: Optional[Sequence[Any]] = None) -> List[Document]:
+        """docs in reranked order; v is the full-dimension, unit-norm query vector."""
+        return [docs[i] for i in self.rank(docs, v, query, full)]
+
+    def rank(self, docs: List[Document], v: np.ndarray, query: Optional[str] = None,
+             full: Optional[Sequence[Any]] = None,
+             vectors: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> np.ndarray:
+        """Indices of docs in reranked order (their metadata gets the new scores).
+        vectors: a full_vectors() result, when the caller already looked them up."""
+        if not docs:
+            return np.zeros(0, dtype=np.int64)
+        t0 = time.perf_counter()
+        spent_ms = run_total("rerank_ms")   # earlier rank() calls of this request
+        v = np.asarray(v, dtype=np.float32)
+
+        # 1) Exact cosine on full vectors: one (n, dim) @ (dim,) product
+        X, found = vectors if vectors is not None else self.full_vectors(docs, v.shape[0], full)
+        sims = np.asarray([float((d.metadata or {}).get("similarity") or 0.0) for d in docs],
+                          dtype=np.float32)
+        if found.any():
+            Xf = X[found]
+            sims[found] = (Xf @ v) / (np.linalg.norm(Xf, axis=1) + 1e-12)
+        for d, s, f in zip(docs, sims, found):
+            if f:
+                d.metadata = {**(d.metadata or {}), "similarity": float(s),
+                              "ann_similarity": (d.metadata or {}).get("similarity")}
+        order = np.argsort(-sims, kind="stable")
+
+        # 2) Cross-encoder over the head, batch by batch while the budget lasts
+        scored = 0
+        ce = self.cross_encoder
+        if ce is not None and query:
+            head = order[:self.ce_top]
+            logits: List[float] = []
+            for s in range(0, len(head), self.ce_batch):
+                if spent_ms + (time.perf_counter() - t0) * 1000.0 >= self.budget_ms:
+                    break
+                logits.extend(ce.score(
+                    query, [docs[i].page_content for i in head[s:s + self.ce_batch]]).tolist())
+            scored = len(logits)
+            for i, z in zip(head, logits):
+                docs[i].metadata = {**(docs[i].metadata or {}), "rerank_score": z}
+            ranked = np.argsort(-np.asarray(logits, dtype=np.float32), kind="stable")
+            order = np.concatenate([head[:scored][ranked], order[scored:]]).astype(np.int64)
+
+        record(rerank_ms=(time.perf_counter() - t0) * 1000.0,
+               rerank_full=int(found.sum()), rerank_scored=scored)
+        return order
+
+
+def _open_store_or_warn(store_model: str):
+    store = open_store(store_model, readonly=True)
+    if store is None:
+        log.warning("rerank: no embedding store for %r under EMBED_STORE_DIR; only rows "
+                    "that carry full_embedding are rescored (check EMBED_STORE_MODEL)",
+                    store_model)
+    return store
+
+
+def make_reranker(mode: str = RERANK, store_model: str = EMBED_STORE_MODEL) -> Optional[Reranker]:
+    """Reranker from config (None when RERANK=off); store and model open on first use."""
+    if mode in ("", "off", "none"):
+        return None
+    ce = (lambda: CrossEncoder(RERANK_ONNX_PATH, RERANK_TOKENIZER_PATH)) if RERANK_ONNX_PATH else None
+    return Reranker(store=lambda: _open_store_or_warn(store_model), cross_encoder=ce)
@@ -1,11 +1,21 @@
 # agentic_rag/retrievers/supabase_ann.py
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import os
 import json
+import time
+import logging
+import threading
 import numpy as np
-from joblib import load
-from supabase import create_client
 from langchain_core.documents import Document
+from ..config import ACTIVE_INDEX_CHECK_S
+from ..metrics import record
+from ..projection import load_projection, project, read_active
+from ..utils import dedup_by_article
+from .articles import ArticleMetadata, is_lean
+from .mmr import mmr_docs
+from .rerank import Reranker, parse_vectors
+
+log = logging.getLogger(__name__)
 
 
 class SupabaseANNRetriever:
@@ -16,6 +26,21 @@ class SupabaseANNRetriever:
       Otherwise uses the embedding vector as-is (e.g., Ollama 1024).
     - k/probes can be overridden per-call.
     - Oversampling helps us deduplicate chunk-level hits into unique article-level hits.
+    - The Supabase client and W are created on first use (or by warm_up()), so
+      constructing the retriever is cheap.
+    - With active_path set, the RPC name + projection follow the active-index manifest
+      (agentic_rag/projection.py): scripts/reproject.py swaps it once a re-projected
+      column is complete, and in-flight queries finish on the previous pair.
+    - With a reranker, the oversampled candidates are reordered by exact cosine on
+      the full vectors (and optionally a cross-encoder) before dedup, so the top-k
+      comes from the reranked list (see retrievers/rerank.py).
+    - With mmr_lambda set, the top-k is picked by MMR over the candidate vectors
+      (full vectors from the reranker, else an `embedding` column returned by the
+      RPC), one chunk per article (see retrievers/mmr.py). Candidates without a
+      vector only fill the tail; with none at all it falls back to article dedup
+      (and warns once).
+    - Lean chunk rows (metadata = doc_id + offsets) are hydrated from the articles
+      table after dedup, once per unique article (see retrievers/articles.py).
     """
 
     def __init__(
@@ -27,23 +52,100 @@ class SupabaseANNRetriever:
         embedder,                 # any Embeddings with .embed_query()
         k: int = 8,
         probes: int = 20,
+        articles_table: str = "articles",
+        active_path: Optional[str] = None,     # active-index manifest (overrides rpc/rp)
+        reranker: Optional[Reranker] = None,   # second stage over the candidates
+        mmr_lambda: Optional[float] = None,    # MMR over the candidates (None: off)
+        mmr_k: Optional[int] = None,           # default result count with MMR on
     ):
-        self.client = create_client(url, key)
+        self._url = url
+        self._key = key
         self.rpc_name = rpc_name
+        self.rp_path = rp_path
         self.embedder = embedder
         self.k = k
         self.probes = probes
 
-        # Optional random-projection matrix (W)
-        self.W: Optional[np.ndarray] = None
-        self._W_in_dim: Optional[int] = None
+        self.active_path = active_path
+        self.reranker = reranker
+        self.mmr_lambda = mmr_lambda
+        self.mmr_k = mmr_k
+        self._mmr_warned = False
+
+        self._client = None
+        # (rpc_name, W, mean) in effect, swapped as one tuple
+        self._route: Optional[Tuple[str, Optional[np.ndarray], Optional[np.ndarray]]] = None
+        self._active_mtime: Optional[int] = None
+        self._active_checked = float("-inf")
+        self._lock = threading.Lock()
+        self.articles = ArticleMetadata(lambda: self.client, articles_table,
+                                        parse=self._parse_md)
+
+    # ---------- lazy resources ----------
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from supabase import create_client
+                    self._client = create_client(self._url, self._key)
+        return self._client
+
+    @property
+    def W(self) -> Optional[np.ndarray]:
+        """Projection matrix in effect (None: vectors are used as-is)."""
+        return self._current()[1]
+
+    def _load_route(self, rpc_name: str, rp_path: Optional[str]):
+        W = mean = None
         if rp_path and os.path.exists(rp_path):
-            rp = load(rp_path)  # expected shape like {"W": (1024, 3072)}
-            W = rp.get("W", None)
-            if W is not None:
-                W = np.asarray(W, dtype=np.float32)
-                self.W = W
-                self._W_in_dim = W.shape[1]  # expected input dim (e.g., 3072)
+            W, mean = load_projection(rp_path)   # e.g. {"W": (1024, 3072)}
+        return (rpc_name, W, mean)
+
+    def _follow_active(self) -> None:
+        """Pick up a new active-index manifest (stat at most every ACTIVE_INDEX_CHECK_S)."""
+        now = time.monotonic()
+        if now - self._active_checked < ACTIVE_INDEX_CHECK_S:
+            return
+        self._active_checked = now
+        try:
+            mtime = os.stat(self.active_path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._active_mtime:
+            return
+        with self._lock:
+            if mtime == self._active_mtime:
+                return
+            m = read_active(self.active_path) or {}
+            self.rpc_name = m.get("rpc_name") or self.rpc_name
+            self.rp_path = m.get("rp_path")
+            self._route = self._load_route(self.rpc_name, self.rp_path)
+            self._active_mtime = mtime
+
+    def _current(self):
+        """(rpc_name, W, mean) to use for the next query."""
+        if self.active_path:
+            self._follow_active()
+        if self._route is None:
+            with self._lock:
+                if self._route is None:
+                    self._route = self._load_route(self.rpc_name, self.rp_path)
+        return self._route
+
+    def index_version(self) -> str:
+        """RPC + projection in effect (changes when the active index is swapped)."""
+        rpc_name, _, _ = self._current()
+        return f"{rpc_name}:{self.rp_path or ''}"
+
+    def warm_up(self) -> Dict[str, str]:
+        """Load W, the reranker and the Supabase client ahead of the first request."""
+        rpc_name, W, _ = self._current()
+        _ = self.client
+        return {"rp": f"{W.shape[0]}x{W.shape[1]}" if W is not None else "none",
+                "rpc": rpc_name, "supabase": "ok",
+                "rerank": self.reranker.warm_up() if self.reranker is not None else "off"}
 
     # ---------- helpers ----------
 
@@ -52,14 +154,16 @@ class SupabaseANNRetriever:
         n = float(np.linalg.norm(x)) + 1e-12
         return (x / n).astype(np.float32)
 
-    def _maybe_project(self, v: np.ndarray) -> np.ndarray:
-        """Apply RP only if W exists and input dims match; otherwise pass-through."""
-        if self.W is None:
+    @staticmethod
+    def _maybe_project(v: np.ndarray, W: Optional[np.ndarray],
+                       mean: Optional[np.ndarray] = None) -> np.ndarray:
+        """Apply the projection only if W exists and input dims match; otherwise pass-through."""
+        if W is None:
             return v
-        if self._W_in_dim is not None and v.size != self._W_in_dim:
+        if v.size != W.shape[1]:
             # Dimension mismatch (e.g., embedder=1024-d, W expects 3072-d)
             return v
-        return self._l2(self.W @ v)
+        return project(v, W, mean)
 
     @staticmethod
     def _normalize_images(imgs: Any) -> Optional[List[str]]:
@@ -141,26 +245,23 @@ class SupabaseANNRetriever:
 
     @staticmethod
     def _dedup_best(docs: List[Document], topk: int) -> List[Document]:
-        """
-        Deduplicate by a stable priority key and keep the highest-similarity doc:
-          priority: doi -> url -> source -> title -> doc_id
-        """
-        best: Dict[str, Document] = {}
-        for d in docs:
-            md = d.metadata or {}
-            key = md.get("doi") or md.get("url") or md.get(
-                "source") or md.get("title") or md.get("doc_id")
-            sim = float(md.get("similarity") or 0.0)
-            prev = best.get(key)
-            if prev is None or sim > float((prev.metadata or {}).get("similarity") or 0.0):
-                best[key] = d
-        uniq = list(best.values())
-        uniq.sort(key=lambda x: float(
-            (x.metadata or {}).get("similarity") or 0.0), reverse=True)
-        return uniq[:topk]
+        """Article-level dedup (see utils.dedup_by_article)."""
+        return dedup_by_article(docs, topk)
+
+    def _warn_mmr_without_vectors(self, rpc_name: str) -> None:
+        if not self._mmr_warned:
+            self._mmr_warned = True
+            log.warning("MMR is on but %r returns no candidate vectors (no full vectors "
+                        "found, no `embedding` column): using article dedup instead "
+                        "(see docs/rerank.md)", rpc_name)
 
     # ---------- main entry ----------
 
+    def embed(self, query: str) -> np.ndarray:
+        """Full-dimension, L2-normalized query vector (before projection)."""
+        v = np.asarray(self.embedder.embed_query(query), dtype=np.float32)
+        return self._l2(v)
+
     def invoke(
         self,
         query: str,
@@ -170,14 +271,28 @@ class SupabaseANNRetriever:
         extra_filter: Optional[dict] = None,
     ) -> List[Document]:
         # 1) Embed
-        v = np.asarray(self.embedder.embed_query(query), dtype=np.float32)
-        v = self._l2(v)
+        v = self.embed(query)
+        return self.invoke_vector(v, k=k, probes=probes, oversample=oversample,
+                                  extra_filter=extra_filter, query=query)
 
-        # 2) Optional random projection
-        v = self._maybe_project(v)
+    def invoke_vector(
+        self,
+        v: np.ndarray,
+        k: Optional[int] = None,
+        probes: Optional[int] = None,
+        oversample: int = 6,
+        extra_filter: Optional[dict] = None,
+        query: Optional[str] = None,           # query text, for the cross-encoder
+    ) -> List[Document]:
+        """ANN search for an already embedded (full-dimension) query vector, e.g. a HyDE blend."""
+        # 2) Optional projection (RPC + W taken together: a swap never mixes them)
+        rpc_name, W, mean = self._current()
+        v_full = self._l2(np.asarray(v, dtype=np.float32))
+        v = self._maybe_project(v_full, W, mean)
 
         # 3) RPC call (oversample to improve dedup)
-        eff_k = int(k or self.k)
+        use_mmr = self.mmr_lambda is not None
+        eff_k = int(k or (self.mmr_k if use_mmr and self.mmr_k else self.k))
         eff_probes = int(probes or self.probes)
         match_count = min(max(eff_k * oversample, eff_k),
                           100)  # safe upper bound
@@ -190,20 +305,48 @@ class SupabaseANNRetriever:
         if extra_filter:
             payload["filter"] = extra_filter
 
-        res = self.client.rpc(self.rpc_name, payload).execute()
+        t0 = time.perf_counter()
+        res = self.client.rpc(rpc_name, payload).execute()
         rows = res.data or []
+        record(rpc_calls=1, rpc_ms=(time.perf_counter() - t0) * 1000.0,
+               rows=len(rows))
 
         # 4) Rows -> Documents (robust metadata; carry images/url/similarity/doc_id)
+        #    doc_id stays the article id from metadata; the row id is the chunk id.
         docs: List[Document] = []
         for r in rows:
-            row_url = r.get("url")
-            md = self._parse_md(r.get("metadata"), row_url=row_url)
+            raw = r.get("metadata")
+            if isinstance(raw, dict) and is_lean(raw):
+                md = dict(raw)   # doc_id + offsets; article fields come in step 6
+            else:
+                md = self._parse_md(raw, row_url=r.get("url"))
             md.update({
-                "doc_id": r.get("doc_id"),
+                "doc_id": md.get("doc_id") or r.get("doc_id"),
+                "chunk_id": r.get("doc_id"),
                 "similarity": r.get("similarity"),
             })
             content = r.get("content") or ""
             docs.append(Document(page_content=content, metadata=md))
 
-        # 5) Deduplicate to article-level
-        return self._dedup_best(docs, topk=eff_k)
+        # 5) Rerank the candidates on full vectors, then take the article-level top-k
+        #    in reranked order, or by MMR over the candidate vectors
+        X = found = None
+        if self.reranker is not None:
+            X, found = self.reranker.full_vectors(
+                docs, v_full.shape[0], [r.get("full_embedding") for r in rows])
+            order = self.reranker.rank(docs, v_full, query=query, vectors=(X, found))
+            docs, rows, X, found = [docs[i] for i in order], [rows[i] for i in order], \
+                X[order], found[order]
+        if use_mmr and (found is None or not found.any()):
+            X, found = parse_vectors([r.get("embedding") for r in rows], v.shape[0])
+            if rows and not found.any():
+                self._warn_mmr_without_vectors(rpc_name)
+        if use_mmr and found.any():
+            docs = mmr_docs(docs, X, eff_k, self.mmr_lambda, found=found)
+        elif self.reranker is not None:
+            docs = dedup_by_article(docs, topk=eff_k, ranked=True)
+        else:
+            docs = self._dedup_best(docs, topk=eff_k)
+
+        # 6) Article metadata for lean rows: one lookup per result set, cached by doc_id
+        return self.articles.hydrate(docs)
@@ -0,0 +1,168 @@
+# agentic_rag/source_cards.py
+"""
+Chunk metadata -> source card fields (title, url, doc_id, similarity, snippet,
+image, images, favicon), shared by the /rag and /hybrid routes.
+
+Visual links are article-level, so they are worked out once:
+  1) at ingest time, annotate_visuals() stores them in the chunk metadata
+     (card_image / card_images), which Supabase/Chroma then return with every hit;
+  2) for rows indexed before that, the result is memoized per doc_id.
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+from .cache import LRUCache
+from .config import SOURCE_CARD_CACHE_SIZE
+
+# metadata keys that may hold image links
+IMG_KEYS = (
+    "images", "figures", "thumbnails", "imgs", "pics", "graphics",
+    "figure_images", "preview_images",
+)
+SINGLE_IMG_KEYS = ("image", "thumbnail", "first_image", "cover", "cover_image")
+FAVICON_KEYS = ("favicon", "icon", "site_icon")
+URL_KEYS = ("src", "url", "href", "image", "link", "data-src", "data-original",
+            "image_url", "thumbnail_url")
+
+# Keys written by annotate_visuals(); their presence means "already computed"
+CARD_IMAGE = "card_image"
+CARD_IMAGES = "card_images"
+
+_HTTP_PAT = re.compile(r"^https?://", re.I)
+# icons / sprites / logos / svg / static assets are never figures
+_NOT_VISUAL_PAT = re.compile(r"logo|icon|sprite|/static/img|\.svg", re.I)
+_IMG_EXT_PAT = re.compile(r"\.(?:jpe?g|png|gif|webp)$", re.I)
+# extension-less figure pages / assets (most journals: /figure..., /fig..., /images, /bin/)
+_FIG_PATH_PAT = re.compile(r"/fig|/images|/bin/", re.I)
+_PMC_HOST_PAT = re.compile(r"^[a-z][a-z0-9+.-]*://[^/?#]*ncbi\.nlm\.nih\.gov", re.I)
+
+_CARDS = LRUCache(SOURCE_CARD_CACHE_SIZE, name="source_cards")
+
+
+def pick_url(obj: Any) -> Optional[str]:
+    """Extract a single URL from a str OR dict with common url-ish keys."""
+    if isinstance(obj, str):
+        return obj.strip() or None
+    if isinstance(obj, dict):
+        for k in URL_KEYS:
+            v = obj.get(k)
+            if isinstance(v, str) and v.strip():
+                return v.strip()
+    return None
+
+
+def looks_like_visual(u: str) -> bool:
+    """
+    Image-like link?
+    - real image extensions (.jpg/.png/.gif/.webp) -> yes
+    - extension-less figure/fig/images/bin paths -> yes
+    - logo/icon/sprite/svg/static img -> no
+    """
+    if not u:
+        return False
+    s = u.strip()
+    if not _HTTP_PAT.match(s) or _NOT_VISUAL_PAT.search(s):
+        return False
+    return bool(_IMG_EXT_PAT.search(s) or _FIG_PATH_PAT.search(s))
+
+
+def ncbi_pmc_fallbacks(page_url: Optional[str]) -> List[str]:
+    """Figure section / assets of an NCBI PMC article when no image link was found."""
+    if not isinstance(page_url, str):
+        return []
+    u = page_url.strip().rstrip("/")
+    if "/pmc/articles/" in u and _PMC_HOST_PAT.match(u):
+        # e.g. https://www.ncbi.nlm.nih.gov/pmc/articles/PMC3630201/
+        return [u + "/#figures", u + "/bin/", u + "/pdf"]
+    return []
+
+
+def _dedup_keep_order(urls: List[str]) -> List[str]:
+    return list(dict.fromkeys(u for u in urls if u))
+
+
+def _as_list(x: Any) -> List[Any]:
+    if x is None:
+        return []
+    return x if isinstance(x, list) else [x]
+
+
+def extract_visual_links(md: Dict[str, Any]) -> Tuple[Optional[str], Optional[List[str]]]:
+    """
+    (image, images) from raw metadata:
+      - image : first sensible link (card thumbnail)
+      - images: every candidate link (extension-less figure pages included)
+    """
+    # 1) single-valued keys
+    prim: Optional[str] = None
+    pool: List[str] = []
+    for k in SINGLE_IMG_KEYS:
+        u = pick_url(md.get(k))
+        if u and looks_like_visual(u):
+            prim = prim or u
+            pool.append(u)
+
+    # 2) list-valued keys
+    for k in IMG_KEYS:
+        for item in _as_list(md.get(k)):
+            u = pick_url(item)
+            if u and looks_like_visual(u):
+                pool.append(u)
+
+    # 3) nothing found: domain-specific fallback (PMC)
+    if not pool:
+        pool.extend(ncbi_pmc_fallbacks(md.get("url") or md.get("source")))
+
+    pool = _dedup_keep_order(pool)
+    return prim or (pool[0] if pool else None), (pool or None)
+
+
+def extract_favicon(md: Dict[str, Any]) -> Optional[str]:
+    for k in FAVICON_KEYS:
+        u = pick_url(md.get(k))
+        if u:
+            return u
+    return None
+
+
+def annotate_visuals(md: Dict[str, Any]) -> Dict[str, Any]:
+    """Ingest time: store the article's visual links in its metadata (in place)."""
+    md[CARD_IMAGE], md[CARD_IMAGES] = extract_visual_links(md)
+    return md
+
+
+def _visuals(md: Dict[str, Any]) -> Tuple[Optional[str], Optional[List[str]], Optional[str]]:
+    if CARD_IMAGES in md:
+        return md.get(CARD_IMAGE), md.get(CARD_IMAGES), extract_favicon(md)
+    doc_id = md.get("doc_id")
+    if doc_id is None:
+        return (*extract_visual_links(md), extract_favicon(md))
+    hit = _CARDS.get(doc_id)
+    if hit is None:
+        hit = (*extract_visual_links(md), extract_favicon(md))
+        _CARDS.put(doc_id, hit)
+    return hit
+
+
+def excerpt(text: str, limit: int = 240) -> str:
+    if not text:
+        return ""
+    return (text[:limit] + "…") if len(text) > limit else text
+
+
+def source_card(d: Document, favicon: bool = False) -> Dict[str, Any]:
+    """Card fields for one hit; pass straight into SourceItem / SearchHit / HybridSource."""
+    md = getattr(d, "metadata", None) or {}
+    image, images, icon = _visuals(md)
+    card = {
+        "title": md.get("title"),
+        "url": md.get("url") or md.get("source"),
+        "doc_id": md.get("doc_id"),
+        "similarity": md.get("similarity"),
+        "snippet": excerpt(getattr(d, "page_content", "") or ""),
+        "image": image,
+        "images": list(images) if images else None,
+    }
+    if favicon:
+        card["favicon"] = icon
+    return card
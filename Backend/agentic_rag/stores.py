@@ -1,10 +1,14 @@
 from __future__ import annotations
-from langchain_chroma import Chroma
-from langchain_community.retrievers import BM25Retriever
+from typing import TYPE_CHECKING
 from .config import PERSIST_DIR, COLLECTION, RRF_K
 
+if TYPE_CHECKING:   # chromadb / rank_bm25 are only imported when a store is opened
+    from langchain_chroma import Chroma
+    from langchain_community.retrievers import BM25Retriever
+
 
 def open_vectorstore(embeddings) -> Chroma:
+    from langchain_chroma import Chroma
     return Chroma(
         collection_name=COLLECTION,
         embedding_function=embeddings,
@@ -13,6 +17,7 @@ def open_vectorstore(embeddings) -> Chroma:
 
 
 def build_bm25_from_store(vs: Chroma) -> BM25Retriever:
+    from langchain_community.retrievers import BM25Retriever
     # Build BM25 from stored documents; if you persist raw docs elsewhere, load those instead.
     # returns { ids, documents, metadatas, embeddings? }
     raw = vs.get(include=["documents"])
@@ -20,3 +25,12 @@ def build_bm25_from_store(vs: Chroma) -> BM25Retriever:
     bm25 = BM25Retriever.from_texts(texts)
     bm25.k = RRF_K
     return bm25
+
+
+def build_bm25_from_snapshot(path: str) -> BM25Retriever:
+    from langchain_community.retrievers import BM25Retriever
+    from .ingest.snapshot import Snapshot
+    # Chunk texts straight from the memory-mapped corpus snapshot (no store round trip)
+    bm25 = BM25Retriever.from_documents(Snapshot(path).iter_chunks())
+    bm25.k = RRF_K
+    return bm25
@@ -1,5 +1,6 @@
 from __future__ import annotations
 import re
+import hashlib
 from typing import List, Dict
 from langchain_core.documents import Document
 from .config import MAX_CTX_CHARS
@@ -29,24 +30,65 @@ def compress_text(text: str) -> str:
     return text[:MAX_CTX_CHARS] + ("\n\n[truncated]" if len(text) > MAX_CTX_CHARS else "")
 
 
+def chunk_key(d: Document) -> str:
+    """
+    Stable identity of a retrieved chunk, the same for every retriever
+    (Supabase rows, BM25 / Chroma, local ANN, snapshots):
+      "<article doc_id>#<chunk index>" -> else "<doc_id or source>#<content hash>".
+    """
+    md = d.metadata or {}
+    base = md.get("doc_id") or md.get("source") or ""
+    if base and md.get("chunk") is not None:
+        return f"{base}#{md['chunk']}"
+    digest = hashlib.sha1(d.page_content.encode("utf-8")).hexdigest()[:16]
+    return f"{base}#{digest}"
+
+
+def article_key(md: Dict) -> str:
+    """Article identity of a chunk: doi -> url -> source -> title -> doc_id."""
+    return md.get("doi") or md.get("url") or md.get(
+        "source") or md.get("title") or md.get("doc_id")
+
+
+def dedup_by_article(docs: List[Document], topk: int, ranked: bool = False) -> List[Document]:
+    """
+    Deduplicate by a stable priority key (article_key) and keep the highest-similarity doc.
+    ranked=True: docs are already in final order (e.g. reranked); keep the first per key.
+    """
+    best: Dict[str, Document] = {}
+    for d in docs:
+        md = d.metadata or {}
+        key = article_key(md)
+        if ranked:
+            best.setdefault(key, d)
+            if len(best) >= topk:
+                break
+            continue
+        sim = float(md.get("similarity") or 0.0)
+        prev = best.get(key)
+        if prev is None or sim > float((prev.metadata or {}).get("similarity") or 0.0):
+            best[key] = d
+    uniq = list(best.values())
+    if ranked:
+        return uniq
+    uniq.sort(key=lambda x: float(
+        (x.metadata or {}).get("similarity") or 0.0), reverse=True)
+    return uniq[:topk]
+
+
 def rrf_fuse(vector_hits: List[Document], bm25_hits: List[Document], k: int = 8) -> List[Document]:
     rank: Dict[str, float] = {}
+    first_map: Dict[str, Document] = {}
 
     def add(list_docs: List[Document], weight: float = 1.0):
         for idx, d in enumerate(list_docs, start=1):
-            key = (d.page_content[:200] +
-                   (d.metadata.get("source") or "")).strip()
+            key = chunk_key(d)
             score = weight * (1.0 / (60 + idx))
             rank[key] = rank.get(key, 0.0) + score
+            first_map.setdefault(key, d)
 
-        add(vector_hits, weight=1.0)
-        add(bm25_hits, weight=0.8)
-
-    first_map = {}
-    for d in vector_hits + bm25_hits:
-        key = (d.page_content[:200] + (d.metadata.get("source") or "")).strip()
-        if key not in first_map:
-            first_map[key] = d
+    add(vector_hits, weight=1.0)
+    add(bm25_hits, weight=0.8)
 
     fused = sorted(rank.items(), key=lambda x: x[1], reverse=True)[:k]
     return [first_map[k] for k, _ in fused]
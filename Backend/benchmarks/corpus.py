@@ -0,0 +1,84 @@
+# benchmarks/corpus.py
+# Synthetic corpus in the NCBI scrape JSON shape ({"row": {...}, "scrape": {...}}),
+# plus questions whose relevant article is known (for quality checks).
+
+import os
+import json
+import random
+from typing import Any, Dict, List, Tuple
+
+TOPICS = [
+    "microgravity", "radiation", "bone", "muscle", "spaceflight", "mice",
+    "arabidopsis", "immune", "cardiovascular", "osteoclast", "gene", "expression",
+    "cosmic", "hindlimb", "unloading", "plant", "root", "gravitropism", "stem",
+    "cells", "oxidative", "stress", "mitochondria", "retina", "vestibular",
+    "microbiome", "bacteria", "biofilm", "dna", "damage", "repair", "tissue",
+]
+FILLER = [
+    "the", "results", "show", "that", "in", "samples", "was", "observed",
+    "compared", "with", "ground", "controls", "significant", "changes", "and",
+    "during", "after", "mission", "analysis", "of", "levels", "were", "measured",
+]
+
+
+def _sentence(rng: random.Random, topic_words: List[str], n: int = 14) -> str:
+    words = [rng.choice(topic_words) if rng.random() < 0.35 else rng.choice(FILLER)
+             for _ in range(n)]
+    return " ".join(words).capitalize() + "."
+
+
+def make_article(i: int, rng: random.Random, body_paragraphs: int = 12) -> Dict[str, Any]:
+    topic_words = rng.sample(TOPICS, 4)
+    title = f"{' '.join(w.capitalize() for w in topic_words)} study {i}"
+    url = f"https://www.ncbi.nlm.nih.gov/pmc/articles/PMC{100000 + i}/"
+    abstract = " ".join(_sentence(rng, topic_words) for _ in range(5))
+    body = "\n\n".join(
+        " ".join(_sentence(rng, topic_words) for _ in range(6))
+        for _ in range(body_paragraphs)
+    )
+    return {
+        "row": {"\ufeffTitle": title, "Link": url},
+        "scrape": {
+            "url": url,
+            "title": title,
+            "doi": f"10.1000/synthetic.{i}",
+            "publication_date": f"20{10 + i % 14:02d}-01-01",
+            "authors": [f"Author {i}-{j}" for j in range(6)],
+            "headings": ["Introduction", "Methods", "Results", "Discussion"],
+            "abstract": abstract,
+            "full_text": body,
+            "images": [
+                {"src": f"{url}bin/fig{j}.jpg", "alt": f"Figure {j} {topic_words[0]}"}
+                for j in range(3)
+            ] + [{"src": "https://www.ncbi.nlm.nih.gov/static/img/logo.svg"}],
+        },
+    }
+
+
+def make_corpus(n_docs: int = 200, seed: int = 7) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [make_article(i, rng) for i in range(n_docs)]
+
+
+def write_corpus(out_dir: str, n_docs: int = 200, seed: int = 7) -> List[str]:
+    """One JSON file per article (the layout data/corpus uses)."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for i, art in enumerate(make_corpus(n_docs, seed)):
+        p = os.path.join(out_dir, f"article_{i:05d}.json")
+        with open(p, "w", encoding="utf-8") as f:
+            json.dump(art, f, ensure_ascii=False)
+        paths.append(p)
+    return paths
+
+
+def make_questions(articles: List[Dict[str, Any]], n: int = 50, seed: int = 11) -> List[Tuple[str, str]]:
+    """(question, relevant doi) pairs built from article titles."""
+    rng = random.Random(seed)
+    picks = rng.sample(range(len(articles)), min(n, len(articles)))
+    out = []
+    for i in picks:
+        scr = articles[i]["scrape"]
+        words = scr["title"].lower().split()[:4]
+        out.append((f"What does the study report about {' and '.join(words)}?", scr["doi"]))
+    return out
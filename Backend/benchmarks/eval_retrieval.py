@@ -0,0 +1,446 @@
+# benchmarks/eval_retrieval.py
+# Retrieval quality vs speed over a local vector index.
+#
+#   python -m benchmarks.eval_retrieval bootstrap --corpus data/corpus --out data/eval/qrels.jsonl
+#   python -m benchmarks.eval_retrieval sweep --corpus data/corpus --qrels data/eval/qrels.jsonl
+#   python -m benchmarks.eval_retrieval sweep --synthetic 300        # fully offline
+#   python -m benchmarks.eval_retrieval quant --synthetic 300        # quantization recall
+#   python -m benchmarks.eval_retrieval quant --store gemini:gemini-embedding-001
+#   python -m benchmarks.eval_retrieval mmr --synthetic 300          # MMR lambda sweep
+#
+# qrels format (JSONL): {"question": "...", "relevant": ["<article doc_id>", ...]}
+# The sweep crosses chunk size x projection (none / rp / pca) x k x probes and prints
+# recall@k, MRR and nDCG@k next to per-query latency and candidate payload size,
+# marking the Pareto front (higher recall, lower p50 latency).
+# `quant` compares first-stage codes (float16 / int8 / binary) x rerank factor against
+# exact float32 search: top-k agreement, recall@k when labeled, bytes per vector.
+# `mmr` sweeps the MMR lambda (retrievers/mmr.py) against plain article dedup:
+# recall / MRR / nDCG next to the redundancy of the returned chunks (mean pairwise cosine).
+
+import os
+import re
+import json
+import math
+import time
+import argparse
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from agentic_rag.config import CHUNK_OVERLAP, EMBED_MODEL
+from agentic_rag.ingest.chunking import chunk_docs
+from agentic_rag.embstore import open_store
+from agentic_rag.ingest.loaders import load_ncbi_json_docs
+from agentic_rag.metrics import run_scope
+from agentic_rag.retrievers.local_ann import LocalANNRetriever
+
+from benchmarks.corpus import make_corpus, make_questions, write_corpus
+from benchmarks.fakes import FakeEmbeddings
+
+_SENT = re.compile(r"(?<=[.!?])\s+")
+
+
+# ---------- labeled queries ----------
+
+def _abstract_of(doc: Document) -> str:
+    text = doc.page_content
+    if "Abstract:\n" not in text:
+        return ""
+    return text.split("Abstract:\n", 1)[1].split("\n\n", 1)[0].strip()
+
+
+def bootstrap_qrels(docs: List[Document], field: str = "title", limit: int = 0) -> List[Dict[str, Any]]:
+    """One query per article from its title or the first abstract sentence."""
+    out, seen = [], set()
+    for d in docs:
+        md = d.metadata or {}
+        doc_id = md.get("doc_id")
+        if not doc_id or doc_id in seen:
+            continue
+        if field == "abstract":
+            q = _SENT.split(_abstract_of(d), 1)[0]
+        else:
+            q = (md.get("title") or "").strip()
+        if len(q) < 12:
+            continue
+        seen.add(doc_id)
+        out.append({"question": q, "relevant": [doc_id]})
+        if limit and len(out) >= limit:
+            break
+    return out
+
+
+def load_qrels(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(l) for l in f if l.strip()]
+
+
+# ---------- IR metrics ----------
+
+def recall_at_k(ranked: List[str], relevant: List[str], k: int) -> float:
+    rel = set(relevant)
+    return len(rel.intersection(ranked[:k])) / len(rel) if rel else 0.0
+
+
+def mrr(ranked: List[str], relevant: List[str]) -> float:
+    rel = set(relevant)
+    for i, d in enumerate(ranked, start=1):
+        if d in rel:
+            return 1.0 / i
+    return 0.0
+
+
+def ndcg_at_k(ranked: List[str], relevant: List[str], k: int) -> float:
+    rel = set(relevant)
+    dcg = sum(1.0 / math.log2(i + 1)
+              for i, d in enumerate(ranked[:k], start=1) if d in rel)
+    idcg = sum(1.0 / math.log2(i + 1) for i in range(1, min(len(rel), k) + 1))
+    return dcg / idcg if idcg else 0.0
+
+
+# ---------- projections ----------
+
+def fit_projection(kind: str, X: np.ndarray, out_dim: int, seed: int = 42) -> Optional[np.ndarray]:
+    """Return W (out_dim, in_dim) for rp / pca, or None for the identity."""
+    if kind == "none" or out_dim >= X.shape[1]:
+        return None
+    if kind == "rp":
+        rng = np.random.default_rng(seed)
+        return rng.normal(0.0, 1.0 / np.sqrt(out_dim),
+                          size=(out_dim, X.shape[1])).astype(np.float32)
+    if kind == "pca":
+        Xc = X - X.mean(axis=0, keepdims=True)
+        _, _, Vt = np.linalg.svd(Xc, full_matrices=False)
+        return Vt[:out_dim].astype(np.float32)
+    raise ValueError(f"unknown projection: {kind}")
+
+
+def _project(X: np.ndarray, W: Optional[np.ndarray]) -> np.ndarray:
+    Y = X if W is None else X @ W.T
+    return (Y / (np.linalg.norm(Y, axis=1, keepdims=True) + 1e-12)).astype(np.float32)
+
+
+# ---------- sweep ----------
+
+def _embed_texts(embedder, texts: List[str], batch: int = 64) -> np.ndarray:
+    parts = [np.asarray(embedder.embed_documents(texts[i:i + batch]), dtype=np.float32)
+             for i in range(0, len(texts), batch)]
+    return np.vstack(parts)
+
+
+def _pareto(rows: List[Dict[str, Any]]) -> None:
+    for r in rows:
+        r["pareto"] = not any(
+            o is not r
+            and o["recall"] >= r["recall"] and o["p50_ms"] <= r["p50_ms"]
+            and (o["recall"] > r["recall"] or o["p50_ms"] < r["p50_ms"])
+            for o in rows
+        )
+
+
+def sweep(docs: List[Document], qrels: List[Dict[str, Any]], embedder, args) -> List[Dict[str, Any]]:
+    questions = [q["question"] for q in qrels]
+    Q = np.asarray([embedder.embed_query(q) for q in questions], dtype=np.float32)
+    rows: List[Dict[str, Any]] = []
+
+    for chunk_size in args.chunk_sizes:
+        chunks = chunk_docs(docs, chunk_size=chunk_size,
+                            chunk_overlap=min(CHUNK_OVERLAP, chunk_size // 8))
+        X = _embed_texts(embedder, [c.page_content for c in chunks])
+
+        for proj in args.projections:
+            W = fit_projection(proj, X, args.dim)
+            index = LocalANNRetriever(embedder=None, measure_bytes=True)
+            index.add_documents(chunks, vectors=_project(X, W))
+            QP = _project(Q, W)
+            if args.nlist:
+                index.build_ivf(nlist=args.nlist)
+
+            for k in args.ks:
+                for probes in (args.probes if args.nlist else [0]):
+                    lat, nbytes, rec, rr, nd = [], [], [], [], []
+                    for qv, item in zip(QP, qrels):
+                        with run_scope() as run:
+                            t0 = time.perf_counter()
+                            hits = index.invoke_vector(qv, k=k, probes=probes or None)
+                            lat.append((time.perf_counter() - t0) * 1000.0)
+                        nbytes.append(sum(b.get("rpc_bytes", 0.0)
+                                          for b in run.nodes.values()))
+                        ranked = [(h.metadata or {}).get("doc_id") for h in hits]
+                        rel = item.get("relevant") or []
+                        rec.append(recall_at_k(ranked, rel, k))
+                        rr.append(mrr(ranked, rel))
+                        nd.append(ndcg_at_k(ranked, rel, k))
+                    rows.append({
+                        "chunk_size": chunk_size, "chunks": len(chunks),
+                        "projection": proj, "dim": QP.shape[1], "k": k,
+                        "probes": probes or "exact",
+                        "recall": float(np.mean(rec)), "mrr": float(np.mean(rr)),
+                        "ndcg": float(np.mean(nd)),
+                        "p50_ms": float(np.percentile(lat, 50)),
+                        "p95_ms": float(np.percentile(lat, 95)),
+                        "kb_per_query": float(np.mean(nbytes)) / 1024.0,
+                    })
+    _pareto(rows)
+    return rows
+
+
+def print_rows(rows: List[Dict[str, Any]]) -> None:
+    hdr = (f"{'':1} {'chunk':>5} {'proj':>4} {'dim':>5} {'k':>3} {'probes':>6} "
+           f"{'recall':>7} {'mrr':>6} {'ndcg':>6} {'p50ms':>7} {'p95ms':>7} {'KB/q':>7}")
+    print(hdr)
+    for r in sorted(rows, key=lambda r: (-r["recall"], r["p50_ms"])):
+        print(f"{'*' if r['pareto'] else ' ':1} {r['chunk_size']:>5} {r['projection']:>4} "
+              f"{r['dim']:>5} {r['k']:>3} {str(r['probes']):>6} {r['recall']:>7.3f} "
+              f"{r['mrr']:>6.3f} {r['ndcg']:>6.3f} {r['p50_ms']:>7.3f} {r['p95_ms']:>7.3f} "
+              f"{r['kb_per_query']:>7.1f}")
+    print("* = Pareto-optimal (recall vs p50 latency)")
+
+
+# ---------- quantization ----------
+
+def quant_sweep(chunks: List[Document], X: np.ndarray, Q: np.ndarray,
+                qrels: Optional[List[Dict[str, Any]]], args) -> List[Dict[str, Any]]:
+    """Every mode x rerank factor against exact search over the same float32 rows."""
+    def run(index, k):
+        out, lat = [], []
+        for qv in Q:
+            t0 = time.perf_counter()
+            hits = index.invoke_vector(qv, k=k)
+            lat.append((time.perf_counter() - t0) * 1000.0)
+            out.append([(h.metadata or {}).get("doc_id") for h in hits])
+        return out, lat
+
+    exact = LocalANNRetriever(embedder=None, quant="none")
+    exact.add_documents(chunks, vectors=X)
+    rows: List[Dict[str, Any]] = []
+    for k in args.ks:
+        truth, _ = run(exact, k)
+        for mode in args.modes:
+            for rerank in (args.reranks if mode != "none" else [1]):
+                index = LocalANNRetriever(embedder=None, quant=mode, rerank=rerank)
+                index.add_documents(chunks, vectors=exact.matrix)
+                codes = index.codes
+                ranked, lat = run(index, k)
+                agree = [len(set(r[:k]) & set(t[:k])) / max(1, len(t[:k]))
+                         for r, t in zip(ranked, truth)]
+                rec = [recall_at_k(r, q.get("relevant") or [], k)
+                       for r, q in zip(ranked, qrels)] if qrels else [float("nan")]
+                nbytes = codes.nbytes if codes is not None else exact.matrix.nbytes
+                rows.append({
+                    "mode": mode, "rerank": rerank if mode != "none" else "-", "k": k,
+                    "dim": X.shape[1], "bytes_per_vec": nbytes / max(1, X.shape[0]),
+                    "index_mb": nbytes / 2**20,
+                    "agree": float(np.mean(agree)), "recall": float(np.mean(rec)),
+                    "p50_ms": float(np.percentile(lat, 50)),
+                    "p95_ms": float(np.percentile(lat, 95)),
+                })
+    return rows
+
+
+def print_quant_rows(rows: List[Dict[str, Any]]) -> None:
+    print(f"{'mode':>8} {'rerank':>6} {'k':>3} {'B/vec':>7} {'MB':>8} "
+          f"{'agree':>6} {'recall':>7} {'p50ms':>7} {'p95ms':>7}")
+    for r in rows:
+        print(f"{r['mode']:>8} {str(r['rerank']):>6} {r['k']:>3} {r['bytes_per_vec']:>7.1f} "
+              f"{r['index_mb']:>8.2f} {r['agree']:>6.3f} {r['recall']:>7.3f} "
+              f"{r['p50_ms']:>7.3f} {r['p95_ms']:>7.3f}")
+    print("agree = top-k overlap with exact float32 search; "
+          "rerank = first-stage candidates per result slot")
+
+
+# ---------- MMR ----------
+
+def mmr_sweep(docs: List[Document], qrels: List[Dict[str, Any]], embedder,
+              args) -> List[Dict[str, Any]]:
+    """Plain dedup ("off") and each MMR lambda over the same index and candidates."""
+    chunks = chunk_docs(docs, chunk_size=args.chunk_size,
+                        chunk_overlap=min(CHUNK_OVERLAP, args.chunk_size // 8))
+    X = _embed_texts(embedder, [c.page_content for c in chunks])
+    Q = np.asarray([embedder.embed_query(q["question"]) for q in qrels], dtype=np.float32)
+    index = LocalANNRetriever(embedder=None)
+    index.add_documents(chunks, vectors=X)
+    M, row_of = index.matrix, {c.page_content: i for i, c in enumerate(chunks)}
+
+    rows: List[Dict[str, Any]] = []
+    for k in args.ks:
+        for lam in [None] + args.lambdas:
+            index.mmr_lambda = lam
+            lat, rec, rr, nd, red = [], [], [], [], []
+            for qv, item in zip(Q, qrels):
+                t0 = time.perf_counter()
+                hits = index.invoke_vector(qv, k=k, oversample=args.oversample)
+                lat.append((time.perf_counter() - t0) * 1000.0)
+                ranked = [(h.metadata or {}).get("doc_id") for h in hits]
+                rel = item.get("relevant") or []
+                rec.append(recall_at_k(ranked, rel, k))
+                rr.append(mrr(ranked, rel))
+                nd.append(ndcg_at_k(ranked, rel, k))
+                H = M[[row_of[h.page_content] for h in hits]]
+                if len(H) > 1:
+                    S = H @ H.T
+                    red.append(float(S[np.triu_indices(len(H), 1)].mean()))
+            rows.append({
+                "k": k, "lambda": "off" if lam is None else lam,
+                "recall": float(np.mean(rec)), "mrr": float(np.mean(rr)),
+                "ndcg": float(np.mean(nd)),
+                "redundancy": float(np.mean(red)) if red else 0.0,
+                "p50_ms": float(np.percentile(lat, 50)),
+            })
+    return rows
+
+
+def print_mmr_rows(rows: List[Dict[str, Any]]) -> None:
+    print(f"{'k':>3} {'lambda':>6} {'recall':>7} {'mrr':>6} {'ndcg':>6} {'redund':>7} {'p50ms':>7}")
+    for r in rows:
+        print(f"{r['k']:>3} {str(r['lambda']):>6} {r['recall']:>7.3f} {r['mrr']:>6.3f} "
+              f"{r['ndcg']:>6.3f} {r['redundancy']:>7.3f} {r['p50_ms']:>7.3f}")
+    print("redund = mean pairwise cosine of the returned chunks (lower = more diverse)")
+
+
+def _store_vectors(label: str, n_queries: int, limit: int,
+                   seed: int = 42) -> Tuple[List[Document], np.ndarray, np.ndarray]:
+    """Stored full vectors as the index, with held-out rows as queries (no model calls)."""
+    store = open_store(label, readonly=True)
+    if store is None or not store.count:
+        raise SystemExit(f"Embedding store for {label!r} is empty or disabled.")
+    V = store.vectors()
+    n = min(store.count, limit) if limit else store.count
+    idx = np.random.RandomState(seed).permutation(store.count)[:n]
+    q_idx, x_idx = np.sort(idx[:n_queries]), np.sort(idx[n_queries:])
+    X = np.asarray(V[x_idx], dtype=np.float32)
+    docs = [Document(page_content="", metadata={"doc_id": f"row-{i}"}) for i in x_idx]
+    return docs, X, np.asarray(V[q_idx], dtype=np.float32)
+
+
+def _load_docs(args) -> Tuple[List[Document], Optional[List[Dict[str, Any]]]]:
+    """Corpus docs, plus known qrels when the corpus is synthetic."""
+    if args.synthetic:
+        tmp = tempfile.mkdtemp(prefix="rag-eval-")
+        write_corpus(tmp, args.synthetic)
+        qrels = [{"question": q, "relevant": [doi]}
+                 for q, doi in make_questions(make_corpus(args.synthetic), args.queries)]
+        return load_ncbi_json_docs(tmp), qrels
+    return load_ncbi_json_docs(args.corpus), None
+
+
+def _write_rows(path: str, rows: List[Dict[str, Any]]) -> None:
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            for r in rows:
+                f.write(json.dumps(r) + "\n")
+
+
+def _csv_ints(s: str) -> List[int]:
+    return [int(x) for x in s.split(",") if x.strip()]
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Retrieval quality/speed evaluation")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    b = sub.add_parser("bootstrap", help="build a qrels JSONL from titles/abstracts")
+    b.add_argument("--corpus", default=os.getenv("JSON_PATH", "data/corpus"))
+    b.add_argument("--field", choices=["title", "abstract"], default="title")
+    b.add_argument("--limit", type=int, default=200)
+    b.add_argument("--out", default="data/eval/qrels.jsonl")
+
+    s = sub.add_parser("sweep", help="sweep retriever configs against a local index")
+    s.add_argument("--corpus", default=os.getenv("JSON_PATH", "data/corpus"))
+    s.add_argument("--synthetic", type=int, default=0,
+                   help="use N synthetic articles instead of --corpus")
+    s.add_argument("--qrels", default="")
+    s.add_argument("--queries", type=int, default=50)
+    s.add_argument("--embedder", choices=["fake", "gemini"], default="fake")
+    s.add_argument("--chunk-sizes", type=_csv_ints, default=[800, 1200, 2000])
+    s.add_argument("--projections", default="none,rp,pca")
+    s.add_argument("--dim", type=int, default=64, help="projected dimension for rp/pca")
+    s.add_argument("--ks", type=_csv_ints, default=[4, 8])
+    s.add_argument("--nlist", type=int, default=16, help="IVF lists (0 = exact search)")
+    s.add_argument("--probes", type=_csv_ints, default=[1, 4, 16])
+    s.add_argument("--out", default="", help="optional JSONL with all rows")
+
+    qz = sub.add_parser("quant", help="recall impact of quantized first-stage codes")
+    qz.add_argument("--corpus", default=os.getenv("JSON_PATH", "data/corpus"))
+    qz.add_argument("--synthetic", type=int, default=0,
+                    help="use N synthetic articles instead of --corpus")
+    qz.add_argument("--store", default="",
+                    help="embedding-store label: index stored vectors, held-out rows as queries")
+    qz.add_argument("--limit", type=int, default=0, help="max stored vectors (--store)")
+    qz.add_argument("--qrels", default="")
+    qz.add_argument("--queries", type=int, default=50)
+    qz.add_argument("--embedder", choices=["fake", "gemini"], default="fake")
+    qz.add_argument("--chunk-size", type=int, default=1200)
+    qz.add_argument("--modes", default="none,float16,int8,binary")
+    qz.add_argument("--reranks", type=_csv_ints, default=[1, 4, 10])
+    qz.add_argument("--ks", type=_csv_ints, default=[4, 8])
+    qz.add_argument("--out", default="", help="optional JSONL with all rows")
+
+    m = sub.add_parser("mmr", help="MMR lambda sweep: relevance vs redundancy")
+    m.add_argument("--corpus", default=os.getenv("JSON_PATH", "data/corpus"))
+    m.add_argument("--synthetic", type=int, default=0,
+                   help="use N synthetic articles instead of --corpus")
+    m.add_argument("--qrels", default="")
+    m.add_argument("--queries", type=int, default=50)
+    m.add_argument("--embedder", choices=["fake", "gemini"], default="fake")
+    m.add_argument("--chunk-size", type=int, default=1200)
+    m.add_argument("--lambdas", type=lambda s: [float(x) for x in s.split(",") if x.strip()],
+                   default=[0.3, 0.5, 0.7, 0.9])
+    m.add_argument("--ks", type=_csv_ints, default=[4, 8])
+    m.add_argument("--oversample", type=int, default=6)
+    m.add_argument("--out", default="", help="optional JSONL with all rows")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "bootstrap":
+        qrels = bootstrap_qrels(load_ncbi_json_docs(
+            args.corpus), args.field, args.limit)
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            for q in qrels:
+                f.write(json.dumps(q, ensure_ascii=False) + "\n")
+        print(f"Wrote {len(qrels)} labeled queries to {args.out}")
+        return 0
+
+    if args.cmd == "quant" and args.store:
+        chunks, X, Q = _store_vectors(args.store, args.queries, args.limit)
+        args.modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+        rows = quant_sweep(chunks, X, Q, None, args)
+        print_quant_rows(rows)
+        _write_rows(args.out, rows)
+        return 0
+
+    docs, synthetic_qrels = _load_docs(args)
+    qrels = load_qrels(args.qrels) if args.qrels else (
+        synthetic_qrels or bootstrap_qrels(docs, "abstract", args.queries))
+    if not docs or not qrels:
+        raise SystemExit("Need documents and labeled queries.")
+
+    if args.embedder == "gemini":
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        embedder = GoogleGenerativeAIEmbeddings(model=EMBED_MODEL)
+    else:
+        embedder = FakeEmbeddings()
+
+    if args.cmd == "quant":
+        args.modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+        chunks = chunk_docs(docs, chunk_size=args.chunk_size,
+                            chunk_overlap=min(CHUNK_OVERLAP, args.chunk_size // 8))
+        X = _embed_texts(embedder, [c.page_content for c in chunks])
+        Q = np.asarray([embedder.embed_query(q["question"]) for q in qrels], dtype=np.float32)
+        rows = quant_sweep(chunks, X, Q, qrels, args)
+        print_quant_rows(rows)
+    elif args.cmd == "mmr":
+        rows = mmr_sweep(docs, qrels, embedder, args)
+        print_mmr_rows(rows)
+    else:
+        args.projections = [p.strip() for p in args.projections.split(",") if p.strip()]
+        rows = sweep(docs, qrels, embedder, args)
+        print_rows(rows)
+    _write_rows(args.out, rows)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,119 @@
+# benchmarks/fakes.py
+# Deterministic, network-free stand-ins for Gemini chat + embeddings.
+# Latency is simulated with time.sleep so concurrency behaves like real I/O.
+
+import re
+import json
+import time
+import zlib
+from typing import List
+
+import numpy as np
+from langchain_core.messages import AIMessage
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _tokens(text: str) -> List[str]:
+    return _WORD.findall((text or "").lower())
+
+
+def _text_of(messages) -> str:
+    if isinstance(messages, str):
+        return messages
+    parts = []
+    for m in messages:
+        parts.append(m.get("content", "") if isinstance(m, dict)
+                     else getattr(m, "content", ""))
+    return "\n".join(str(p) for p in parts)
+
+
+class FakeEmbeddings:
+    """
+    Feature-hashed bag of words -> unit vector. Texts sharing words get similar
+    vectors, so retrieval quality is meaningful without a real model.
+    """
+
+    def __init__(self, dim: int = 256, latency_ms: float = 0.0):
+        self.dim = dim
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    def _vec(self, text: str) -> List[float]:
+        v = np.zeros(self.dim, dtype=np.float32)
+        for tok in _tokens(text):
+            h = zlib.crc32(tok.encode("utf-8"))
+            v[h % self.dim] += 1.0 if (h >> 16) & 1 else -1.0
+        n = float(np.linalg.norm(v))
+        if n == 0.0:
+            v[0] = 1.0
+            n = 1.0
+        return (v / n).tolist()
+
+    def _sleep(self):
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+
+    def embed_query(self, text: str) -> List[float]:
+        self._sleep()
+        return self._vec(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._sleep()
+        return [self._vec(t) for t in texts]
+
+
+class FakeChatModel:
+    """
+    Answers each prompt type of the graph (follow-up rewrite, planner JSON, grader,
+    verifier, refine queries, generation, history summary, hybrid dual queries)
+    deterministically.
+    Reports usage_metadata like Gemini so token metrics are exercised.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, route: str = "COMPLEX"):
+        self.latency_ms = latency_ms
+        self.route = route
+        self.calls = 0
+
+    def invoke(self, messages, **kwargs) -> AIMessage:
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        prompt = _text_of(messages)
+        content = self._answer(prompt)
+        msg = AIMessage(content=content)
+        msg.usage_metadata = {
+            "input_tokens": len(prompt) // 4,
+            "output_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4,
+        }
+        return msg
+
+    def _answer(self, prompt: str) -> str:
+        question = prompt.rsplit("\n", 1)[-1]
+        if "You plan searches" in prompt:
+            words = [w for w in _tokens(question) if len(w) > 3]
+            return json.dumps({
+                "route": self.route,
+                "queries": [" ".join(words[:4]), " ".join(words[-4:])],
+                "hyde": f"This study reports findings on {' '.join(words)}.",
+            })
+        if "Reply only 'YES' or 'NO'" in prompt:
+            # Relevant when question and passage share a content word
+            q = prompt.split("Passage:", 1)[0]
+            p = prompt.split("Passage:", 1)[-1]
+            shared = {w for w in _tokens(q) if len(w) > 4} & set(_tokens(p))
+            return "YES" if shared else "NO"
+        if "PASS / REFINE" in prompt:
+            return "PASS"
+        if "sharper search queries" in prompt:
+            return "\n".join(_tokens(question)[:3])
+        if "standalone search question" in prompt:
+            return question
+        if "running summary" in prompt:
+            return "Discussed: " + " ".join(sorted(set(_tokens(prompt)))[:40])
+        if "web_queries" in prompt:
+            return json.dumps({"web_queries": [question], "rag_queries": [question]})
+        return "Based on the context [1], the reported effect was significant.\n\nSources:\n- [1]"
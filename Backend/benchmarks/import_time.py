@@ -0,0 +1,93 @@
+# benchmarks/import_time.py
+# Import-time budget check (cold start of the server and the CLIs).
+#
+#   python -m benchmarks.import_time              # check all budgets
+#   python -m benchmarks.import_time --runs 5     # median over more fresh interpreters
+#   python -m benchmarks.import_time --tree server.core.app   # 15 slowest imports of one module
+#
+# Each entry is imported in a fresh `python -X importtime` interpreter. A module fails
+# when its median cumulative import time exceeds the budget, or when it pulls in one of
+# its forbidden modules (optional backends that must stay lazy). Exits 1 on failure.
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Optional backends: only the code paths that use them may import them
+_BACKENDS = ["langchain_chroma", "chromadb", "rank_bm25", "langchain_ollama", "sklearn",
+             "joblib", "supabase", "fitz", "serpapi", "bs4", "lxml"]
+
+# module -> (budget in ms, modules it must not import)
+BUDGETS: Dict[str, Tuple[float, List[str]]] = {
+    "bio_knowledge_engine": (50.0, ["requests", "serpapi", "bs4", "lxml", "fitz"]),
+    "bio_knowledge_engine.search": (50.0, ["requests", "serpapi", "bs4", "lxml", "fitz"]),
+    "bio_knowledge_engine.search.serpapi_client": (400.0, ["serpapi", "bs4", "lxml", "fitz"]),
+    "server.core.app": (1500.0, _BACKENDS + ["agentic_rag.graph", "langgraph",
+                                             "langchain_google_genai"]),
+    "agentic_rag.graph": (2500.0, _BACKENDS + ["langchain_google_genai"]),
+}
+
+
+def measure(module: str) -> Tuple[float, List[str], List[Tuple[float, str]]]:
+    """(cumulative ms, forbidden modules loaded, [(self ms, name)]) in a fresh interpreter."""
+    forbidden = BUDGETS.get(module, (0.0, []))[1]
+    code = (f"import sys, json, {module}; "
+            f"print(json.dumps([m for m in {forbidden!r} if m in sys.modules]))")
+    env = {**os.environ, "PYTHONPATH": ROOT + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    env.setdefault("GOOGLE_API_KEY", "x")   # model clients only check that it is set
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          capture_output=True, text=True, cwd=ROOT, env=env)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    total_ms = 0.0
+    rows: List[Tuple[float, str]] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(self_us) / 1000.0, name.strip()))
+        if name.strip() == module:
+            total_ms = int(cum_us) / 1000.0
+    return total_ms, json.loads(proc.stdout.strip().splitlines()[-1]), rows
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Import-time budget check")
+    ap.add_argument("--modules", default=",".join(BUDGETS))
+    ap.add_argument("--runs", type=int, default=3, help="fresh interpreters per module (median)")
+    ap.add_argument("--scale", type=float, default=1.0, help="multiply budgets (slow machines / CI)")
+    ap.add_argument("--tree", default="", help="print the slowest imports of this module and exit")
+    args = ap.parse_args(argv)
+
+    if args.tree:
+        _, _, rows = measure(args.tree)
+        for ms, name in sorted(rows, reverse=True)[:15]:
+            print(f"{ms:9.1f} ms  {name}")
+        return 0
+
+    failed = False
+    print(f"{'module':45s} {'ms':>9s} {'budget':>9s}")
+    for module in [m.strip() for m in args.modules.split(",") if m.strip()]:
+        budget = BUDGETS.get(module, (float("inf"), []))[0] * args.scale
+        runs = [measure(module) for _ in range(max(1, args.runs))]
+        ms = statistics.median(r[0] for r in runs)
+        leaked = sorted({m for r in runs for m in r[1]})
+        print(f"{module:45s} {ms:9.1f} {budget:9.0f}")
+        if ms > budget:
+            failed = True
+            print(f"OVER BUDGET {module}: {ms:.1f} ms > {budget:.0f} ms")
+        if leaked:
+            failed = True
+            print(f"EAGER IMPORT {module}: {', '.join(leaked)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+# benchmarks/load.py
+# In-process load generator: replays a query mix against the FastAPI app (TestClient),
+# open-loop at a target request rate, and reports how the server degrades.
+#
+#   python -m benchmarks.load --rps 100 --duration 10
+#   python -m benchmarks.load --rps 50 --mix ask=0.7,search=0.3 --llm-ms 200
+#   python -m benchmarks.load --queries data/eval/qrels.jsonl --limit-ask 4,8,500
+#
+# Uses the offline fakes by default (no network); with --llm-ms / --embed-ms the
+# simulated model latency sets how quickly the limits kick in.
+
+import json
+import time
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from fastapi.testclient import TestClient
+
+from server.core.app import create_app
+from server.core.limits import RouteLimiter, build_limiters
+
+from benchmarks.run import Fixture, _pct
+
+ROUTES = {
+    "ask": lambda q, i: ("/rag/ask", {"question": q, "thread_id": f"load-{i}"}),
+    "search": lambda q, i: ("/rag/search", {"query": q, "k": 8}),
+}
+
+
+def _parse_mix(s: str) -> List[Tuple[str, float]]:
+    mix = []
+    for part in s.split(","):
+        name, _, w = part.partition("=")
+        name = name.strip()
+        if name not in ROUTES:
+            raise SystemExit(f"unknown route in mix: {name}")
+        mix.append((name, float(w or 1.0)))
+    return mix
+
+
+def _load_queries(path: str) -> List[str]:
+    out = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            out.append(json.loads(line)["question"] if line.startswith("{") else line)
+    return out
+
+
+def run_load(client: TestClient, queries: List[str], mix: List[Tuple[str, float]],
+             rps: float, duration_s: float, workers: int, seed: int = 0) -> Dict[str, dict]:
+    """Open-loop arrivals at `rps`; returns per-route status counts and latencies."""
+    rng = random.Random(seed)
+    names = [n for n, _ in mix]
+    weights = [w for _, w in mix]
+    lock = threading.Lock()
+    stats: Dict[str, dict] = {n: {"status": {}, "ok_ms": [], "rejected_ms": [],
+                                  "retry_after": []} for n in names}
+
+    def fire(i: int, route: str, q: str):
+        path, body = ROUTES[route](q, i)
+        t0 = time.perf_counter()
+        r = client.post(path, json=body)
+        ms = (time.perf_counter() - t0) * 1000.0
+        with lock:
+            st = stats[route]
+            st["status"][r.status_code] = st["status"].get(r.status_code, 0) + 1
+            if r.status_code == 200:
+                st["ok_ms"].append(ms)
+            elif r.status_code == 429:
+                st["rejected_ms"].append(ms)
+                st["retry_after"].append(int(r.headers.get("Retry-After", "0")))
+
+    n = int(rps * duration_s)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        for i in range(n):
+            # Sleep until this request's scheduled arrival (open loop: never wait on replies)
+            delay = start + i / rps - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            ex.submit(fire, i, rng.choices(names, weights)[0], rng.choice(queries))
+    stats["_elapsed_s"] = time.perf_counter() - start
+    return stats
+
+
+def print_report(stats: Dict[str, dict]) -> None:
+    elapsed = stats.pop("_elapsed_s")
+    print(f"{'route':<8} {'sent':>6} {'ok':>6} {'429':>6} {'other':>6} "
+          f"{'ok p50':>8} {'ok p95':>8} {'ok p99':>8} {'429 p50':>8} {'ok rps':>7}")
+    for route, st in stats.items():
+        sent = sum(st["status"].values())
+        ok = st["status"].get(200, 0)
+        rej = st["status"].get(429, 0)
+        print(f"{route:<8} {sent:>6} {ok:>6} {rej:>6} {sent - ok - rej:>6} "
+              f"{_pct(st['ok_ms'], 50):>8.1f} {_pct(st['ok_ms'], 95):>8.1f} "
+              f"{_pct(st['ok_ms'], 99):>8.1f} {_pct(st['rejected_ms'], 50):>8.1f} "
+              f"{ok / elapsed:>7.1f}")
+        if st["retry_after"]:
+            print(f"{'':<8} Retry-After: min {min(st['retry_after'])}s, "
+                  f"max {max(st['retry_after'])}s")
+
+
+def _limit_override(s: str, name: str) -> RouteLimiter:
+    conc, queue, queue_ms = (int(x) for x in s.split(","))
+    return RouteLimiter(name, conc, queue, queue_ms / 1000.0)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="In-process API load generator")
+    ap.add_argument("--rps", type=float, default=50.0, help="target arrival rate")
+    ap.add_argument("--duration", type=float, default=10.0, help="seconds of traffic")
+    ap.add_argument("--workers", type=int, default=64, help="client threads (max in flight)")
+    ap.add_argument("--mix", default="ask=0.8,search=0.2")
+    ap.add_argument("--queries", default="", help="qrels JSONL or one question per line")
+    ap.add_argument("--docs", type=int, default=200)
+    ap.add_argument("--questions", type=int, default=50)
+    ap.add_argument("--llm-ms", type=float, default=50.0)
+    ap.add_argument("--embed-ms", type=float, default=10.0)
+    ap.add_argument("--limit-ask", default="", help="concurrency,queue,queue_ms override")
+    ap.add_argument("--limit-search", default="", help="concurrency,queue,queue_ms override")
+    ap.add_argument("--no-limits", action="store_true", help="disable the route limiters")
+    args = ap.parse_args(argv)
+
+    fx = Fixture(args)
+    queries = _load_queries(args.queries) if args.queries else fx.questions
+
+    limiters = {} if args.no_limits else build_limiters()
+    if args.limit_ask:
+        limiters["ask"] = _limit_override(args.limit_ask, "ask")
+    if args.limit_search:
+        limiters["search"] = _limit_override(args.limit_search, "search")
+
+    # one event loop for every client thread, as under uvicorn (the limiters wait on it)
+    with TestClient(create_app(graph=fx.graph, limiters=limiters)) as client:
+        stats = run_load(client, queries, _parse_mix(args.mix),
+                         args.rps, args.duration, args.workers)
+    print_report(stats)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
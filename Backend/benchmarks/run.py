@@ -0,0 +1,272 @@
+# benchmarks/run.py
+# Offline RAG benchmark: no network, deterministic fakes for LLM / embeddings / vector store.
+#
+#   python -m benchmarks.run                       # run + compare with benchmarks/baseline.json
+#   python -m benchmarks.run --update-baseline     # store the current numbers as baseline
+#   python -m benchmarks.run --stages graph,api --concurrency 16
+#
+# Stages: loaders, rrf_fuse, retrieve, graph, api
+# Reports p50/p95 latency, throughput under concurrency and peak traced memory per stage;
+# exits 1 when a stage regresses beyond the tolerance against the stored baseline.
+# Throughput depends on the machine's core count far more than latency does, so it only
+# fails the run with --strict (same machine as the baseline); otherwise it is printed.
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+# The fakes have no provider quota: keep the model gateway's rate limits out of the numbers
+for _var in ("LLM_RPM", "LLM_TPM", "EMBED_RPM", "EMBED_TPM"):
+    os.environ.setdefault(_var, "0")
+
+from langchain_core.documents import Document
+
+from agentic_rag.graph import GraphApp
+from agentic_rag.ingest.loaders import load_ncbi_json_docs
+from agentic_rag.ingest.chunking import chunk_docs
+from agentic_rag.cache import clear_caches
+from agentic_rag.docstore import docstore_scope
+from agentic_rag.nodes.retrieve import retrieve
+from agentic_rag.retrievers.local_ann import LocalANNRetriever
+from agentic_rag.utils import rrf_fuse
+
+from benchmarks.corpus import make_corpus, make_questions, write_corpus
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+STAGES = ("loaders", "rrf_fuse", "retrieve", "graph", "api")
+
+# Regression thresholds: relative tolerance plus absolute slack (timer noise on tiny stages)
+ABS_SLACK_MS = 2.0
+ABS_SLACK_KB = 256.0
+
+
+# ---------- measurement helpers ----------
+
+def _pct(xs: List[float], p: float) -> float:
+    if not xs:
+        return 0.0
+    s = sorted(xs)
+    return s[min(len(s) - 1, int(round(p / 100.0 * (len(s) - 1))))]
+
+
+def _latencies(fn: Callable[[int], Any], n: int) -> List[float]:
+    out = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        fn(i)
+        out.append((time.perf_counter() - t0) * 1000.0)
+    return out
+
+
+def _throughput(fn: Callable[[int], Any], n: int, concurrency: int) -> float:
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        list(ex.map(fn, range(n)))
+    return n / (time.perf_counter() - t0)
+
+
+def _peak_kb(fn: Callable[[int], Any]) -> float:
+    tracemalloc.start()
+    try:
+        fn(0)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024.0
+
+
+def _summary(lat: List[float], peak_kb: float, rps: float = None) -> Dict[str, float]:
+    out = {
+        "p50_ms": round(_pct(lat, 50), 3),
+        "p95_ms": round(_pct(lat, 95), 3),
+        "peak_kb": round(peak_kb, 1),
+    }
+    if rps is not None:
+        out["throughput_rps"] = round(rps, 2)
+    return out
+
+
+# ---------- fixture ----------
+
+class Fixture:
+    """Synthetic corpus on disk, a local index over its chunks and fake models."""
+
+    def __init__(self, args):
+        self.args = args
+        self.tmp = tempfile.TemporaryDirectory(prefix="rag-bench-")
+        self.corpus_dir = os.path.join(self.tmp.name, "corpus")
+        articles = make_corpus(args.docs)
+        write_corpus(self.corpus_dir, args.docs)
+        self.questions = [q for q, _ in make_questions(articles, args.questions)]
+
+        self.embeddings = FakeEmbeddings(latency_ms=args.embed_ms)
+        self.llm = FakeChatModel(latency_ms=args.llm_ms)
+        self.index = LocalANNRetriever(self.embeddings, k=8)
+        self.index.add_documents(chunk_docs(load_ncbi_json_docs(self.corpus_dir)))
+        self.graph = GraphApp(use_supabase=False, llm=self.llm,
+                              embeddings=self.embeddings, vec_source=self.index)
+
+    def q(self, i: int) -> str:
+        return self.questions[i % len(self.questions)]
+
+
+# ---------- stages ----------
+
+def bench_loaders(fx: Fixture) -> Dict[str, float]:
+    fn = lambda i: load_ncbi_json_docs(fx.corpus_dir)
+    return _summary(_latencies(fn, 5), _peak_kb(fn))
+
+
+def bench_rrf_fuse(fx: Fixture) -> Dict[str, float]:
+    vec = [Document(page_content=f"chunk {i} " * 40, metadata={"source": f"v{i}"})
+           for i in range(40)]
+    lex = [Document(page_content=f"chunk {i} " * 40, metadata={"source": f"v{i}"})
+           for i in range(20, 60)]
+    fn = lambda i: rrf_fuse(vec, lex, k=8)
+    return _summary(_latencies(fn, 2000), _peak_kb(fn))
+
+
+def bench_retrieve(fx: Fixture) -> Dict[str, float]:
+    def fn(i):
+        q = fx.q(i)
+        with docstore_scope():
+            return retrieve({"question": q, "queries": [q, q.lower(), q.upper()]},
+                            fx.index, None)
+    n = len(fx.questions)
+    return _summary(_latencies(fn, n), _peak_kb(fn),
+                    _throughput(fn, n, fx.args.concurrency))
+
+
+def bench_graph(fx: Fixture) -> Dict[str, float]:
+    fn = lambda i: fx.graph.invoke(fx.q(i), thread_id=f"bench-{i}")
+    n = len(fx.questions)
+    clear_caches()
+    lat = _latencies(fn, n)
+    clear_caches()
+    rps = _throughput(fn, n, fx.args.concurrency)
+    clear_caches()
+    return _summary(lat, _peak_kb(fn), rps)
+
+
+def bench_api(fx: Fixture) -> Dict[str, float]:
+    from fastapi.testclient import TestClient
+    from server.core.app import create_app
+
+    client = TestClient(create_app(graph=fx.graph))
+
+    def fn(i):
+        r = client.post("/rag/ask", json={"question": fx.q(i), "thread_id": f"api-{i}"})
+        r.raise_for_status()
+        return r
+
+    n = len(fx.questions)
+    clear_caches()
+    lat = _latencies(fn, n)
+    clear_caches()
+    rps = _throughput(fn, n, fx.args.concurrency)
+    clear_caches()
+    return _summary(lat, _peak_kb(fn), rps)
+
+
+BENCHES = {
+    "loaders": bench_loaders,
+    "rrf_fuse": bench_rrf_fuse,
+    "retrieve": bench_retrieve,
+    "graph": bench_graph,
+    "api": bench_api,
+}
+
+
+# ---------- baseline ----------
+
+def _config(args) -> Dict[str, Any]:
+    return {"docs": args.docs, "questions": args.questions, "llm_ms": args.llm_ms,
+            "embed_ms": args.embed_ms, "concurrency": args.concurrency}
+
+
+def compare(current: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            tol: float, strict: bool = False) -> List[str]:
+    """Return human-readable regressions (empty list = pass); throughput only if strict."""
+    problems = []
+    for stage, cur in current.items():
+        base = baseline.get(stage)
+        if not base:
+            continue
+        for key in ("p50_ms", "p95_ms"):
+            if key in base and cur[key] > base[key] * (1 + tol) + ABS_SLACK_MS:
+                problems.append(f"{stage}.{key}: {cur[key]} > baseline {base[key]}")
+        if strict and "throughput_rps" in base and "throughput_rps" in cur:
+            if cur["throughput_rps"] < base["throughput_rps"] / (1 + tol):
+                problems.append(
+                    f"{stage}.throughput_rps: {cur['throughput_rps']} < baseline {base['throughput_rps']}")
+        if "peak_kb" in base and cur["peak_kb"] > base["peak_kb"] * (1 + tol) + ABS_SLACK_KB:
+            problems.append(f"{stage}.peak_kb: {cur['peak_kb']} > baseline {base['peak_kb']}")
+    return problems
+
+
+def print_table(results: Dict[str, Dict[str, float]]) -> None:
+    print(f"{'stage':<10} {'p50 ms':>10} {'p95 ms':>10} {'rps':>9} {'peak KB':>10}")
+    for stage, r in results.items():
+        rps = r.get("throughput_rps")
+        print(f"{stage:<10} {r['p50_ms']:>10.3f} {r['p95_ms']:>10.3f} "
+              f"{(f'{rps:.1f}' if rps is not None else '-'):>9} {r['peak_kb']:>10.1f}")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Offline RAG benchmark")
+    ap.add_argument("--stages", default=",".join(STAGES))
+    ap.add_argument("--docs", type=int, default=200)
+    ap.add_argument("--questions", type=int, default=30)
+    ap.add_argument("--llm-ms", type=float, default=5.0, help="simulated LLM latency per call")
+    ap.add_argument("--embed-ms", type=float, default=2.0, help="simulated embedding latency per call")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--tolerance", type=float, default=0.5, help="allowed relative regression")
+    ap.add_argument("--baseline", default=BASELINE_PATH)
+    ap.add_argument("--update-baseline", action="store_true")
+    ap.add_argument("--strict", action="store_true",
+                    help="also fail on throughput (only meaningful on the baseline's machine)")
+    args = ap.parse_args(argv)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in BENCHES]
+    if unknown:
+        ap.error(f"unknown stages: {unknown}")
+
+    fx = Fixture(args)
+    results = {s: BENCHES[s](fx) for s in stages}
+    print_table(results)
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"config": _config(args), "results": results}, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline stored; run with --update-baseline to create one.")
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        stored = json.load(f)
+    if stored.get("config") != _config(args):
+        print("Baseline was recorded with a different config; skipping comparison.")
+        return 0
+
+    problems = compare(results, stored.get("results", {}), args.tolerance, args.strict)
+    if not args.strict:
+        for p in compare(results, stored.get("results", {}), args.tolerance, strict=True):
+            if p not in problems:
+                print("NOTE (throughput, not checked without --strict)", p)
+    for p in problems:
+        print("REGRESSION", p)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,7 +7,13 @@ A package for retrieving biology-related research papers from Google Scholar via
 __version__ = "0.1.0"
 __author__ = "Sinan"
 
-__all__ = []
+__all__ = ["fetch_scholar_results"]
 
-# Optional: expose main functionality at the top level
-from .search.serpapi_client import fetch_scholar_results
+
+def __getattr__(name):
+    # Expose main functionality at the top level without importing the search
+    # client (requests / serpapi) until it is first used
+    if name == "fetch_scholar_results":
+        from .search.serpapi_client import fetch_scholar_results
+        return fetch_scholar_results
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
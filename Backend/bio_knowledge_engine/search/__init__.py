@@ -4,16 +4,17 @@
  Purpose: Initialize the search module and import necessary components.
 """
 
-from .serpapi_client import (
-    search_web_serpapi,
-    search_scholar_serpapi,
-    build_external_context,
-    fetch_scholar_results,  # backward-compat
-)
-
 __all__ = [
     "search_web_serpapi",
     "search_scholar_serpapi",
     "build_external_context",
-    "fetch_scholar_results",
+    "fetch_scholar_results",  # backward-compat
 ]
+
+
+def __getattr__(name):
+    # Resolved on first access, so `import bio_knowledge_engine.search` stays cheap
+    if name in __all__:
+        from . import serpapi_client
+        return getattr(serpapi_client, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
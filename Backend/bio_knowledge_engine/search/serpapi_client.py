@@ -6,11 +6,8 @@ import tempfile
 import requests
 from typing import List, Dict, Any, Optional
 
-from serpapi import GoogleSearch
-from bs4 import BeautifulSoup
-
-# PDF -> text (PyMuPDF)
-import fitz  # PyMuPDF
+# serpapi, bs4/lxml and PyMuPDF (fitz) are imported inside the functions that use
+# them: importing this module (e.g. from the API server) stays cheap.
 
 # ---- config (SERPAPI_KEY .env'den gelir) ----
 SERPAPI_KEY = os.getenv("SERPAPI_KEY")
@@ -40,6 +37,7 @@ def search_web_serpapi(query: str, num: int = 6) -> List[Dict[str, Any]]:
         "hl": "en",
         "safe": "active",
     }
+    from serpapi import GoogleSearch
     try:
         res = GoogleSearch(params).get_dict()
         items = res.get("organic_results", []) or []
@@ -68,6 +66,7 @@ def search_scholar_serpapi(query: str, num: int = 6) -> List[Dict[str, Any]]:
         "num": num,
         "api_key": SERPAPI_KEY,
     }
+    from serpapi import GoogleSearch
     try:
         res = GoogleSearch(params).get_dict()
         items = res.get("organic_results", []) or []
@@ -107,6 +106,7 @@ KEEP_HEADINGS = {"h1", "h2", "h3"}
 
 def fetch_url_text(url: str, max_chars: int = 4000) -> Optional[str]:
     """Basit, hızlı içerik çıkarma: p/li + başlıklar, script/style temizliği."""
+    from bs4 import BeautifulSoup
     try:
         r = SESSION.get(url, timeout=HTTP_TIMEOUT)
         r.raise_for_status()
@@ -160,6 +160,7 @@ def extract_pdf_text(pdf_url: Optional[str], max_pages: int = 6) -> Optional[str
     """PDF'i indir → hızlıca metin çıkar → dosyayı sil. (daha az bellek/tıkanma)"""
     if not pdf_url:
         return None
+    import fitz  # PyMuPDF
     try:
         r = SESSION.get(pdf_url, timeout=HTTP_TIMEOUT)
         r.raise_for_status()
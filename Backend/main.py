@@ -1,11 +1,8 @@
 from typing import Literal
 import os
-import json
 import re
 
 from langchain_core.messages import HumanMessage, SystemMessage
-from langchain.docstore.document import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_chroma import Chroma
 
 from langgraph.checkpoint.memory import MemorySaver
@@ -14,6 +11,9 @@ from langgraph.graph import END, START, StateGraph, MessagesState
 from langchain_ollama.chat_models import ChatOllama
 from langchain_ollama import OllamaEmbeddings
 
+from agentic_rag.ingest.chunking import chunk_docs
+from agentic_rag.ingest.loaders import load_ncbi_json_docs
+
 
 # ---------- Config ----------
 # ör: nomic-embed-text / snowflake-arctic-embed / mxbai-embed-large
@@ -23,39 +23,6 @@ COLLECTION = "python_docs"
 JSON_PATH = "test.json"                    # tek JSON dosyan
 
 
-# ---------- Helper: load JSON -> Documents (no JSONLoader) ----------
-def load_docs_from_json(path: str) -> list[Document]:
-    with open(path, "r", encoding="utf-8") as f:
-        d = json.load(f)
-
-    row = d.get("row", {})
-    scr = d.get("scrape", {})
-
-    # BOM'lu Title anahtarı için güvenli erişim
-    title = row.get("\ufeffTitle") or row.get("Title", "")
-    link = row.get("Link", "")
-
-    text_blocks = [
-        title,
-        link,
-        scr.get("title", ""),
-        scr.get("abstract", ""),
-        scr.get("full_text", ""),
-    ]
-    page_content = "\n\n".join([t for t in text_blocks if t])
-
-    doc = Document(
-        page_content=page_content,
-        metadata={
-            "url": scr.get("url"),
-            "doi": scr.get("doi"),
-            "source": os.path.basename(path),
-            "title": title or scr.get("title", ""),
-        },
-    )
-    return [doc]
-
-
 # ---------- Build / Open Vectorstore ----------
 embeddings = OllamaEmbeddings(model=EMBED_MODEL)
 
@@ -68,10 +35,8 @@ def ensure_index():
         if not os.path.exists(JSON_PATH):
             raise FileNotFoundError(f"JSON yok: {JSON_PATH}")
 
-        docs = load_docs_from_json(JSON_PATH)
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=2000, chunk_overlap=50)
-        chunks = splitter.split_documents(docs)
+        docs = load_ncbi_json_docs(JSON_PATH)   # same text rules as the API index
+        chunks = chunk_docs(docs)   # section-aware, CHUNK_SIZE / CHUNK_OVERLAP
 
         vectorstore = Chroma.from_documents(
             documents=chunks,
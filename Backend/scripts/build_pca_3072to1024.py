@@ -1,7 +1,7 @@
 # scripts/build_pca_3072to1024.py
 import os
-import glob
-import json
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 from dotenv import load_dotenv
 from joblib import dump
@@ -9,45 +9,60 @@ from tqdm import tqdm
 from sklearn.decomposition import PCA
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 
+from agentic_rag.config import EMBED_MODEL, EMBED_STORE_MODEL
+from agentic_rag.embstore import open_store
+from agentic_rag.gateway import wrap_batch_embeddings
+from agentic_rag.ingest.loaders import iter_corpus_docs
+
 load_dotenv()
 
-EMBED_MODEL = os.getenv("EMBED_MODEL", "gemini-embedding-001")
-GOOGLE_API_KEY = os.environ["GOOGLE_API_KEY"]
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
 CORPUS_DIR = os.getenv("JSON_PATH", "data/corpus")
 OUT_PATH = os.getenv("PCA_PATH", "models/pca_3072to1024.joblib")
 N_COMPONENTS = int(os.getenv("PCA_COMPONENTS", "1024"))
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "8"))
+# Fit on this many vectors; taken from the local embedding store (chunks embedded by
+# index_supabase / build_snapshot with the same model) when it holds enough of them
+PCA_SAMPLES = int(os.getenv("PCA_SAMPLES", "5000"))
+
+
+def iter_texts(max_files=PCA_SAMPLES):
+    # Canonical article text (ingest/loaders.py); JSON_PATH may be a folder, a packed
+    # corpus or a corpus snapshot (memory-mapped, nothing re-parsed)
+    return (d.page_content for d in iter_corpus_docs(CORPUS_DIR, max_files=max_files))
+
+
+def embed_samples():
+    if not GOOGLE_API_KEY:
+        raise SystemExit("GOOGLE_API_KEY missing and the embedding store has too few vectors")
+    # Gateway: rate limits, retries with jitter and deadlines shared with the app
+    emb = wrap_batch_embeddings(GoogleGenerativeAIEmbeddings(
+        model=EMBED_MODEL, google_api_key=GOOGLE_API_KEY))
 
-emb = GoogleGenerativeAIEmbeddings(
-    model=EMBED_MODEL, google_api_key=GOOGLE_API_KEY)
+    samples = list(iter_texts())
+    with ThreadPoolExecutor(max_workers=EMBED_WORKERS) as pool:
+        return np.array(list(tqdm(pool.map(emb.embed_query, samples), total=len(samples),
+                                  desc="Embedding sample")), dtype=np.float32)
 
 
-def iter_texts(max_files=5000):
-    files = sorted(glob.glob(os.path.join(CORPUS_DIR, "*.json")))
-    for i, p in enumerate(files):
-        with open(p, "r", encoding="utf-8") as f:
-            d = json.load(f)
-        row, scr = d.get("row", {}), d.get("scrape", {})
-        title = row.get("\ufeffTitle") or row.get(
-            "Title") or scr.get("title") or ""
-        abstract = scr.get("abstract", "") or ""
-        full = scr.get("full_text", "") or ""
-        text = "\n\n".join(t for t in [title, abstract, full] if t)
-        if text.strip():
-            yield text
-        if i + 1 >= max_files:
-            break
+def main():
+    store = open_store(EMBED_STORE_MODEL, readonly=True)
+    if store is not None and store.count >= min(PCA_SAMPLES, 2 * N_COMPONENTS):
+        X = store.sample(PCA_SAMPLES)
+        print(f"[embed-store] fitting on {len(X)} stored vectors from {store.dir}")
+    else:
+        X = embed_samples()
 
+    pca = PCA(n_components=N_COMPONENTS, svd_solver="auto", random_state=42)
+    pca.fit(X)
 
-samples = list(iter_texts())
-X = np.array([emb.embed_query(t)
-             for t in tqdm(samples, desc="Embedding sample")], dtype=np.float32)
+    explained = pca.explained_variance_ratio_.sum()
+    print(f"Explained variance: {explained*100:.2f}% with {N_COMPONENTS} dims")
 
-pca = PCA(n_components=N_COMPONENTS, svd_solver="auto", random_state=42)
-pca.fit(X)
+    os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
+    dump(pca, OUT_PATH)
+    print("Saved PCA to", OUT_PATH)
 
-explained = pca.explained_variance_ratio_.sum()
-print(f"Explained variance: {explained*100:.2f}% with {N_COMPONENTS} dims")
 
-os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
-dump(pca, OUT_PATH)
-print("Saved PCA to", OUT_PATH)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# scripts/build_snapshot.py
+# Build the columnar corpus snapshot (agentic_rag/ingest/snapshot.py) from the raw JSON:
+# normalized fields + article text, chunk spans, content hashes and, optionally,
+# the chunk embeddings. Point JSON_PATH at the snapshot directory afterwards;
+# indexing, BM25, PCA/RP fitting, evaluation and index_supabase read it instead of
+# re-parsing (and index_supabase reuses the stored vectors of the same model).
+#
+#   JSON_PATH=data/corpus SNAPSHOT_PATH=data/snapshot python -m scripts.build_snapshot
+#   SNAPSHOT_EMBED=ollama SNAPSHOT_EMBED_DTYPE=float16 python -m scripts.build_snapshot
+
+import os
+import time
+from functools import partial
+from typing import List
+
+from dotenv import load_dotenv
+
+from agentic_rag.config import EMBED_MODEL, EMBED_STORE_MODEL
+from agentic_rag.embstore import open_store
+from agentic_rag.gateway import wrap_batch_embeddings
+from agentic_rag.ingest.snapshot import write_snapshot
+
+load_dotenv()
+
+JSON_PATH = os.getenv("JSON_PATH", "data/corpus")
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "data/snapshot")
+# none | ollama | gemini  (labels match scripts/index_supabase.py so its vectors are reused)
+SNAPSHOT_EMBED = os.getenv("SNAPSHOT_EMBED", "none").lower()
+SNAPSHOT_EMBED_DTYPE = os.getenv("SNAPSHOT_EMBED_DTYPE", "float32")   # float32 | float16
+OLLAMA_EMBED_MODEL = os.getenv("OLLAMA_EMBED_MODEL", "mxbai-embed-large")
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434")
+
+
+def choose_embedder():
+    """(embed_documents callable, label) or (None, None)."""
+    if SNAPSHOT_EMBED == "none":
+        return None, None
+    if SNAPSHOT_EMBED == "ollama":
+        from langchain_community.embeddings import OllamaEmbeddings
+        emb = wrap_batch_embeddings(OllamaEmbeddings(model=OLLAMA_EMBED_MODEL,
+                                                     base_url=OLLAMA_BASE_URL))
+        return emb.embed_documents, f"ollama:{OLLAMA_EMBED_MODEL}"
+    if SNAPSHOT_EMBED == "gemini":
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        emb = wrap_batch_embeddings(GoogleGenerativeAIEmbeddings(
+            model=EMBED_MODEL, google_api_key=os.environ["GOOGLE_API_KEY"]))
+        return emb.embed_documents, EMBED_STORE_MODEL
+    raise RuntimeError(f"Unknown SNAPSHOT_EMBED={SNAPSHOT_EMBED}")
+
+
+def _normalized(embed):
+    import numpy as np
+
+    def run(texts: List[str]):
+        X = np.asarray(embed(texts), dtype=np.float32)
+        return X / (np.linalg.norm(X, axis=1, keepdims=True) + 1e-12)
+    return run
+
+
+def main():
+    embed, label = choose_embedder()
+    if embed is not None:
+        # vectors already in the local embedding store are not requested again
+        embed = _normalized(embed)
+        store = open_store(label)
+        if store is not None:
+            embed = partial(store.embed, embed_fn=embed)
+    t0 = time.perf_counter()
+    m = write_snapshot(JSON_PATH, SNAPSHOT_PATH, embed=embed,
+                       embed_model=label, embed_dtype=SNAPSHOT_EMBED_DTYPE)
+    emb = m["embedding"]
+    print(f"[snapshot] {SNAPSHOT_PATH}: {m['articles']} articles, {m['chunks']} chunks"
+          + (f", embeddings {emb['model']} {emb['dim']}d {emb['dtype']}" if emb else "")
+          + f" in {time.perf_counter() - t0:.1f}s")
+    if m["dedup"]:
+        d = m["dedup"]
+        print(f"[dedup] dropped {d['exact'] + d['near']} of {d['seen']} chunks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# scripts/compare_hyde_recall.py
+# Compare multi-query expansion against HyDE retrieval (mean / max blend).
+#
+# - Input: JSONL, one {"question": "...", "relevant": ["<article doc_id>", ...]} per line
+# - Runs the planner once per question (rewrites + HyDE passage come from the same call)
+# - Runs the retrieve node in each mode against the live vector backend
+# - Reports recall@k plus embedding and ANN calls per question
+
+import os
+import json
+from typing import Any, Dict, List
+
+import numpy as np
+from dotenv import load_dotenv
+
+from agentic_rag.docstore import docstore_scope
+from agentic_rag.graph import GraphApp
+from agentic_rag.nodes.plan import plan
+from agentic_rag.nodes.retrieve import retrieve
+
+load_dotenv()
+
+QRELS_PATH = os.getenv("QRELS_PATH", "data/eval/qrels.jsonl")
+MODES = ("off", "mean", "max")
+
+
+class CountingSource:
+    """Proxy around the vector source that counts embedding and ANN calls."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.embedder = self
+        self.embed_calls = 0
+        self.ann_calls = 0
+
+    # embedder side
+    def embed_query(self, text: str):
+        self.embed_calls += 1
+        return self.inner.embedder.embed_query(text)
+
+    def embed_documents(self, texts: List[str]):
+        self.embed_calls += 1
+        return self.inner.embedder.embed_documents(texts)
+
+    # retriever side (SupabaseANNRetriever interface)
+    def invoke(self, query: str, **kw):
+        v = np.asarray(self.embed_query(query), dtype=np.float32)
+        return self.invoke_vector(v, **kw)
+
+    def invoke_vector(self, v, **kw):
+        self.ann_calls += 1
+        return self.inner.invoke_vector(v, **kw)
+
+
+def load_qrels(path: str) -> List[Dict[str, Any]]:
+    out = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                out.append(json.loads(line))
+    return out
+
+
+def recall_at_k(doc_ids: List[str], relevant: List[str]) -> float:
+    rel = set(relevant)
+    return len(rel.intersection(doc_ids)) / len(rel) if rel else 0.0
+
+
+def main():
+    qrels = load_qrels(QRELS_PATH)
+    if not qrels:
+        raise SystemExit(f"No labeled queries in: {QRELS_PATH}")
+
+    app = GraphApp(build_index=False)
+    if app.supa is None:
+        raise SystemExit("Supabase retriever is required for this comparison.")
+
+    totals = {m: {"recall": 0.0, "embed": 0, "ann": 0} for m in MODES}
+    for item in qrels:
+        planned = plan(app.llm, {"question": item["question"]})
+        for mode in MODES:
+            src = CountingSource(app.supa)
+            state = {**planned, "hyde_mode": mode, "searched": [], "doc_refs": []}
+            with docstore_scope():
+                out = retrieve(state, src, None)
+            ids = [r["doc_id"] for r in out["doc_refs"]]
+            totals[mode]["recall"] += recall_at_k(ids, item.get("relevant") or [])
+            totals[mode]["embed"] += src.embed_calls
+            totals[mode]["ann"] += src.ann_calls
+
+    n = len(qrels)
+    print(f"{'mode':<6} {'recall@k':>9} {'embed/q':>8} {'ann/q':>6}   (n={n})")
+    for mode in MODES:
+        t = totals[mode]
+        print(f"{mode:<6} {t['recall'] / n:>9.3f} {t['embed'] / n:>8.2f} {t['ann'] / n:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
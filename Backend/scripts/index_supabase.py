@@ -3,23 +3,32 @@
 # Default: local Ollama embeddings (mxbai-embed-large, 1024-d) -> no RP/PCA needed.
 # Optional: Gemini (3072-d) + Random Projection to 1024 if EMBED_BACKEND=gemini.
 #
-# - Loads JSON via our loader (keeps image URLs in metadata; captions in text)
-# - Chunks text
-# - Embeds (Ollama OR Gemini)
-# - (If Gemini) compresses to 1024 via RP (sklearn or {"W":...})
+# - Loads JSON via our loader (keeps image URLs in metadata; captions in text),
+#   or a corpus snapshot (chunks + optional embeddings from scripts/build_snapshot.py)
+# - Chunks text section by section, streaming (chunk rows keep section + offsets)
+# - Drops exact / near-duplicate chunks (MinHash + LSH) before they are embedded
+# - Embeds (Ollama OR Gemini), through the local embedding store (agentic_rag/embstore.py)
+# - (If Gemini) compresses to 1024 via RP_PATH (agentic_rag/projection.py: W + mean)
+# - After a scripts/reproject swap, also writes the active column / table with the
+#   manifest's projection (ACTIVE_INDEX_PATH), so new chunks are visible to the live RPC
 # - L2-normalizes
-# - Upserts batched rows into Supabase
+# - LEAN_METADATA=1: upserts article metadata once per article and batched chunk
+#   rows carrying only doc_id + offsets (docs/lean_metadata.md); default 0 keeps the
+#   full metadata on every chunk row (no articles table needed)
+# - PURGE_STALE=1: deletes chunk rows this run did not write (ids from the previous
+#   chunker / id scheme, chunks that no longer exist)
 
 import os
 import hashlib
-from typing import List, Dict, Any, Tuple
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Set, Tuple
 
 import numpy as np
 from dotenv import load_dotenv
 from tqdm import tqdm
 from supabase import create_client
 
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 
 # Backends (instantiate at runtime only)
@@ -27,13 +36,15 @@ from langchain_community.embeddings import OllamaEmbeddings
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 
 # Our utils
+from agentic_rag.config import ACTIVE_INDEX_PATH, EMBED_MODEL, EMBED_STORE_MODEL
 from agentic_rag.ingest.loaders import load_ncbi_json_docs
-
-# Optional RP loader (only used if EMBED_BACKEND=gemini)
-try:
-    from joblib import load as joblib_load
-except Exception:
-    joblib_load = None
+from agentic_rag.ingest.chunking import iter_chunks
+from agentic_rag.ingest.dedup import NearDupFilter, dedup_chunks
+from agentic_rag.ingest.snapshot import Snapshot, is_snapshot
+from agentic_rag.gateway import wrap_batch_embeddings
+from agentic_rag.embstore import open_store
+from agentic_rag.projection import load_projection, project, read_active
+from agentic_rag.retrievers.articles import split_metadata
 
 load_dotenv()
 
@@ -47,7 +58,7 @@ OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434")
 
 # Gemini (only if you insist)
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
-EMBED_MODEL = os.getenv("EMBED_MODEL", "text-embedding-004")  # 3072-d
+# EMBED_MODEL (3072-d) and its store label EMBED_STORE_MODEL come from agentic_rag.config
 # needed for gemini path
 RP_PATH = os.getenv("RP_PATH", "models/rp_3072to1024.joblib")
 
@@ -58,15 +69,28 @@ JSON_PATH = os.getenv("JSON_PATH", "data/corpus")
 SUPABASE_URL = os.environ["SUPABASE_URL"]
 SUPABASE_KEY = os.environ["SUPABASE_SERVICE_ROLE_KEY"]
 TABLE = os.getenv("SUPABASE_TABLE", "documents")
+ARTICLES_TABLE = os.getenv("SUPABASE_ARTICLES_TABLE", "articles")
+# 1 -> article metadata in ARTICLES_TABLE, chunk rows get {doc_id, section, chunk, start, end};
+# 0 -> legacy layout (full metadata copied onto every chunk row), default: works without
+#      an articles table
+LEAN_METADATA = os.getenv("LEAN_METADATA", "0") == "1"
 
 # Chunking & batching
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1200"))
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "150"))
 BATCH_SIZE = int(os.getenv("BATCH_SIZE", "200"))
+# Chunks whose MinHash Jaccard with an earlier chunk is >= this are not embedded (0 = keep all)
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.85"))
+# Texts per embed_documents call and parallel calls in flight (the gateway still
+# enforces EMBED_RPM / EMBED_TPM / EMBED_MAX_CONCURRENCY and retries 429s)
+EMBED_BATCH = int(os.getenv("EMBED_BATCH", "32"))
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "8"))
 
 # Optional slicing for huge corpora
 INDEX_LIMIT = int(os.getenv("INDEX_LIMIT", "0"))   # 0 => no cap
 INDEX_START_OFFSET = int(os.getenv("INDEX_START_OFFSET", "0"))
+# 1 -> after a full run, delete chunk rows whose id was not written (not with a slice)
+PURGE_STALE = os.getenv("PURGE_STALE", "0") == "1"
 
 
 # ---------- HELPERS ----------
@@ -85,113 +109,190 @@ def stable_doc_id(md: Dict[str, Any], content: str, chunk_idx: int) -> str:
     return hashlib.sha256(key.encode("utf-8")).hexdigest()
 
 
-def load_rp(path: str) -> Tuple[str, Any]:
-    """Load RP either as sklearn transformer (with .transform) or dict with 'W'."""
-    if joblib_load is None:
-        raise RuntimeError(
-            "joblib not available but RP_PATH is required for gemini backend.")
-    obj = joblib_load(path)
-    if hasattr(obj, "transform"):
-        return ("sklearn", obj)
-    if isinstance(obj, dict) and "W" in obj:
-        W = np.asarray(obj["W"]).astype(np.float32)  # (1024, 3072)
-        return ("matrix", W)
-    raise RuntimeError(
-        "Unsupported RP joblib format. Expect sklearn RP or {'W': ...} dict.")
-
-
-def rp_project(vec3072: np.ndarray, rp_kind: str, rp_obj) -> np.ndarray:
-    if rp_kind == "sklearn":
-        out = rp_obj.transform([vec3072])[0]
-        return np.asarray(out, dtype=np.float32)
-    elif rp_kind == "matrix":
-        W = rp_obj  # (1024, 3072)
-        return (W @ vec3072.astype(np.float32))
-    else:
-        raise RuntimeError("Unknown RP kind")
+def articles_table_ok(sb) -> bool:
+    """True when ARTICLES_TABLE can be read (the lean layout cannot work without it)."""
+    try:
+        sb.table(ARTICLES_TABLE).select("doc_id").limit(1).execute()
+        return True
+    except Exception as e:
+        print(f"[articles] {ARTICLES_TABLE} is not usable ({e}); writing full metadata "
+              f"per chunk instead (see docs/lean_metadata.md for the schema)")
+        return False
+
+
+def purge_stale(sb, keep: Set[str], page: int = 1000) -> int:
+    """Delete chunk rows whose id is not in `keep`; returns how many were deleted."""
+    # Collect first, then delete, so the keyset pagination never sees its own deletes
+    stale: List[str] = []
+    last = None
+    while True:
+        q = sb.table(TABLE).select("doc_id").order("doc_id").limit(page)
+        if last is not None:
+            q = q.gt("doc_id", last)
+        rows = q.execute().data or []
+        if not rows:
+            break
+        stale.extend(r["doc_id"] for r in rows if r["doc_id"] not in keep)
+        last = rows[-1]["doc_id"]
+    for start in range(0, len(stale), BATCH_SIZE):
+        sb.table(TABLE).delete().in_("doc_id", stale[start:start + BATCH_SIZE]).execute()
+    return len(stale)
+
+
+def vector_targets(backend: str, in_dim: int) -> List[Tuple[str, str, Optional[np.ndarray],
+                                                          Optional[np.ndarray]]]:
+    """
+    [(table, column, W, mean)]: every vector column a chunk row gets.
+    - TABLE.embedding always (RP_PATH on the Gemini path, the vector as is on Ollama),
+      so rolling the active index back loses no new chunk
+    - the active column / table of ACTIVE_INDEX_PATH with its projection, once
+      scripts/reproject has swapped it (the live RPC only sees rows that have it)
+    """
+    W, mean = load_projection(RP_PATH) if backend == "gemini" else (None, None)
+    targets = [(TABLE, "embedding", W, mean)]
+    m = read_active(ACTIVE_INDEX_PATH)
+    if m:
+        W, mean = load_projection(m["rp_path"])
+        if W.shape[1] != in_dim:
+            raise SystemExit(
+                f"Active index {ACTIVE_INDEX_PATH} projects {W.shape[1]}-d vectors, this "
+                f"embedder gives {in_dim}-d: ingest with {m.get('model')} or roll it back")
+        targets.append((m.get("table") or TABLE, m.get("column") or "embedding", W, mean))
+    return targets
 
 
 def choose_embedder():
-    """Return (backend, embedder, out_dim, note)."""
+    """Return (backend, embedder, out_dim, note); embedders go through the model gateway."""
     if EMBED_BACKEND == "ollama":
-        emb = OllamaEmbeddings(model=OLLAMA_EMBED_MODEL,
-                               base_url=OLLAMA_BASE_URL)
+        emb = wrap_batch_embeddings(OllamaEmbeddings(model=OLLAMA_EMBED_MODEL,
+                                                     base_url=OLLAMA_BASE_URL))
         dim = 1024  # mxbai-embed-large
         return ("ollama", emb, dim, f"ollama:{OLLAMA_EMBED_MODEL}")
     elif EMBED_BACKEND == "gemini":
         if not GOOGLE_API_KEY:
             raise RuntimeError(
                 "GOOGLE_API_KEY missing but EMBED_BACKEND=gemini")
-        emb = GoogleGenerativeAIEmbeddings(
-            model=EMBED_MODEL, google_api_key=GOOGLE_API_KEY)
+        emb = wrap_batch_embeddings(GoogleGenerativeAIEmbeddings(
+            model=EMBED_MODEL, google_api_key=GOOGLE_API_KEY))
         dim = 3072  # will be RP-compressed to 1024
-        return ("gemini", emb, dim, f"gemini:{EMBED_MODEL}")
+        return ("gemini", emb, dim, EMBED_STORE_MODEL)
     else:
         raise RuntimeError(f"Unknown EMBED_BACKEND={EMBED_BACKEND}")
 
 
+def embed_batched(emb, texts: List[str], pool: ThreadPoolExecutor) -> List[np.ndarray]:
+    """Embed texts in EMBED_BATCH-sized calls, EMBED_WORKERS at a time, keeping order."""
+    batches = [texts[i:i + EMBED_BATCH] for i in range(0, len(texts), EMBED_BATCH)]
+    out: List[np.ndarray] = []
+    for vecs in pool.map(emb.embed_documents, batches):
+        out.extend(l2norm(np.asarray(v, dtype=np.float32)) for v in vecs)
+    return out
+
+
 # ---------- MAIN ----------
 def main():
-    # 1) Load docs
-    docs = load_ncbi_json_docs(JSON_PATH)
+    if PURGE_STALE and (INDEX_LIMIT > 0 or INDEX_START_OFFSET > 0):
+        raise SystemExit("PURGE_STALE=1 needs a full run (unset INDEX_LIMIT / INDEX_START_OFFSET)")
+
+    # 1) Load docs (JSON_PATH may be a corpus snapshot: scripts/build_snapshot.py)
+    snap = Snapshot(JSON_PATH) if is_snapshot(JSON_PATH) else None
+    docs = list(snap.documents()) if snap else load_ncbi_json_docs(JSON_PATH)
     if not docs:
         raise SystemExit(f"No JSON docs found under: {JSON_PATH}")
 
-    # 2) Chunk
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
-    chunks = splitter.split_documents(docs)
-
-    if INDEX_LIMIT > 0:
-        chunks = chunks[INDEX_START_OFFSET: INDEX_START_OFFSET + INDEX_LIMIT]
-
-    print(f"Chunks: {len(chunks)}")
+    # 2) Chunk lazily: section-aware pieces are produced as the batches need them;
+    #    duplicates are filtered before slicing so offsets are stable across runs.
+    #    A snapshot already holds the (deduplicated) chunks.
+    dedup = None
+    if snap is not None:
+        chunks = snap.iter_chunks()
+    else:
+        dedup = NearDupFilter(NEAR_DUP_THRESHOLD) if NEAR_DUP_THRESHOLD > 0 else None
+        chunks = dedup_chunks(iter_chunks(docs, CHUNK_SIZE, CHUNK_OVERLAP), dedup=dedup)
+    if INDEX_LIMIT > 0 or INDEX_START_OFFSET > 0:
+        stop = INDEX_START_OFFSET + INDEX_LIMIT if INDEX_LIMIT > 0 else None
+        chunks = islice(chunks, INDEX_START_OFFSET, stop)
 
-    # 3) Choose embedder
+    # 3) Choose embedder; vectors stored in the snapshot by the same model are reused
     backend, emb, in_dim, label = choose_embedder()
     print(f"[embeddings] backend={backend} ({label}), input_dim={in_dim}")
-
-    # If Gemini path, prepare RP to 1024 so it matches DB vector(1024)
-    rp_kind, rp_obj = (None, None)
-    if backend == "gemini":
-        rp_kind, rp_obj = load_rp(RP_PATH)
-        print(f"[rp] loaded kind={rp_kind} from {RP_PATH} -> output_dim=1024")
+    stored = snap.embeddings() if snap is not None and snap.embedding_model == label else None
+    if stored is not None:
+        print(f"[embeddings] reusing {len(stored)} vectors from the snapshot")
+    # Full vectors are kept in the local embedding store (EMBED_STORE_DIR): re-runs,
+    # backend/projection switches and PCA/RP fitting do not pay for them again
+    store = open_store(label)
+    if store is not None:
+        print(f"[embed-store] {store.dir}: {store.count} vectors")
+
+    # Projections: RP_PATH for `embedding` (Gemini 3072 -> DB vector(1024)), plus the
+    # active column / table after a reproject swap
+    targets = vector_targets(backend, in_dim)
+    for table, column, W, _ in targets:
+        print(f"[vectors] {table}.{column}: {in_dim} -> {W.shape[0] if W is not None else in_dim}")
 
     # 4) Supabase client
     sb = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-    # 5) Embed & upsert
-    rows: List[Dict[str, Any]] = []
-    for i, d in enumerate(tqdm(chunks, desc="Embed+upsert")):
-        v = np.asarray(emb.embed_query(d.page_content), dtype=np.float32)
-        v = l2norm(v)
-
-        row: Dict[str, Any] = {
-            "doc_id": stable_doc_id(d.metadata or {}, d.page_content, i),
-            "content": d.page_content,
-            "metadata": d.metadata or {},
-        }
-
-        if backend == "ollama":
-            # already 1024-d
-            row["embedding"] = pylist(v)         # vector(1024)
-            # 'full_embedding' left absent on purpose
+    # 4b) Article metadata, once per article (lean layout only if the table exists)
+    lean = LEAN_METADATA and articles_table_ok(sb)
+    if lean:
+        rows_a = [{"doc_id": d.metadata["doc_id"], "metadata": split_metadata(d.metadata)[0]}
+                  for d in docs if d.metadata.get("doc_id")]
+        for start in range(0, len(rows_a), BATCH_SIZE):
+            sb.table(ARTICLES_TABLE).upsert(rows_a[start:start + BATCH_SIZE]).execute()
+        print(f"[articles] upserted {len(rows_a)} into {ARTICLES_TABLE}")
+
+    # 5) Embed (batched, parallel) & upsert
+    rows: Dict[str, Dict[int, Dict[str, Any]]] = {}   # table -> batch position -> row
+    written: Set[str] = set()
+    pool = ThreadPoolExecutor(max_workers=EMBED_WORKERS)
+    pbar = tqdm(desc="Embed+upsert", unit="chunk")
+    pos = INDEX_START_OFFSET          # position in the chunk stream (stored vectors)
+    while True:
+        batch = list(islice(chunks, BATCH_SIZE))
+        if not batch:
+            break
+        if stored is not None:
+            vecs = [l2norm(v) for v in stored[pos:pos + len(batch)]]
+        elif store is not None:
+            vecs = list(store.embed([d.page_content for d in batch],
+                                    lambda texts: embed_batched(emb, texts, pool)))
         else:
-            # gemini 3072 -> RP -> 1024
-            v_comp = l2norm(rp_project(v, rp_kind, rp_obj))
-            row["embedding"] = pylist(v_comp)    # vector(1024)
-            row["full_embedding"] = pylist(v)    # jsonb (optional column)
-
-        rows.append(row)
-
-        if len(rows) >= BATCH_SIZE:
-            sb.table(TABLE).upsert(rows).execute()
-            rows.clear()
-
-    if rows:
-        sb.table(TABLE).upsert(rows).execute()
-
-    print("Done. Upserted into Supabase.")
+            vecs = embed_batched(emb, [d.page_content for d in batch], pool)
+        pos += len(batch)
+
+        # one matrix product per target column for the whole batch
+        X = np.stack(vecs)
+        projected = [(table, column, project(X, W, mean)) for table, column, W, mean in targets]
+        for i, d in enumerate(batch):
+            md = d.metadata or {}
+            row: Dict[str, Any] = {
+                # chunk index within the article: ids do not depend on INDEX_START_OFFSET
+                "doc_id": stable_doc_id(md, d.page_content, md["chunk"]),
+                "content": d.page_content,
+                "metadata": split_metadata(md)[1] if lean else md,
+            }
+            if backend == "gemini":
+                row["full_embedding"] = pylist(X[i])   # jsonb (Ollama: left absent on purpose)
+            for table, column, Y in projected:
+                rows.setdefault(table, {}).setdefault(i, dict(row))[column] = pylist(Y[i])
+            if PURGE_STALE:
+                written.add(row["doc_id"])
+
+        for table, by_chunk in rows.items():
+            sb.table(table).upsert(list(by_chunk.values())).execute()
+        rows.clear()
+        pbar.update(len(batch))
+    pbar.close()
+    pool.shutdown()
+
+    print(f"Done. Upserted {pbar.n} chunks into Supabase.")
+    # 6) Rows from the previous chunker / id scheme would otherwise be returned twice
+    if PURGE_STALE:
+        print(f"[purge] deleted {purge_stale(sb, written)} stale chunk rows from {TABLE}")
+    if dedup is not None:
+        print(f"[dedup] {dedup.report()}")
 
 
 if __name__ == "__main__":
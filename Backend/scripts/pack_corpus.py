@@ -0,0 +1,29 @@
+# scripts/pack_corpus.py
+# Pack the JSON corpus folder into one JSONL file (header + one line per source file).
+# Point JSON_PATH at the packed file afterwards: indexing, loaders and the PCA/RP
+# scripts read it memory-mapped, and its fingerprint comes from the header.
+#
+#   JSON_PATH=data/corpus PACKED_PATH=data/corpus.jsonl python -m scripts.pack_corpus
+
+import os
+import time
+from dotenv import load_dotenv
+
+from agentic_rag.ingest.corpus import pack_corpus
+
+load_dotenv()
+
+JSON_PATH = os.getenv("JSON_PATH", "data/corpus")
+PACKED_PATH = os.getenv("PACKED_PATH", "data/corpus.jsonl")
+
+
+def main():
+    t0 = time.perf_counter()
+    fp = pack_corpus(JSON_PATH, PACKED_PATH)
+    mb = os.path.getsize(PACKED_PATH) / 1e6
+    print(f"[pack] {JSON_PATH} -> {PACKED_PATH} ({mb:.1f} MB, fingerprint {fp[:12]}) "
+          f"in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+# scripts/reproject.py
+# Re-project the Supabase chunk vectors with a new RP / PCA without re-embedding.
+#
+# - Streams chunk rows (doc_id, content, metadata[, full_embedding]) by keyset pagination
+# - Full vectors come from the local embedding store (agentic_rag/embstore.py, keyed by
+#   the chunk hash) and/or the `full_embedding` jsonb column
+# - Applies the projection to whole blocks at once: l2((X - mean) @ W.T)
+# - Writes only doc_id + the new vector into a new column (--column) of the same
+#   table, through a bulk-update RPC (or per-row updates), or upserts full rows into
+#   a new table (--table) created beforehand (SQL in docs/reprojection.md)
+# - When every row was written, saves the projection and atomically swaps the
+#   active-index manifest, which the API's retriever follows (no restart needed)
+#
+#   python -m scripts.reproject --fit pca --dim 768 --column embedding_v2 --rpc match_documents_v2
+#   python -m scripts.reproject --projection models/rp_new.joblib --table documents_v2 \
+#       --rpc match_documents_v2 --dry-run
+
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from agentic_rag.config import ACTIVE_INDEX_PATH, EMBED_STORE_MODEL, SUPABASE_TABLE
+from agentic_rag.embstore import chunk_hash, open_store
+from agentic_rag.projection import (
+    fit_projection, load_projection, project, read_active, save_projection, write_active,
+)
+
+load_dotenv()
+
+SUPABASE_URL = os.getenv("SUPABASE_URL", "")
+SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
+
+
+def iter_pages(sb, table: str, cols: str, page: int) -> Iterator[List[Dict[str, Any]]]:
+    """Row pages ordered by doc_id (keyset pagination: no OFFSET scans)."""
+    last = None
+    while True:
+        q = sb.table(table).select(cols).order("doc_id").limit(page)
+        if last is not None:
+            q = q.gt("doc_id", last)
+        rows = q.execute().data or []
+        if not rows:
+            return
+        yield rows
+        last = rows[-1]["doc_id"]
+
+
+def _vec(raw: Any) -> Optional[List[float]]:
+    if isinstance(raw, str):
+        raw = json.loads(raw)
+    return raw if isinstance(raw, list) and raw else None
+
+
+def full_vectors(rows: List[Dict[str, Any]], store, source: str) -> Tuple[np.ndarray, np.ndarray]:
+    """(float32 (n, in_dim), found mask) for a page, from the store and/or the column."""
+    found = np.zeros(len(rows), dtype=bool)
+    X = None
+    if store is not None and source in ("auto", "store"):
+        X, found = store.get([chunk_hash(r.get("content") or "") for r in rows])
+    if source in ("auto", "column"):
+        for i, r in enumerate(rows):
+            if found[i]:
+                continue
+            v = _vec(r.get("full_embedding"))
+            if v is None:
+                continue
+            if X is None or X.shape[1] != len(v):
+                if X is not None and found.any():
+                    raise RuntimeError("full_embedding dim differs from the embedding store")
+                X = np.zeros((len(rows), len(v)), dtype=np.float32)
+            X[i] = v
+            found[i] = True
+    if X is None:
+        X = np.zeros((len(rows), 0), dtype=np.float32)
+    return X, found
+
+
+def write_column(sb, table: str, column: str, ids: List[str], Y: np.ndarray,
+                 rpc: str) -> None:
+    """Set `column` on existing rows and touch nothing else: one RPC call per batch
+    (set_vectors in docs/reprojection.md), or one update per row when rpc is empty."""
+    if rpc:
+        payload = [{"id": i, "v": y.tolist()} for i, y in zip(ids, Y)]
+        sb.rpc(rpc, {"target_table": table, "target_column": column,
+                     "payload": payload}).execute()
+        return
+    for i, y in zip(ids, Y):
+        sb.table(table).update({column: y.tolist()}).eq("doc_id", i).execute()
+
+
+def fit_sample(sb, args, store) -> np.ndarray:
+    """Vectors to fit a new projection on: the store, else the first column pages."""
+    if store is not None and store.count:
+        return store.sample(args.fit_samples)
+    parts, n = [], 0
+    for rows in iter_pages(sb, args.source_table, "doc_id,content,full_embedding", args.page):
+        X, found = full_vectors(rows, None, "column")
+        parts.append(X[found])
+        n += int(found.sum())
+        if n >= args.fit_samples:
+            break
+    if not n:
+        raise SystemExit("No full vectors to fit on (empty store and full_embedding column)")
+    return np.concatenate(parts)[:args.fit_samples]
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Re-project Supabase chunk vectors without re-embedding")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--projection", help="existing projection file (joblib: {'W'[,'mean']} or sklearn)")
+    src.add_argument("--fit", choices=("pca", "rp"), help="fit a new projection from stored vectors")
+    ap.add_argument("--dim", type=int, default=1024, help="output dim for --fit")
+    ap.add_argument("--fit-samples", type=int, default=20000)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--source", choices=("auto", "store", "column"), default="auto",
+                    help="where full vectors come from (auto: store, then full_embedding)")
+    ap.add_argument("--source-table", default=SUPABASE_TABLE)
+    dst = ap.add_mutually_exclusive_group(required=True)
+    dst.add_argument("--column", help="new vector column on --source-table")
+    dst.add_argument("--table", help="new table receiving full rows")
+    ap.add_argument("--rpc", required=True, help="RPC that searches the new column/table")
+    ap.add_argument("--out", help="where to save the projection (default models/proj_<kind>_<dim>.joblib)")
+    ap.add_argument("--page", type=int, default=2000, help="rows read (and projected) per block")
+    ap.add_argument("--write-batch", type=int, default=500)
+    ap.add_argument("--write-workers", type=int, default=4)
+    ap.add_argument("--update-rpc", default="set_vectors",
+                    help="bulk-update RPC for --column ('' = one update per row)")
+    ap.add_argument("--active", default=ACTIVE_INDEX_PATH, help="active-index manifest to swap")
+    ap.add_argument("--allow-missing", action="store_true",
+                    help="swap even if some rows had no full vector (they keep no new vector)")
+    ap.add_argument("--dry-run", action="store_true", help="project and count, write nothing")
+    args = ap.parse_args(argv)
+
+    from supabase import create_client
+    sb = create_client(SUPABASE_URL, SUPABASE_KEY)
+    store = open_store(EMBED_STORE_MODEL, readonly=True) if args.source != "column" else None
+    if store is not None and not store.count:
+        store = None
+
+    # 1) Projection: load, or fit on stored vectors (no model calls either way)
+    if args.projection:
+        W, mean = load_projection(args.projection)
+        kind = os.path.splitext(os.path.basename(args.projection))[0]
+    else:
+        X = fit_sample(sb, args, store)
+        W, mean = fit_projection(args.fit, X, args.dim, args.seed)
+        kind = args.fit
+        print(f"[fit] {args.fit} {W.shape[1]} -> {W.shape[0]} on {len(X)} vectors")
+    out_path = args.out or os.path.join("models", f"proj_{kind}_{W.shape[0]}.joblib")
+
+    # 2) Stream, project per block, write: --column sets only the new column,
+    #    --table needs whole rows
+    cols = "doc_id,content" + (",metadata" if args.table else "") + \
+        (",full_embedding" if args.source != "store" else "")
+    target = args.table or args.source_table
+    column = args.column or "embedding"
+    pool = ThreadPoolExecutor(max_workers=args.write_workers)
+    seen = written = missing = 0
+    t0 = time.perf_counter()
+    for rows in iter_pages(sb, args.source_table, cols, args.page):
+        X, found = full_vectors(rows, store, args.source)
+        seen += len(rows)
+        missing += int((~found).sum())
+        if not found.any():
+            continue
+        if X.shape[1] != W.shape[1]:
+            raise SystemExit(f"full vectors are {X.shape[1]}-d, projection expects {W.shape[1]}")
+        Y = project(X[found], W, mean)
+        kept = [r for r, f in zip(rows, found) if f]
+        if not args.dry_run:
+            spans = range(0, len(kept), args.write_batch)
+            if args.table:
+                out = [{"doc_id": r["doc_id"], "content": r.get("content") or "",
+                        "metadata": r.get("metadata"), column: y.tolist()}
+                       for r, y in zip(kept, Y)]
+                list(pool.map(lambda i: sb.table(target).upsert(
+                    out[i:i + args.write_batch]).execute(), spans))
+            else:
+                ids = [r["doc_id"] for r in kept]
+                list(pool.map(lambda i: write_column(
+                    sb, target, column, ids[i:i + args.write_batch],
+                    Y[i:i + args.write_batch], args.update_rpc), spans))
+        written += len(kept)
+        print(f"\r[reproject] {seen} rows, {written} projected, {missing} without a full vector",
+              end="", flush=True)
+    pool.shutdown()
+    print(f"\n[reproject] done in {time.perf_counter() - t0:.1f}s")
+
+    if args.dry_run:
+        print("[dry-run] nothing written, active index unchanged")
+        return 0
+    if missing and not args.allow_missing:
+        print(f"[swap] skipped: {missing} rows have no full vector (--allow-missing to swap anyway)")
+        return 1
+
+    # 3) Everything is in place: save the projection, then swap the active index
+    save_projection(out_path, W, mean, kind=kind, model=EMBED_STORE_MODEL)
+    prev = read_active(args.active)
+    manifest = {
+        "rpc_name": args.rpc,
+        "rp_path": os.path.abspath(out_path),
+        "dim": int(W.shape[0]),
+        "rows": written,
+        "model": EMBED_STORE_MODEL,
+        "created": int(time.time()),
+        "previous": {k: v for k, v in (prev or {}).items() if k != "previous"} or None,
+    }
+    manifest["table" if args.table else "column"] = args.table or column
+    write_active(args.active, manifest)
+    print(f"[swap] {args.active} -> rpc={args.rpc}, projection={out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
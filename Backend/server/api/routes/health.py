@@ -1,8 +1,22 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from server.core.warmup import RETRY_AFTER_S
 
 router = APIRouter(prefix="/health", tags=["health"])
 
 
 @router.get("")
-def health():
+@router.get("/live")
+def live():
+    """Liveness: the process is up and serving (says nothing about the graph)."""
     return {"status": "ok"}
+
+
+@router.get("/ready")
+def ready(request: Request):
+    """Readiness: 200 once the graph is built and every component warmed up, else 503."""
+    warmup = request.app.state.warmup
+    body = warmup.status()
+    if warmup.ready():
+        return body
+    return JSONResponse(body, status_code=503, headers={"Retry-After": str(RETRY_AFTER_S)})
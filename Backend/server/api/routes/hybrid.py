@@ -1,142 +1,13 @@
-from fastapi import APIRouter, Request, HTTPException
-from typing import List, Tuple, Any, Optional
-from urllib.parse import urlparse
+from fastapi import APIRouter, Depends, Request, HTTPException
+from typing import List, Tuple
 
+from agentic_rag.source_cards import source_card
 from server.schemas import HybridAskRequest, HybridAskResponse, HybridSource
-from bio_knowledge_engine.search.serpapi_client import build_external_context
+from server.core.limits import limit
+from server.core.warmup import get_graph
 
 router = APIRouter(prefix="/hybrid", tags=["hybrid"])
 
-# ---- RAG görsel link çıkarıcılar -------------------------------------------
-
-IMG_KEYS = (
-    "images", "figures", "thumbnails", "imgs", "pics",
-    "figure_images", "preview_images",
-)
-SINGLE_IMG_KEYS = ("image", "thumbnail", "first_image", "cover", "cover_image")
-URL_KEYS = (
-    "src", "url", "href", "image", "link",
-    "data-src", "data-original", "image_url", "thumbnail_url"
-)
-
-
-def _ensure_list(x: Any) -> List[Any]:
-    if x is None:
-        return []
-    if isinstance(x, list):
-        return x
-    return [x]
-
-
-def _pick_url(obj: Any) -> Optional[str]:
-    """Str veya dict içinden olası URL alanını çıkar."""
-    if isinstance(obj, str):
-        s = obj.strip()
-        return s or None
-    if isinstance(obj, dict):
-        for k in URL_KEYS:
-            v = obj.get(k)
-            if isinstance(v, str) and v.strip():
-                return v.strip()
-    return None
-
-
-def _looks_like_visual(u: str) -> bool:
-    """
-    Görsel BENZERİ link mi?
-    - Uzantılı gerçek görseller (.jpg/.png/.gif/.webp) => EVET
-    - Uzantısız ama figure/fig/images/bin => EVET
-    - Logo/icon/sprite/svg/static img => HAYIR
-    """
-    if not u:
-        return False
-    s = u.lower().strip()
-    if not (s.startswith("http://") or s.startswith("https://")):
-        return False
-
-    # bariz istenmeyenler
-    if any(tok in s for tok in ("logo", "icon", "sprite", "favicon", "/static/img", ".svg")):
-        return False
-
-    if any(s.endswith(ext) for ext in (".jpg", ".jpeg", ".png", ".gif", ".webp")):
-        return True
-
-    if "/figure" in s or "/fig" in s or "/images" in s or "/bin/" in s:
-        return True
-
-    return False
-
-
-def _ncbi_pmc_fallbacks(page_url: Optional[str]) -> List[str]:
-    """
-    NCBI/PMC makalelerinde görsel link bulunamadıysa makul fallback'ler.
-    Bunlar HAM LİNKTİR (UI tıklanabilir gösterir).
-    """
-    if not page_url:
-        return []
-    try:
-        u = page_url.strip().rstrip("/")
-        host = urlparse(u).netloc.lower()
-        if "ncbi.nlm.nih.gov" in host and "/pmc/articles/" in u:
-            return [u + "/#figures", u + "/bin/", u + "/pdf"]
-    except Exception:
-        pass
-    return []
-
-
-def _dedup_keep_order(urls: List[str]) -> List[str]:
-    seen = set()
-    out: List[str] = []
-    for u in urls:
-        if u and u not in seen:
-            seen.add(u)
-            out.append(u)
-    return out
-
-
-def _extract_visual_links(md: dict) -> Tuple[Optional[str], Optional[List[str]]]:
-    """
-    Metadata'dan görsel benzeri linkleri topla ve normalize et.
-    Dönüş: (image, images) -> string linkler (dosya değil).
-    """
-    prim: Optional[str] = None
-    pool: List[str] = []
-
-    # Tekil alanlar
-    for k in SINGLE_IMG_KEYS:
-        v = md.get(k)
-        u = _pick_url(v)
-        if u and _looks_like_visual(u):
-            if not prim:
-                prim = u
-            pool.append(u)
-
-    # Liste alanlar
-    for k in IMG_KEYS:
-        if k in md and md[k]:
-            for item in _ensure_list(md[k]):
-                u = _pick_url(item)
-                if u and _looks_like_visual(u):
-                    pool.append(u)
-
-    # Hiç link yoksa: domain-özel fallback (PMC)
-    if not pool:
-        url = md.get("url") or md.get("source")
-        pool.extend(_ncbi_pmc_fallbacks(url))
-
-    pool = _dedup_keep_order(pool)
-    if not prim and pool:
-        prim = pool[0]
-
-    return prim, (pool or None)
-
-
-def _excerpt(text: str, limit: int = 240) -> str:
-    if not text:
-        return ""
-    return (text[:limit] + "…") if len(text) > limit else text
-
-
 # ---- dual-query prompt ------------------------------------------------------
 
 def make_dual_queries(llm, question: str) -> Tuple[List[str], List[str]]:
@@ -219,12 +90,9 @@ def build_synthesis_prompt(question: str, web_items: List[dict], rag_docs: List)
 
 # ---- route ------------------------------------------------------------------
 
-@router.post("/ask", response_model=HybridAskResponse)
+@router.post("/ask", response_model=HybridAskResponse, dependencies=[Depends(limit("hybrid"))])
 def ask_hybrid(req: HybridAskRequest, request: Request):
-    app = request.app
-    graph = app.state.graph
-    if graph is None:
-        raise HTTPException(500, "Graph not initialized")
+    graph = get_graph(request)
 
     # 1) Sorgu setleri
     web_queries, rag_queries = make_dual_queries(graph.llm, req.question)
@@ -232,19 +100,23 @@ def ask_hybrid(req: HybridAskRequest, request: Request):
     # 2) SerpAPI (Google + Scholar). WebOptions -> build_external_context
     web_opts = req.web
     try:
+        # serpapi / bs4 / PyMuPDF are only imported once the hybrid route is used
+        from bio_knowledge_engine.search.serpapi_client import build_external_context
         web_ctx = build_external_context(
             query=" OR ".join(web_queries),
-            # Eğer build_external_context 0 kabul etmiyorsa, implementasyonu
-            # boş dönecek şekilde ayarlı olmalı. Aksi halde filtreyi aşağıda uygularız.
-            k_web=web_opts.max_results if web_opts.google else 0,
-            k_scholar=web_opts.max_results if web_opts.scholar else 0,
-            fetch_pdfs=web_opts.fetch_pdfs,
-            scrape_links=web_opts.scrape,
+            use_web=web_opts.google,
+            use_scholar=web_opts.scholar,
+            scrape_web=web_opts.scrape,
+            web_num=web_opts.max_results,
+            scholar_num=web_opts.max_results,
         )
     except Exception:
         web_ctx = {"web": [], "scholar": []}
 
-    web_items = (web_ctx.get("web") or []) + (web_ctx.get("scholar") or [])
+    # SerpAPI items carry `link`; tag scholar hits so their cards get kind="scholar"
+    web_items = ([{**it, "url": it.get("link")} for it in web_ctx.get("web") or []]
+                 + [{**it, "url": it.get("link"), "source": "scholar"}
+                    for it in web_ctx.get("scholar") or []])
 
     # 3) RAG
     rag_q = " ".join(rag_queries) if rag_queries else req.question
@@ -281,20 +153,6 @@ def ask_hybrid(req: HybridAskRequest, request: Request):
         )
 
     # rag (görsel linkleri ile)
-    for d in rag_docs:
-        md = getattr(d, "metadata", {}) or {}
-        img, imgs = _extract_visual_links(md)
-        sources.append(
-            HybridSource(
-                kind="rag",
-                title=md.get("title"),
-                url=md.get("url") or md.get("source"),
-                doc_id=md.get("doc_id"),
-                similarity=md.get("similarity"),
-                snippet=_excerpt(getattr(d, "page_content", "")),
-                image=img,
-                images=imgs,
-            )
-        )
+    sources.extend(HybridSource(kind="rag", **source_card(d)) for d in rag_docs)
 
     return HybridAskResponse(answer=answer, sources=sources)
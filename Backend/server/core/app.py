@@ -1,15 +1,25 @@
 # server/core/app.py
 import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from server.api.routes.health import router as health_router
 from server.api.routes.rag import router as rag_router
 from server.core.logging import quiet_third_party_logs
+from server.core.limits import build_limiters
+from server.core.warmup import Warmup
 from server.api.routes.hybrid import router as hybrid_router
+from server.api.routes.metrics import router as metrics_router
 
 
-def create_app() -> FastAPI:
+def create_app(graph=None, limiters=None) -> FastAPI:
+    """
+    Build the API. `graph` injects a prebuilt GraphApp (offline benchmarks, load tests);
+    `limiters` overrides the per-route concurrency limits read from LIMIT_* env vars.
+    Without `graph`, the GraphApp is built and warmed up in the background once the
+    server starts (see server/core/warmup.py); /health/ready tells when it is done.
+    """
     load_dotenv()
     quiet_third_party_logs()  # silence grpc/absl
 
@@ -33,10 +43,26 @@ def create_app() -> FastAPI:
     allow_credentials = os.getenv(
         "ALLOW_CREDENTIALS", "true").lower() == "true"
 
+    if graph is None:
+        def build_graph():
+            # Lazy import to avoid heavy deps on import
+            from agentic_rag.graph import GraphApp
+            return GraphApp(build_index=False)
+        warmup = Warmup(build_graph)
+    else:
+        warmup = Warmup.done(graph)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        if warmup.state == "pending":
+            warmup.start(app)
+        yield
+
     app = FastAPI(
         title="Agentic RAG API",
         version="0.1.0",
         root_path=api_root,   # e.g. /api/v1
+        lifespan=lifespan,
     )
 
     app.add_middleware(
@@ -47,11 +73,12 @@ def create_app() -> FastAPI:
         allow_headers=headers,
     )
 
-    # Lazy import to avoid heavy deps on import
-    from agentic_rag.graph import GraphApp
-    app.state.graph = GraphApp(build_index=False)
+    app.state.graph = warmup.graph   # None until the warm-up publishes it
+    app.state.warmup = warmup
+    app.state.limiters = limiters if limiters is not None else build_limiters()
 
     app.include_router(health_router)
     app.include_router(rag_router)
     app.include_router(hybrid_router)
+    app.include_router(metrics_router)
     return app
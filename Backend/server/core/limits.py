@@ -0,0 +1,149 @@
+# server/core/limits.py
+"""
+Per-route concurrency limits with a bounded wait queue.
+
+Each limited route gets a RouteLimiter:
+- at most `max_concurrent` requests run the handler at once (semaphore),
+- at most `max_queue` more wait for a slot, each for up to `queue_timeout_s`,
+- anything beyond that is rejected right away with 429 + Retry-After.
+
+Waiting happens on the event loop (asyncio.Semaphore), not in AnyIO's worker
+threads: queued requests hold no thread, so they cannot starve the sync handlers
+(or the dependency teardown that releases their slot) of the 40-thread pool.
+
+Configured per route from env, e.g. for the "ask" route:
+  LIMIT_ASK_CONCURRENCY=8  LIMIT_ASK_QUEUE=32  LIMIT_ASK_QUEUE_MS=2000
+"""
+import os
+import math
+import time
+import asyncio
+import threading
+from typing import Dict, Optional
+
+from fastapi import HTTPException, Request
+
+from agentic_rag.metrics import node_scope, record
+
+# route -> (concurrency, queue, queue_ms); overridable via LIMIT_<ROUTE>_*
+DEFAULT_LIMITS = {
+    "ask": (8, 32, 2000),
+    "hybrid": (4, 16, 2000),
+    "search": (16, 64, 1000),
+}
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after_s: int):
+        super().__init__(f"overloaded, retry after {retry_after_s}s")
+        self.retry_after_s = retry_after_s
+
+
+class RouteLimiter:
+    """Semaphore + bounded queue + queue-time budget for one route."""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout_s: float):
+        self.name = name
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.queue_timeout_s = max(0.0, float(queue_timeout_s))
+        self._sem = asyncio.BoundedSemaphore(self.max_concurrent)   # used on the event loop only
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._active = 0
+        self._avg_service_s = 1.0   # EWMA of handler time, drives Retry-After
+
+    @classmethod
+    def from_env(cls, name: str) -> "RouteLimiter":
+        conc, queue, queue_ms = DEFAULT_LIMITS.get(name, (8, 32, 2000))
+        key = name.upper()
+        return cls(
+            name,
+            int(os.getenv(f"LIMIT_{key}_CONCURRENCY", str(conc))),
+            int(os.getenv(f"LIMIT_{key}_QUEUE", str(queue))),
+            int(os.getenv(f"LIMIT_{key}_QUEUE_MS", str(queue_ms))) / 1000.0,
+        )
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained (at least 1)."""
+        with self._lock:
+            backlog = self._waiting + self._active
+            per_slot = self._avg_service_s * backlog / self.max_concurrent
+        return max(1, int(math.ceil(per_slot)))
+
+    async def acquire(self) -> None:
+        # 1) Fast path: free slot (acquire() does not yield when one is free)
+        if not self._sem.locked():
+            await self._sem.acquire()
+            with self._lock:
+                self._active += 1
+            return
+
+        # 2) Join the queue if there is room, else reject immediately
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                full = True
+            else:
+                full = False
+                self._waiting += 1
+        if full:
+            self._reject()
+
+        # 3) Wait up to the queue-time budget
+        t0 = time.perf_counter()
+        try:
+            got = await asyncio.wait_for(self._sem.acquire(), self.queue_timeout_s)
+        except asyncio.TimeoutError:
+            got = False
+        with node_scope(self.name):
+            record(queue_ms=(time.perf_counter() - t0) * 1000.0)
+        with self._lock:
+            self._waiting -= 1
+            if got:
+                self._active += 1
+        if not got:
+            self._reject()
+
+    def release(self, service_s: Optional[float] = None) -> None:
+        """Give the slot back; call on the event loop that acquired it."""
+        with self._lock:
+            self._active -= 1
+            if service_s is not None:
+                self._avg_service_s = 0.8 * self._avg_service_s + 0.2 * service_s
+        self._sem.release()
+
+    def _reject(self) -> None:
+        with node_scope(self.name):
+            record(rejected=1)
+        raise Overloaded(self.retry_after())
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {"active": self._active, "waiting": self._waiting,
+                    "max_concurrent": self.max_concurrent, "max_queue": self.max_queue,
+                    "avg_service_ms": round(self._avg_service_s * 1000.0, 1)}
+
+
+def build_limiters() -> Dict[str, RouteLimiter]:
+    return {name: RouteLimiter.from_env(name) for name in DEFAULT_LIMITS}
+
+
+def limit(name: str):
+    """FastAPI dependency: hold a slot of the `name` limiter for the whole request."""
+    async def dependency(request: Request):
+        limiter = request.app.state.limiters.get(name)
+        if limiter is None:
+            yield
+            return
+        try:
+            await limiter.acquire()
+        except Overloaded as e:
+            raise HTTPException(
+                429, f"Server busy ({name}); retry later",
+                headers={"Retry-After": str(e.retry_after_s)})
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            limiter.release(time.perf_counter() - t0)
+    return dependency
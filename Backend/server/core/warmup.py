@@ -0,0 +1,94 @@
+# server/core/warmup.py
+"""
+Background construction + warm-up of the GraphApp.
+
+The process starts serving right away: /health/live answers immediately, while a
+daemon thread builds the GraphApp (heavy imports, model clients) and calls its
+warm_up() (RP matrix, Supabase client, Chroma/BM25, one embedding round-trip).
+Routes that need the graph answer 503 + Retry-After until it is published, and
+/health/ready reports 200 only once every component is up.
+"""
+import time
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException, Request
+
+RETRY_AFTER_S = 5
+
+
+class Warmup:
+    """State of one background build: pending -> warming -> ready | failed."""
+
+    def __init__(self, factory: Callable[[], Any]):
+        self.factory = factory
+        self.state = "pending"
+        self.error: Optional[str] = None
+        self.graph: Any = None
+        self.components: Dict[str, str] = {}
+        self._t0 = time.monotonic()
+        self.elapsed_s: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def done(cls, graph: Any) -> "Warmup":
+        """Injected, already built graph (benchmarks, tests): warmed up in place."""
+        w = cls(lambda: graph)
+        w.graph = graph
+        if hasattr(graph, "warm_up"):
+            w.components = graph.warm_up()
+        w.state = "ready"
+        w.elapsed_s = 0.0
+        return w
+
+    def start(self, app) -> None:
+        self._thread = threading.Thread(
+            target=self.run, args=(app,), name="graph-warmup", daemon=True)
+        self._thread.start()
+
+    def run(self, app) -> None:
+        self.state = "warming"
+        self._t0 = time.monotonic()
+        try:
+            graph = self.factory()
+            if hasattr(graph, "warm_up"):
+                self.components = graph.warm_up()
+            # Publish only once warm, so the first request never pays for it
+            self.graph = graph
+            app.state.graph = graph
+            self.state = "ready"
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.state = "failed"
+        finally:
+            self.elapsed_s = round(time.monotonic() - self._t0, 3)
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def ready(self) -> bool:
+        if self.state != "ready":
+            return False
+        graph_ready = getattr(self.graph, "ready", None)
+        return graph_ready() if callable(graph_ready) else True
+
+    def status(self) -> Dict[str, Any]:
+        components = getattr(self.graph, "components", None) or self.components
+        return {
+            "status": "ready" if self.ready() else self.state,
+            "components": dict(components),
+            "error": self.error,
+            "warmup_s": self.elapsed_s,
+        }
+
+
+def get_graph(request: Request):
+    """The warmed GraphApp; 503 + Retry-After while it is still being built."""
+    graph = getattr(request.app.state, "graph", None)
+    if graph is None:
+        warmup = getattr(request.app.state, "warmup", None)
+        if warmup is not None and warmup.state == "failed":
+            raise HTTPException(500, f"Graph failed to initialize: {warmup.error}")
+        raise HTTPException(503, "Warming up", headers={"Retry-After": str(RETRY_AFTER_S)})
+    return graph
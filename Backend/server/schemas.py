@@ -1,4 +1,4 @@
-from typing import List, Optional, Literal
+from typing import Any, Dict, List, Optional, Literal
 from pydantic import BaseModel, Field, ConfigDict
 
 
@@ -9,7 +9,12 @@ from pydantic import BaseModel, Field, ConfigDict
 class AskRequest(BaseModel):
     """Simple chat/ask request for the RAG graph (agentic flow)."""
     question: str = Field(..., description="User question")
-    thread_id: Optional[str] = "api"
+    thread_id: Optional[str] = Field(
+        None, description="Conversation to continue; omitted -> a new thread is started")
+    hyde: Optional[Literal["off", "mean", "max"]] = Field(
+        None, description="HyDE retrieval mode (defaults to server HYDE_MODE)")
+    include_timings: bool = Field(
+        False, description="Return the per-node timing/call breakdown")
 
 
 class SourceItem(BaseModel):
@@ -32,6 +37,9 @@ class AskResponse(BaseModel):
     """RAG answer with its supporting sources."""
     answer: str
     sources: List[SourceItem] = Field(default_factory=list)
+    thread_id: Optional[str] = None   # pass back to ask follow-up questions
+    # {"total_ms": ..., "nodes": {node: {wall_ms, llm_calls, input_tokens, ...}}}
+    timings: Optional[Dict[str, Any]] = None
 
 
 class SearchRequest(BaseModel):
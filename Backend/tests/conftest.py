@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# Run from Backend/ or from tests/: the packages live next to this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
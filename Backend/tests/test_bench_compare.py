@@ -0,0 +1,18 @@
+# tests/test_bench_compare.py
+from benchmarks.run import compare
+
+BASE = {"graph": {"p50_ms": 10.0, "p95_ms": 12.0, "peak_kb": 100.0, "throughput_rps": 80.0}}
+
+
+def test_throughput_only_fails_when_strict():
+    slower_box = {"graph": {"p50_ms": 10.0, "p95_ms": 12.0, "peak_kb": 100.0,
+                            "throughput_rps": 20.0}}
+    assert compare(slower_box, BASE, tol=0.5) == []
+    assert [p.split(":")[0] for p in compare(slower_box, BASE, tol=0.5, strict=True)] == \
+        ["graph.throughput_rps"]
+
+
+def test_latency_still_fails():
+    slow = {"graph": {"p50_ms": 30.0, "p95_ms": 12.0, "peak_kb": 100.0,
+                      "throughput_rps": 80.0}}
+    assert [p.split(":")[0] for p in compare(slow, BASE, tol=0.5)] == ["graph.p50_ms"]
@@ -0,0 +1,85 @@
+# tests/test_chunking.py
+from langchain_core.documents import Document
+
+from agentic_rag.ingest.chunking import iter_chunks, sections
+from agentic_rag.ingest.loaders import article_text
+
+SIZE, OVERLAP = 300, 60
+
+
+def _article(body_paragraphs: int = 12) -> Document:
+    body = "\n\n".join(
+        " ".join(f"Paragraph {p} sentence {s} about microgravity and bone loss."
+                 for s in range(4))
+        for p in range(body_paragraphs))
+    text = article_text({
+        "title": "Bone loss in spaceflight",
+        "url": "https://example.org/a1", "doi": "10.1/x", "authors": ["A. B", "C. D"],
+        "publication_date": "2020-01-01",
+        "abstract": "Short abstract.",
+        "headings": ["Intro", "Methods"],
+        "body": body,
+        "images": [{"caption": "Figure 1: femur density."}],
+    })
+    return Document(page_content=text, metadata={"doc_id": "a1", "title": "Bone loss"})
+
+
+def test_offsets_point_back_into_the_article():
+    doc = _article()
+    chunks = list(iter_chunks([doc], SIZE, OVERLAP))
+    assert len(chunks) > 3
+    for c in chunks:
+        md = c.metadata
+        assert doc.page_content[md["start"]:md["end"]] == c.page_content
+        assert len(c.page_content) <= SIZE
+        assert md["doc_id"] == "a1" and md["title"] == "Bone loss"
+
+
+def test_chunk_index_is_per_article():
+    second = _article(3)
+    second.metadata["doc_id"] = "a2"
+    per_doc = {}
+    for c in iter_chunks([_article(), second], SIZE, OVERLAP):
+        per_doc.setdefault(c.metadata["doc_id"], []).append(c.metadata["chunk"])
+    # numbering restarts at 0 for every article (ids do not shift with the corpus)
+    assert set(per_doc) == {"a1", "a2"}
+    for idx in per_doc.values():
+        assert idx == list(range(len(idx)))
+
+
+def test_chunks_stay_inside_their_section():
+    doc = _article()
+    bounds = {name: (s, e) for name, s, e in sections(doc.page_content)}
+    for c in iter_chunks([doc], SIZE, OVERLAP):
+        md = c.metadata
+        if md["section"] in bounds and "+" not in md["section"]:
+            s, e = bounds[md["section"]]
+            assert s <= md["start"] and md["end"] <= e
+
+
+def test_header_only_in_the_first_chunk_and_short_sections_merge():
+    chunks = list(iter_chunks([_article()], SIZE, OVERLAP))
+    with_title = [c for c in chunks if "Bone loss in spaceflight" in c.page_content]
+    assert with_title == chunks[:1]
+    assert chunks[0].metadata["section"].startswith("abstract+headings")
+
+
+def test_paragraph_cuts_do_not_overlap_and_others_do():
+    doc = _article()
+    body = [c.metadata for c in iter_chunks([doc], SIZE, OVERLAP)
+            if c.metadata["section"] == "body"]
+    assert len(body) > 2
+    for a, b in zip(body, body[1:]):
+        gap = doc.page_content[a["end"]:b["start"]]
+        if a["end"] <= b["start"]:
+            assert gap.strip() == ""             # clean cut at a paragraph break
+        else:
+            assert a["end"] - b["start"] <= OVERLAP
+
+
+def test_plain_text_is_one_section():
+    doc = Document(page_content="  word " * 200, metadata={"doc_id": "p"})
+    chunks = list(iter_chunks([doc], SIZE, OVERLAP))
+    assert {c.metadata["section"] for c in chunks} == {"text"}
+    assert all(doc.page_content[c.metadata["start"]:c.metadata["end"]] == c.page_content
+               for c in chunks)
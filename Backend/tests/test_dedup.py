@@ -0,0 +1,87 @@
+# tests/test_dedup.py
+import pytest
+from langchain_core.documents import Document
+
+from agentic_rag.ingest.dedup import NearDupFilter, _bands_for, dedup_chunks
+
+N_WORDS = 200
+
+
+def _words(prefix: str, n: int = N_WORDS):
+    return [f"{prefix}{i}" for i in range(n)]
+
+
+def _variant(shared: int) -> str:
+    """Shares its first `shared` words with _words("w"); the rest are new."""
+    return " ".join(_words("w")[:shared] + _words("x", N_WORDS - shared))
+
+
+def _jaccard(a: str, b: str, k: int = 4) -> float:
+    def grams(t):
+        w = t.split()
+        return {" ".join(w[i:i + k]) for i in range(len(w) - k + 1)}
+    ga, gb = grams(a), grams(b)
+    return len(ga & gb) / len(ga | gb)
+
+
+BASE = " ".join(_words("w"))
+NEAR = _variant(195)      # true Jaccard ~0.95
+HALF = _variant(151)      # true Jaccard ~0.60
+
+
+def test_fixture_similarities():
+    assert _jaccard(BASE, NEAR) > 0.9
+    assert 0.55 < _jaccard(BASE, HALF) < 0.65
+
+
+@pytest.mark.parametrize("threshold", [0.5, 0.7, 0.85, 0.95])
+def test_bands_match_the_threshold(threshold):
+    b, r = _bands_for(threshold, 128)
+    assert b * r == 128
+    assert abs((1.0 / b) ** (1.0 / r) - threshold) < 0.1
+
+
+def test_exact_duplicates_ignore_case_and_spacing():
+    f = NearDupFilter(0.85)
+    assert f.check(BASE, "a#0") is None
+    assert f.check("  " + BASE.upper().replace(" ", "\n "), "b#0") == ""
+    assert f.stats == {"seen": 2, "kept": 1, "exact": 1, "near": 0}
+
+
+def test_near_duplicate_above_threshold_is_dropped_with_the_kept_key():
+    f = NearDupFilter(0.85)
+    assert f.check(BASE, "a#0") is None
+    assert f.check(NEAR, "b#0") == "a#0"
+    assert f.stats["near"] == 1
+
+
+def test_threshold_decides_partial_overlap():
+    strict = NearDupFilter(0.85)
+    strict.check(BASE)
+    assert strict.check(HALF) is None               # J ~0.6 < 0.85: kept
+
+    loose = NearDupFilter(0.4)
+    loose.check(BASE)
+    assert loose.check(HALF) is not None            # J ~0.6 >= 0.4: dropped
+
+
+def test_unrelated_text_is_kept():
+    f = NearDupFilter(0.5)
+    f.check(BASE)
+    assert f.check(" ".join(_words("z"))) is None
+    assert f.stats["kept"] == 2
+
+
+def test_signatures_are_deterministic():
+    assert (NearDupFilter(0.85).signature(BASE) == NearDupFilter(0.85).signature(BASE)).all()
+
+
+def test_dedup_chunks_streams_first_occurrences():
+    docs = [Document(page_content=t, metadata={"doc_id": d, "chunk": 0})
+            for d, t in (("a", BASE), ("b", NEAR), ("c", HALF), ("d", BASE))]
+    f = NearDupFilter(0.85)
+    kept = list(dedup_chunks(docs, dedup=f))
+    assert [d.metadata["doc_id"] for d in kept] == ["a", "c"]
+    assert "kept 2/4" in f.report()
+    # threshold 0 disables the filter
+    assert len(list(dedup_chunks(docs, threshold=0))) == 4
@@ -0,0 +1,22 @@
+# tests/test_docstore.py
+from langchain_core.documents import Document
+
+from agentic_rag.docstore import current_docstore, docstore_scope
+
+
+def _doc(i: int) -> Document:
+    return Document(page_content=f"chunk {i}", metadata={"doc_id": "a", "chunk": i})
+
+
+def test_outside_a_scope_nothing_accumulates():
+    current_docstore().add([_doc(i) for i in range(3)])
+    assert len(current_docstore()) == 0
+
+
+def test_nodes_share_the_store_of_their_scope():
+    with docstore_scope() as store:
+        refs = current_docstore().add([_doc(0), _doc(1)])
+        assert current_docstore() is store
+        assert [d.page_content for d in current_docstore().hydrate(refs)] == \
+            ["chunk 0", "chunk 1"]
+    assert len(current_docstore()) == 0
@@ -0,0 +1,98 @@
+# tests/test_embstore.py
+import os
+
+import numpy as np
+import pytest
+
+from agentic_rag.embstore import EmbeddingStore, chunk_hash, open_store
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.random((10, 4), dtype=np.float32)
+    return [chunk_hash(f"chunk {i}") for i in range(10)], X
+
+
+def _size(store, name):
+    return os.path.getsize(os.path.join(store.dir, name))
+
+
+def test_readonly_open_of_a_missing_store_creates_nothing(tmp_path):
+    assert open_store("m", str(tmp_path), readonly=True) is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_put_get_and_dedup(tmp_path, data):
+    hs, X = data
+    w = EmbeddingStore(str(tmp_path), "m")
+    assert w.put(hs[:5] + hs[:2], np.vstack([X[:5], X[:2]])) == 5
+    assert w.put(hs[3:7], X[3:7]) == 2
+    V, found = w.get(hs)
+    assert found.tolist() == [True] * 7 + [False] * 3
+    np.testing.assert_allclose(V[:7], X[:7])
+
+
+def test_torn_append_is_truncated_by_the_next_writer_only(tmp_path, data):
+    hs, X = data
+    w = EmbeddingStore(str(tmp_path), "m")
+    w.put(hs[:5], X[:5])
+    # a writer died after appending vectors / keys but before committing meta.json
+    with open(os.path.join(w.dir, "vectors.bin"), "ab") as f:
+        f.write(b"\0" * 16)
+    with open(os.path.join(w.dir, "keys.bin"), "ab") as f:
+        f.write(b"\1" * 32)
+    keys_size = _size(w, "keys.bin")
+
+    r = EmbeddingStore(str(tmp_path), "m", readonly=True)
+    assert r.count == 5 and _size(w, "keys.bin") == keys_size
+
+    w2 = EmbeddingStore(str(tmp_path), "m")
+    assert w2.count == 5
+    assert _size(w, "keys.bin") == 5 * 32
+    assert _size(w, "vectors.bin") == 5 * 4 * 4
+
+
+def test_stale_writer_recovers_and_reader_follows(tmp_path, data):
+    hs, X = data
+    w = EmbeddingStore(str(tmp_path), "m")
+    w.put(hs[:5], X[:5])
+    r = EmbeddingStore(str(tmp_path), "m", readonly=True)
+    other = EmbeddingStore(str(tmp_path), "m")
+    assert other.put(hs[5:7], X[5:7]) == 2
+    # w has not seen other's rows: it must append after them, not over them
+    assert w.put(hs[6:9], X[6:9]) == 2
+    V, found = r.get(hs)
+    assert r.count == 9 and found[:9].all()
+    np.testing.assert_allclose(V[:9], X[:9])
+
+
+def test_failed_commit_leaves_the_index_untouched(tmp_path, data, monkeypatch):
+    hs, X = data
+    w = EmbeddingStore(str(tmp_path), "m")
+    w.put(hs[:5], X[:5])
+
+    def disk_full(self):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(EmbeddingStore, "_write_meta", disk_full)
+    with pytest.raises(OSError):
+        w.put(hs[5:], X[5:])
+    assert w.count == 5
+    assert (w.rows(hs[5:]) == -1).all()
+
+    monkeypatch.undo()
+    assert w.put(hs[5:], X[5:]) == 5
+    r = EmbeddingStore(str(tmp_path), "m", readonly=True)
+    V, found = r.get(hs)
+    assert found.all()
+    np.testing.assert_allclose(V, X)
+
+
+def test_readonly_store_rejects_writes(tmp_path, data):
+    hs, X = data
+    EmbeddingStore(str(tmp_path), "m").put(hs[:1], X[:1])
+    r = open_store("m", str(tmp_path), readonly=True)
+    with pytest.raises(RuntimeError):
+        r.put(hs, X)
+    assert open_store("m", "", readonly=True) is None   # EMBED_STORE_DIR="" disables it
@@ -0,0 +1,20 @@
+# tests/test_fusion.py
+from langchain_core.documents import Document
+
+from agentic_rag.utils import chunk_key, rrf_fuse
+
+
+def test_same_chunk_has_one_key_across_retrievers():
+    supa = Document(page_content="text", metadata={
+        "doc_id": "a1", "chunk": 3, "chunk_id": "row-sha", "similarity": 0.9})
+    bm25 = Document(page_content="text", metadata={
+        "doc_id": "a1", "chunk": 3, "source": "corpus/a1.json"})
+    assert chunk_key(supa) == chunk_key(bm25) == "a1#3"
+    assert len(rrf_fuse([supa], [bm25])) == 1
+
+
+def test_fallback_key_is_a_short_content_hash():
+    d = Document(page_content="x" * 5000, metadata={"source": "s"})
+    key = chunk_key(d)
+    assert key.startswith("s#") and len(key) == len("s#") + 16
+    assert key == chunk_key(Document(page_content="x" * 5000, metadata={"source": "s"}))
@@ -0,0 +1,183 @@
+# tests/test_gateway.py
+import threading
+import time
+
+import pytest
+
+from agentic_rag.gateway import (
+    AttemptTimeout, DeadlineExceeded, ModelGateway, _is_throttle, _is_transient,
+)
+from agentic_rag.metrics import run_scope
+
+
+def _gateway(**kw) -> ModelGateway:
+    opts = dict(max_concurrency=4, retries=3, backoff_base_s=0.001, backoff_max_s=0.005)
+    opts.update(kw)
+    return ModelGateway("test", **opts)
+
+
+def _counters(run) -> dict:
+    out: dict = {}
+    for bucket in run.nodes.values():
+        for k, v in bucket.items():
+            out[k] = out.get(k, 0.0) + v
+    return out
+
+
+def _wait_idle(gw: ModelGateway, timeout: float = 2.0) -> None:
+    end = time.monotonic() + timeout
+    while gw.concurrency._inflight and time.monotonic() < end:
+        time.sleep(0.005)
+
+
+class _Status(Exception):
+    def __init__(self, code: int):
+        super().__init__(f"status {code}")
+        self.status_code = code
+
+
+def test_transient_errors_are_retried_and_counted():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise _Status(503)
+        return "ok"
+
+    gw = _gateway()
+    with run_scope() as run:
+        assert gw.call(flaky) == "ok"
+    assert len(calls) == 3
+    assert _counters(run)["model_retries"] == 2
+    assert gw.concurrency._inflight == 0
+
+
+def test_permanent_errors_are_not_retried():
+    calls = []
+
+    def bad():
+        calls.append(1)
+        raise ValueError("500 internal connection")   # message text is not a status
+
+    with pytest.raises(ValueError):
+        _gateway().call(bad)
+    assert len(calls) == 1
+
+
+def test_retries_stop_at_the_limit():
+    calls = []
+
+    def down():
+        calls.append(1)
+        raise ConnectionError("reset")
+
+    with pytest.raises(ConnectionError):
+        _gateway(retries=2).call(down)
+    assert len(calls) == 3
+
+
+def test_throttle_halves_the_concurrency_limit():
+    calls = []
+
+    def limited():
+        calls.append(1)
+        if len(calls) == 1:
+            raise _Status(429)
+        return "ok"
+
+    gw = _gateway(max_concurrency=8)
+    with run_scope() as run:
+        assert gw.call(limited) == "ok"
+    c = _counters(run)
+    assert c["model_throttled"] == 1 and c["model_retries"] == 1
+    assert gw.concurrency.limit < 8
+
+
+def test_deadline_is_final_and_the_slot_is_held_until_the_call_returns():
+    release = threading.Event()
+    calls = []
+
+    def hung():
+        calls.append(1)
+        release.wait(2.0)
+        return "late"
+
+    gw = _gateway(max_concurrency=1)
+    with run_scope() as run:
+        with pytest.raises(DeadlineExceeded):
+            gw.call(hung, timeout_s=0.05)
+    assert len(calls) == 1
+    assert _counters(run)["model_deadline"] == 1
+    # the abandoned call still runs: its slot is not free yet
+    assert gw.concurrency._inflight == 1
+    with pytest.raises(DeadlineExceeded):
+        gw.call(lambda: "next", timeout_s=0.05)
+    release.set()
+    _wait_idle(gw)
+    assert gw.concurrency._inflight == 0
+    assert gw.call(lambda: "next", timeout_s=1.0) == "next"
+
+
+def test_attempt_timeout_is_retried():
+    calls = []
+
+    def slow_once():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.3)
+        return "ok"
+
+    gw = _gateway()
+    with run_scope() as run:
+        assert gw.call(slow_once, timeout_s=0, attempt_timeout_s=0.05) == "ok"
+    c = _counters(run)
+    assert c["model_attempt_timeouts"] == 1 and c["model_retries"] == 1
+    assert "model_deadline" not in c
+    _wait_idle(gw)
+    assert gw.concurrency._inflight == 0
+
+
+def test_hedge_takes_its_own_slot_and_frees_it():
+    calls = []
+
+    def first_slow():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.3)
+        return len(calls)
+
+    gw = _gateway(hedge_after_ms=20)
+    with run_scope() as run:
+        assert gw.call(first_slow, timeout_s=2.0) == 2
+    assert _counters(run)["model_hedges"] == 1
+    assert gw.concurrency._inflight == 1          # the slow original is still running
+    _wait_idle(gw)
+    assert gw.concurrency._inflight == 0
+
+
+def test_classification_follows_status_and_cause():
+    class ResourceExhausted(Exception):
+        pass
+
+    class Response:
+        status_code = 502
+
+    class HTTPError(Exception):
+        response = Response()
+
+    try:
+        try:
+            raise ResourceExhausted("quota")
+        except ResourceExhausted as inner:
+            raise RuntimeError("wrapped") from inner
+    except RuntimeError as e:
+        wrapped = e
+
+    assert _is_throttle(_Status(429)) and _is_transient(_Status(429))
+    assert _is_throttle(wrapped) and _is_transient(wrapped)
+    assert _is_transient(HTTPError())
+    assert _is_transient(AttemptTimeout())
+    assert not _is_transient(DeadlineExceeded())
+    assert not _is_transient(_Status(400))
+    assert not _is_throttle(RuntimeError("429 rate limit"))
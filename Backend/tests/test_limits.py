@@ -0,0 +1,38 @@
+# tests/test_limits.py
+import asyncio
+import threading
+
+import pytest
+
+from server.core.limits import Overloaded, RouteLimiter
+
+
+def test_queue_waits_on_the_loop_then_times_out_or_rejects():
+    async def scenario():
+        lim = RouteLimiter("t", max_concurrent=1, max_queue=1, queue_timeout_s=0.05)
+        await lim.acquire()                          # takes the only slot
+        threads = threading.active_count()
+        waiter = asyncio.ensure_future(lim.acquire())
+        await asyncio.sleep(0)
+        assert lim.stats()["waiting"] == 1
+        assert threading.active_count() == threads   # a queued request holds no thread
+        with pytest.raises(Overloaded):              # queue full: rejected right away
+            await lim.acquire()
+        with pytest.raises(Overloaded):              # queue-time budget runs out
+            await waiter
+        assert lim.stats()["waiting"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_release_hands_the_slot_to_a_waiter():
+    async def scenario():
+        lim = RouteLimiter("t", max_concurrent=1, max_queue=4, queue_timeout_s=1.0)
+        await lim.acquire()
+        waiter = asyncio.ensure_future(lim.acquire())
+        await asyncio.sleep(0)
+        lim.release(0.01)
+        await waiter
+        assert lim.stats()["active"] == 1 and lim.stats()["waiting"] == 0
+
+    asyncio.run(scenario())
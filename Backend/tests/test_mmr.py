@@ -0,0 +1,65 @@
+# tests/test_mmr.py
+import logging
+import types
+
+import numpy as np
+from langchain_core.documents import Document
+
+from agentic_rag.retrievers.local_ann import LocalANNRetriever
+from agentic_rag.retrievers.mmr import mmr_docs
+from agentic_rag.retrievers.supabase_ann import SupabaseANNRetriever
+
+
+def _doc(article: str, sim: float) -> Document:
+    return Document(page_content=f"{article} {sim}",
+                    metadata={"doc_id": article, "similarity": sim})
+
+
+def test_rows_without_a_vector_only_fill_the_tail():
+    docs = [_doc("a", 0.9), _doc("b", 0.8), _doc("c", 0.7), _doc("d", 0.6)]
+    X = np.asarray([[1, 0], [0, 0], [1, 0.01], [0, 1]], dtype=np.float32)
+    found = np.asarray([True, False, True, True])
+    # "b" has no vector: as a zero row it would look perfectly non-redundant
+    picked = [d.metadata["doc_id"] for d in mmr_docs(docs, X, 2, 0.5, found=found)]
+    assert picked == ["a", "d"]
+    picked = [d.metadata["doc_id"] for d in mmr_docs(docs, X, 4, 0.5, found=found)]
+    assert picked[:3] == ["a", "d", "c"] and picked[3] == "b"
+
+
+class _FakeRPC:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def rpc(self, name, payload):
+        return types.SimpleNamespace(
+            execute=lambda: types.SimpleNamespace(data=[dict(r) for r in self.rows]))
+
+
+def _supabase(rows, **kw) -> SupabaseANNRetriever:
+    r = SupabaseANNRetriever("u", "k", "match_documents", None, embedder=None, k=2,
+                             mmr_lambda=0.5, **kw)
+    r._client = _FakeRPC(rows)
+    r.articles.hydrate = lambda docs: docs
+    return r
+
+
+def test_stock_rpc_without_vectors_falls_back_to_dedup_and_warns_once(caplog):
+    rows = [{"doc_id": f"{a}#0", "content": a, "similarity": s, "metadata": {"doc_id": a}}
+            for a, s in [("a", 0.9), ("a", 0.85), ("b", 0.8), ("c", 0.7)]]
+    r = _supabase(rows, mmr_k=3)
+    with caplog.at_level(logging.WARNING):
+        first = r.invoke_vector(np.ones(4, dtype=np.float32))
+        r.invoke_vector(np.ones(4, dtype=np.float32))
+    assert [d.metadata["doc_id"] for d in first] == ["a", "b", "c"]   # mmr_k, by relevance
+    assert sum("returns no candidate vectors" in m for m in caplog.messages) == 1
+
+
+def test_local_mmr_k_matches_supabase():
+    rng = np.random.default_rng(0)
+    docs = [Document(page_content=str(i), metadata={"doc_id": f"a{i}"}) for i in range(40)]
+    local = LocalANNRetriever(embedder=None, k=8, mmr_lambda=0.5, mmr_k=3)
+    local.add_documents(docs, vectors=rng.normal(size=(40, 16)))
+    assert len(local.invoke_vector(rng.normal(size=16))) == 3
+    assert len(local.invoke_vector(rng.normal(size=16), k=5)) == 5
+    local.mmr_lambda = None
+    assert len(local.invoke_vector(rng.normal(size=16))) == 8
@@ -0,0 +1,35 @@
+# tests/test_plan.py
+import uuid
+from types import SimpleNamespace
+
+from agentic_rag.nodes.plan import _parse_plan, plan
+
+
+class _LLM:
+    def __init__(self, reply: str):
+        self.reply = reply
+        self.calls = 0
+
+    def invoke(self, messages, **kwargs):
+        self.calls += 1
+        return SimpleNamespace(content=self.reply)
+
+
+def test_parse_plan_flags_malformed_replies():
+    assert _parse_plan("q", "no json here") == (
+        {"route": "full", "rewrites": [], "hyde": None}, False)
+    out, valid = _parse_plan("q", '{"route": "SIMPLE", "queries": ["bone loss rate"]}')
+    assert valid and out["route"] == "fast" and out["rewrites"] == ["bone loss rate"]
+
+
+def test_only_valid_plans_are_cached():
+    bad = _LLM("sorry, I cannot")
+    for _ in range(2):
+        assert plan(bad, {"question": "malformed plan question?"})["route"] == "full"
+    assert bad.calls == 2
+
+    good = _LLM('{"route": "COMPLEX", "queries": []}')
+    q = f"well formed plan question {uuid.uuid4().hex}?"   # fresh even with a shared cache
+    for _ in range(2):
+        assert plan(good, {"question": q})["route"] == "full"
+    assert good.calls == 1
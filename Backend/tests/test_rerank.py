@@ -0,0 +1,49 @@
+# tests/test_rerank.py
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+from agentic_rag.metrics import run_scope
+from agentic_rag.retrievers.rerank import Reranker
+
+
+class SlowCrossEncoder:
+    def __init__(self, ms: float):
+        self.ms, self.pairs = ms, 0
+
+    def score(self, query, passages):
+        time.sleep(self.ms / 1000.0)
+        self.pairs += len(passages)
+        return np.arange(len(passages), dtype=np.float32)
+
+
+def _docs(n: int = 8):
+    return [Document(page_content=f"chunk {i}", metadata={"similarity": 1.0 - i / n})
+            for i in range(n)]
+
+
+def _rank(rr: Reranker):
+    v = np.ones(4, dtype=np.float32) / 2.0
+    return rr.rank(_docs(), v, query="q", vectors=(np.zeros((8, 4), np.float32),
+                                                   np.zeros(8, dtype=bool)))
+
+
+def test_budget_is_shared_by_the_calls_of_one_request():
+    ce = SlowCrossEncoder(ms=30)
+    rr = Reranker(store=None, cross_encoder=ce, budget_ms=50, ce_top=8, ce_batch=2)
+    with run_scope():
+        _rank(rr)
+        first = ce.pairs
+        _rank(rr)
+    assert first == 4                 # two batches, then the budget is gone
+    assert ce.pairs == first          # the second ANN call of the turn scores nothing
+
+
+def test_each_request_gets_a_fresh_budget():
+    ce = SlowCrossEncoder(ms=30)
+    rr = Reranker(store=None, cross_encoder=ce, budget_ms=50, ce_top=8, ce_batch=2)
+    for _ in range(2):
+        with run_scope():
+            _rank(rr)
+    assert ce.pairs == 8